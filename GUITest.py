@@ -1,28 +1,47 @@
-from typing import Dict, Optional
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import ttkbootstrap as ttk
+from typing import Callable, Dict, List, Optional
 from datetime import date
-import re
-import pyperclip
+from functools import partial
+import difflib
+import os
+import queue
+import threading
+import brands
+import config_core
+import instrument
+import profile_catalog
+import validator
+from record_queue import RecordQueue
+from render_cache import RenderCache
+from serviceport_index import ServicePortIndex, ServicePortNotFound
+
+# GUI toolkits are imported by load_gui_modules() when the window is built, so
+# importing this module (headless use, startup_report.py) stays cheap
+tk = ttk = filedialog = messagebox = scrolledtext = None
+
+# Lines inserted into the output pane per event loop turn, and how often a
+# background render is checked for its result
+OUTPUT_CHUNK_LINES = 500
+RENDER_POLL_MS = 20
+
+# Quiet time after the last edit before the live preview re-renders
+PREVIEW_DELAY_MS = 250
+
+def load_gui_modules():
+    """Import tkinter and ttkbootstrap on first use"""
+    global tk, ttk, filedialog, messagebox, scrolledtext
+    if ttk is None:
+        import tkinter as tk
+        from tkinter import filedialog, messagebox, scrolledtext
+        import ttkbootstrap as ttk
 
 class OLTConfigGenerator:
     def __init__(self):
+        load_gui_modules()
 
         self.root = ttk.Window(themename="darkly")
         self.root.title("OLT Configuration Generator")
         self.root.geometry("1920x1080")
         
-        # Constants
-        self.SERVICES = {
-            '2801': '10', '2802': '10', '2828': '20', '2887': '5',
-            '2888': '20', '2889': '50', '2890': '100', '1601': '10',
-            '1602': '20', '1603': '30', '1604': '50', '1605': '100',
-            '2820': '10', '2830': '20', '2819': '50'
-        }
-        
-        self.VLAN_RANGE = [str(i) for i in range(2900, 3000)] + list(self.SERVICES.keys())
-        
         # Variables
         self.registration_type = tk.StringVar(value="new")
         self.connection_type = tk.StringVar(value="pppoe")
@@ -30,7 +49,23 @@ class OLTConfigGenerator:
         self.use_today_password = tk.BooleanVar(value=True)
         self.use_nce = tk.BooleanVar(value=False)
         
+        # Service-ports of the loaded "display service-port all" dump
+        self.serviceport_index = ServicePortIndex()
+        
+        # Background rendering: only the result of the latest render is shown
+        self.render_token = 0
+        self.output_config = ""
+        self.output_job = None
+        self.preview_job = None
+        
+        # Records queued for a one-shot export, rendered once per change
+        self.record_queue = RecordQueue()
+        
+        # Regenerating or previewing an ONU that was rendered before is a cache hit
+        config_core.set_render_cache(RenderCache(maxsize=256))
+        
         self.setup_gui()
+        self.add_traces()
         
     def setup_gui(self):
         """Setup the main GUI layout"""
@@ -48,6 +83,7 @@ class OLTConfigGenerator:
         
         self.create_input_panel(left_panel)
         self.create_output_panel(right_panel)
+        self.create_queue_panel(right_panel)
         
     def create_input_panel(self, parent):
         """Create the input form panel"""
@@ -101,26 +137,20 @@ class OLTConfigGenerator:
         brand_frame = ttk.LabelFrame(parent, text="OLT Brand", padding=10)
         brand_frame.pack(fill=tk.X, pady=(0, 10))
         
-        brands = [
-            ("Raisecom", "raisecom"),
-            ("ZTE C610", "zte_c610"),
-            ("ZTE C320", "zte_c320"),
-            ("BDCOM", "bdcom"),
-            ("Huawei", "huawei")
-        ]
-        
-        for text, value in brands:
+        # Built-in brands first, then the installed brand plugins
+        for brand in map(brands.get, brands.names()):
             ttk.Radiobutton(
                 brand_frame,
-                text=text,
+                text=brand.label,
                 variable=self.olt_brand,
-                value=value,
+                value=brand.name,
                 command=self.update_fsp_format
             ).pack(side=tk.LEFT, padx=5)
         
         # Device Information
-        device_frame = ttk.LabelFrame(parent, text="Device Information", padding=10)
-        device_frame.pack(fill=tk.X, pady=(0, 10))
+        self.device_frame = ttk.LabelFrame(parent, text="Device Information", padding=10)
+        self.device_frame.pack(fill=tk.X, pady=(0, 10))
+        device_frame = self.device_frame
         
         # SN Entry
         ttk.Label(device_frame, text="Serial Number:").pack(fill=tk.X)
@@ -139,6 +169,23 @@ class OLTConfigGenerator:
         self.vlan_entry = ttk.Entry(device_frame)
         self.vlan_entry.pack(fill=tk.X, pady=(0, 10))
         
+        # Serviceport for Huawei replacement, looked up from a dump when left empty
+        self.serviceport_frame = ttk.Frame(device_frame)
+        self.serviceport_frame.pack(fill=tk.X)
+        self.serviceport_frame.pack_forget()
+        
+        ttk.Label(self.serviceport_frame, text="Serviceport:").pack(fill=tk.X)
+        self.serviceport_entry = ttk.Entry(self.serviceport_frame)
+        self.serviceport_entry.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Button(
+            self.serviceport_frame,
+            text="Load Service-Port Dump",
+            command=self.load_serviceport_dump
+        ).pack(fill=tk.X)
+        self.serviceport_status = ttk.Label(self.serviceport_frame, text="No dump loaded")
+        self.serviceport_status.pack(fill=tk.X, pady=(0, 10))
+        
         # Customer Information
         customer_frame = ttk.LabelFrame(parent, text="Customer Information", padding=10)
         customer_frame.pack(fill=tk.X, pady=(0, 10))
@@ -186,18 +233,24 @@ class OLTConfigGenerator:
         
     def create_output_panel(self, parent):
         """Create the output display panel"""
-        # Output area
-        output_frame = ttk.LabelFrame(parent, text="Generated Configuration", padding=10)
-        output_frame.pack(fill=tk.BOTH, expand=True)
-        
+        # Output area, its title also shows why the live preview is not updating
+        self.output_frame = ttk.LabelFrame(parent, text="Generated Configuration", padding=10)
+        self.output_frame.pack(fill=tk.BOTH, expand=True)
+        output_frame = self.output_frame
+        
+        # No wrapping: wrapped lines make inserting long scripts very slow
+        output_xscroll = ttk.Scrollbar(output_frame, orient=tk.HORIZONTAL)
+        output_xscroll.pack(side=tk.BOTTOM, fill=tk.X)
         self.output_text = scrolledtext.ScrolledText(
             output_frame,
-            wrap=tk.WORD,
+            wrap=tk.NONE,
             width=50,
             height=30,
-            font=("Courier", 10)
+            font=("Courier", 10),
+            xscrollcommand=output_xscroll.set
         )
         self.output_text.pack(fill=tk.BOTH, expand=True)
+        output_xscroll.config(command=self.output_text.xview)
         
         # Copy button
         ttk.Button(
@@ -207,17 +260,42 @@ class OLTConfigGenerator:
             style="Accent.TButton"
         ).pack(fill=tk.X, pady=(10, 0))
         
+    def create_queue_panel(self, parent):
+        """Create the queue of records exported together"""
+        queue_frame = ttk.LabelFrame(parent, text="Queue", padding=10)
+        queue_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        
+        # OLT the added record belongs to, names its script on export
+        olt_frame = ttk.Frame(queue_frame)
+        olt_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(olt_frame, text="OLT:").pack(side=tk.LEFT)
+        self.queue_olt_entry = ttk.Entry(olt_frame)
+        self.queue_olt_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
+        columns = ("olt", "brand", "sn", "fsp", "vlan", "name", "type", "status")
+        self.queue_tree = ttk.Treeview(queue_frame, columns=columns, show="headings", height=8)
+        for column, width in zip(columns, (100, 80, 130, 90, 60, 150, 70, 250)):
+            self.queue_tree.heading(column, text=column.upper())
+            self.queue_tree.column(column, width=width, stretch=column == "status")
+        self.queue_tree.pack(fill=tk.BOTH, expand=True)
+        self.queue_tree.bind("<<TreeviewSelect>>", self.load_queued_record)
+        
+        buttons = ttk.Frame(queue_frame)
+        buttons.pack(fill=tk.X, pady=(5, 0))
+        for text, command in (("Add", self.add_to_queue), ("Update Selected", self.update_queued_record),
+                              ("Remove", self.remove_queued_records), ("Clear", self.clear_queue),
+                              ("Copy All", self.copy_queue), ("Save As...", self.save_queue),
+                              ("Export Scripts...", self.export_queue_scripts)):
+            ttk.Button(buttons, text=text, command=command).pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.queue_status = ttk.Label(queue_frame, text="Queue is empty")
+        self.queue_status.pack(fill=tk.X, pady=(5, 0))
+        
     def update_fsp_format(self):
         """Update FSP format hint based on selected brand"""
-        formats = {
-            "raisecom": "Format: S/P/Onu id",
-            "zte_c610": "Format: F/S/P/Onu id",
-            "zte_c320": "Format: F/S/P/Onu id",
-            "bdcom": "Format: P/Onu id",
-            "huawei": "Format: F/S/P/Onu id"
-        }
-        
-        self.fsp_label.config(text=formats.get(self.olt_brand.get(), "Format: F/S/P/Onu id"))
+        brand = self.olt_brand.get()
+        fsp_format = brands.get(brand).fsp_format if brands.is_known(brand) else "Format: F/S/P/Onu id"
+        self.fsp_label.config(text=fsp_format)
         
         # Show/hide NCE frame for Huawei
         if self.olt_brand.get() == "huawei":
@@ -239,470 +317,149 @@ class OLTConfigGenerator:
         else:
             self.password_entry.config(state="normal")
             
-    def validate_inputs(self) -> bool:
-        """Validate all input fields"""
-        if not self.sn_entry.get() or len(self.sn_entry.get()) not in [12, 16]:
-            messagebox.showerror("Error", "Invalid Serial Number")
-            return False
-            
-        if not self.fsp_entry.get():
-            messagebox.showerror("Error", "FSP is required")
-            return False
-            
-        if not self.vlan_entry.get() or self.vlan_entry.get() not in self.VLAN_RANGE:
-            messagebox.showerror("Error", "Invalid VLAN")
-            return False
-            
-        if not self.sid_entry.get() or not self.sid_entry.get().isdigit():
-            messagebox.showerror("Error", "Invalid SID")
-            return False
-            
-        if not self.name_entry.get():
-            messagebox.showerror("Error", "Customer Name is required")
+    def load_serviceport_dump(self):
+        """Load a saved "display service-port all" output for serviceport lookups"""
+        path = filedialog.askopenfilename(
+            title="Service-Port Dump",
+            filetypes=[("Text files", "*.txt *.log"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        self.serviceport_index = ServicePortIndex()
+        try:
+            count = self.serviceport_index.load_dump(path, olt="")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to load service-port dump: {str(e)}")
+            return
+        self.serviceport_status.config(text=f"{count} service-ports loaded")
+        
+    def fill_serviceport(self) -> bool:
+        """Look up an empty Huawei replacement serviceport in the loaded dump"""
+        if (self.olt_brand.get() != "huawei" or self.registration_type.get() != "replace"
+                or self.serviceport_entry.get() or not len(self.serviceport_index)):
+            return True
+        
+        fsp = self.fsp_entry.get().strip()
+        try:
+            serviceport = self.serviceport_index.resolve("", fsp, self.vlan_entry.get().strip())
+        except ServicePortNotFound as e:
+            messagebox.showerror("Error", str(e))
             return False
-            
+        self.serviceport_entry.insert(0, serviceport)
         return True
         
     def generate_config(self):
         """Generate OLT configuration based on inputs"""
-        if not self.validate_inputs():
+        if not self.fill_serviceport() or not self.validate_inputs():
             return
             
+        # Widgets are read here, the worker thread only renders
+        render = partial(config_core.create_config_string, **self.get_input_values())
+        self.run_in_background(render, self.show_output)
+        
+    def run_in_background(self, render: Callable[[], str], on_done: Callable[[str], None]):
+        """Render in a worker thread and hand the result to on_done on the Tk main loop"""
+        self.render_token += 1
+        results = queue.Queue(maxsize=1)
+        
+        def worker():
+            try:
+                results.put((render(), None))
+            except Exception as e:
+                results.put((None, e))
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(RENDER_POLL_MS, self.poll_render, self.render_token, results, on_done)
+        
+    def poll_render(self, token: int, results: queue.Queue, on_done: Callable[[str], None]):
+        """Check a background render, again later until it is done"""
         try:
-            # Get values from inputs
-            config = self.create_config_string()
-            
-            # Display configuration
-            self.output_text.delete(1.0, tk.END)
-            self.output_text.insert(tk.END, config)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate configuration: {str(e)}")
+            config, error = results.get_nowait()
+        except queue.Empty:
+            self.root.after(RENDER_POLL_MS, self.poll_render, token, results, on_done)
+            return
+        
+        # A newer render was started meanwhile, its result wins
+        if token != self.render_token:
+            return
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to generate configuration: {str(error)}")
+        else:
+            on_done(config)
             
-    def create_config_string(self) -> str:
-        """Create the configuration string based on selected options"""
-        # Get all input values
-        sn = self.sn_entry.get()
-        fsp = self.fsp_entry.get()
-        vlan = self.vlan_entry.get()
-        sid = self.sid_entry.get()
-        name = self.name_entry.get().replace(' ', '.')
-        
-        # Get configuration parameters
-        is_replacement = self.registration_type.get() == "replace"
-        is_pppoe = self.connection_type.get() == "pppoe"
-        brand = self.olt_brand.get()
+    def show_output(self, config: str):
+        """Replace the output, large configs are inserted a chunk per event loop turn"""
+        if self.output_job:
+            self.root.after_cancel(self.output_job)
+            self.output_job = None
+        self.output_config = config
+        self.output_text.delete(1.0, tk.END)
+        self.insert_output_chunk(config.splitlines(keepends=True), 0)
+        
+    def update_output(self, config: str):
+        """Show config, rewriting only the lines that differ from the shown output"""
+        shown = self.output_text.get("1.0", "end-1c")
+        if self.output_job or shown != self.output_config:
+            # Still filling, or edited by hand: start over
+            self.show_output(config)
+            return
         
+        old = shown.splitlines(keepends=True)
+        new = config.splitlines(keepends=True)
+        matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+        with instrument.timed("output"):
+            # From the bottom up, so the line numbers of earlier changes stay valid
+            for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+                if tag == "equal":
+                    continue
+                start = f"{i1 + 1}.0"
+                self.output_text.delete(start, f"{i2 + 1}.0" if i2 < len(old) else "end-1c")
+                self.output_text.insert(start, ''.join(new[j1:j2]))
+        self.output_config = config
+        
+    def insert_output_chunk(self, lines: List[str], start: int):
+        end = start + OUTPUT_CHUNK_LINES
+        with instrument.timed("output"):
+            self.output_text.insert(tk.END, ''.join(lines[start:end]))
+        self.output_job = self.root.after(1, self.insert_output_chunk, lines, end) if end < len(lines) else None
+            
+    def get_input_values(self) -> Dict:
+        """Collect the form values as create_config_string arguments"""
         # Get password for PPPoE
         password = ""
-        if is_pppoe:
+        if self.connection_type.get() == "pppoe":
             if self.use_today_password.get():
                 password = date.today().strftime('%Y%m%d')
             else:
                 password = self.password_entry.get()
-        
-        # Generate configuration based on brand
-        config_generators = {
-            "raisecom": self.generate_raisecom_config,
-            "zte_c610": self.generate_c610_config,
-            "zte_c320": self.generate_c320_config,
-            "bdcom": self.generate_bdcom_config,
-            "huawei": self.generate_huawei_config
+
+        return {
+            "brand": self.olt_brand.get(),
+            "sn": self.sn_entry.get(),
+            "fsp": self.fsp_entry.get(),
+            "vlan": self.vlan_entry.get(),
+            "sid": self.sid_entry.get(),
+            "name": self.name_entry.get(),
+            "password": password,
+            "is_replacement": self.registration_type.get() == "replace",
+            "is_pppoe": self.connection_type.get() == "pppoe",
+            "use_nce": self.use_nce.get(),
+            "serviceport": self.serviceport_entry.get()
         }
-        
-        return config_generators[brand](
-            sn=sn,
-            fsp=fsp,
-            vlan=vlan,
-            sid=sid,
-            name=name,
-            password=password,
-            is_replacement=is_replacement,
-            is_pppoe=is_pppoe
-        )
-    
-    def generate_raisecom_config(self, **kwargs) -> str:
-        """Generate Raisecom configuration"""
-        sn = kwargs['sn']
-        fsp = kwargs['fsp']
-        vlan = kwargs['vlan']
-        sid = kwargs['sid']
-        name = kwargs['name']
-        password = kwargs.get('password', '')
-        is_replacement = kwargs['is_replacement']
-        is_pppoe = kwargs['is_pppoe']
-        
-        split_fsp = re.split(r'\D', fsp)
-        config = []
-        
-        # First part
-        config.append("config")
-        config.append(f"interface gpon-olt {split_fsp[0]}/{split_fsp[1]}")
-        
-        if is_replacement:
-            config.append(f"no create gpon-onu {split_fsp[2]}")
-            
-        config.append(f"create gpon-onu {split_fsp[2]} sn {sn} line-profile-id 1 service-profile-id 1")
-        config.append("quit")
-        config.append(f"interface gpon-onu {fsp}")
-        config.append(f"description {sid}-{name}")
-        config.append("quit")
-        
-        # Second part for Raisecom ONUs
-        if sn.lower().startswith('rcm'):
-            config.append(f"gpon-onu {fsp}")
-            config.append(f"iphost 1 mode {'pppoe' if is_pppoe else 'dhcp'}")
-            
-            if is_pppoe:
-                config.append(f"iphost 1 pppoe username {sn} password {password}")
-                
-            config.append(f"iphost 1 vlan {vlan}")
-            config.append("iphost 1 service Internet")
-            config.append("iphost 1 service mode route nat enable cos 0 portlist 1,2 ssidlist 1")
-            config.append("end")
-            
-        return '\n'.join(config)
-    
-    def generate_c610_config(self, **kwargs) -> str:
-        """Generate ZTE C610 configuration"""
-        sn = kwargs['sn']
-        fsp = kwargs['fsp']
-        vlan = kwargs['vlan']
-        sid = kwargs['sid']
-        name = kwargs['name']
-        password = kwargs.get('password', '')
-        is_replacement = kwargs['is_replacement']
-        is_pppoe = kwargs['is_pppoe']
-        
-        split_fsp = re.split(r'\D', fsp)
-        config = []
-        
-        # First part
-        config.append("config t")
-        config.append(f"interface gpon_olt-{split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]}")
-        
-        if is_replacement:
-            config.append(f"no onu {split_fsp[3]}")
-            
-        config.append(f"onu {split_fsp[3]} type ZTEG-F609 sn {sn}")
-        config.append("exit")
-        
-        # Second part
-        config.append(f"interface gpon_onu-{split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]}:{split_fsp[3]}")
-        config.append(f"description {sid}-{name}")
-        config.append(f"tcont 1 name HSI profile {'PPPOE' if is_pppoe else self.SERVICES[vlan]+'Mbps'}")
-        config.append("gemport 1 name HSI tcont 1")
-        config.append("exit")
-        config.append(f"interface vport-{split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]}.{split_fsp[3]}:1")
-        config.append(f"service-port 1 user-vlan {vlan} vlan {vlan}")
-        config.append("exit")
-        
-        # Third part
-        config.append(f"pon-onu-mng gpon_onu-{split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]}:{split_fsp[3]}")
-        config.append(f"service HSI gemport 1 vlan {vlan}")
-        
-        if sn.lower().startswith('zte'):
-            if is_pppoe:
-                config.append(f"wan-ip ipv4 mode pppoe username {sn} password {password} vlan-profile vlan{vlan} host 1")
-                config.append(f"wan-ip ipv4 mode pppoe username {sn} password {password} vlan-profile wan{vlan} host 1")
-            else:
-                config.append(f"wan-ip ipv4 mode dhcp vlan-profile vlan{vlan} host 1")
-                
-        config.extend([
-            f"vlan port eth_0/1 mode tag vlan {vlan}",
-            f"vlan port eth_0/2 mode tag vlan {vlan}",
-            "dhcp-ip ethuni eth_0/1 from-onu",
-            "dhcp-ip ethuni eth_0/2 from-onu",
-            "end"
-        ])
-        
-        return '\n'.join(config)
-    
-    def generate_c320_config(self, **kwargs) -> str:
-        """Generate ZTE C320 configuration"""
-        sn = kwargs['sn']
-        fsp = kwargs['fsp']
-        vlan = kwargs['vlan']
-        sid = kwargs['sid']
-        name = kwargs['name']
-        password = kwargs.get('password', '')
-        is_replacement = kwargs['is_replacement']
-        is_pppoe = kwargs['is_pppoe']
-        
-        split_fsp = re.split(r'\D', fsp)
-        config = []
-        
-        # First part
-        config.append("config t")
-        config.append(f"interface gpon-olt_{split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]}")
-        
-        if is_replacement:
-            config.append(f"no onu {split_fsp[3]}")
-            
-        config.append(f"onu {split_fsp[3]} type ZTEG-F609 sn {sn}")
-        config.append("exit")
-        
-        # Second part
-        config.append(f"interface gpon-onu_{split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]}:{split_fsp[3]}")
-        config.append(f"description {sid}-{name}")
-        config.append("sn-bind enable sn")
-        config.append(f"tcont 1 name HSI profile {'PPPOE' if is_pppoe else self.SERVICES[vlan]+'Mbps'}")
-        config.append("gemport 1 name HSI tcont 1")
-        config.append(f"service-port 1 vport 1 user-vlan {vlan} vlan {vlan}")
-        config.append("exit")
-        
-        # Third part
-        if sn.lower().startswith('zte'):
-            config.append(f"pon-onu-mng gpon-onu_{split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]}:{split_fsp[3]}")
-            config.append(f"service HSI gemport 1 vlan {vlan}")
-            
-            if is_pppoe:
-                config.append(f"wan-ip 1 mode pppoe username {sn} password {password} vlan-profile vlan{vlan} host 1")
-            else:
-                config.append(f"wan-ip 1 mode dhcp vlan-profile vlan{vlan} host 1")
-                config.append(f"wan-ip 1 mode dhcp vlan-profile wan{vlan} host 1")
-                
-            config.extend([
-                f"vlan port eth_0/1 mode tag vlan {vlan}",
-                "dhcp-ip ethuni eth_0/1 from-onu",
-                "end"
-            ])
-        else:
-            config.extend([
-                f"pon-onu-mng gpon-onu_{split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]}:{split_fsp[3]}",
-                f"service HSI gemport 1 vlan {vlan}",
-                f"vlan port eth_0/1 mode tag vlan {vlan}",
-                "dhcp-ip ethuni eth_0/1 from-onu",
-                "end"
-            ])
-            
-        return '\n'.join(config)
-    
-    def generate_bdcom_config(self, **kwargs) -> str:
-        """Generate BDCOM configuration"""
-        sn = kwargs['sn']
-        fsp = kwargs['fsp']
-        vlan = kwargs['vlan']
-        sid = kwargs['sid']
-        name = kwargs['name']
-        password = kwargs.get('password', '')
-        is_pppoe = kwargs['is_pppoe']
-        
-        split_fsp = re.split(r'\D', fsp)
-        config = ["config"]
-        
-        config.append(f"interface gpoN 0/{split_fsp[0]}:{split_fsp[1]}")
-        config.append(f"description {sid}-{name}")
-        
-        if sn.lower().startswith('5a54'):
-            config.append("gpon onu flow-mapping-profile ZTE")
-            
-        config.extend([
-            "gpon onu wan 1 admin-status enable",
-            "gpon onu wan 1 nat enable",
-            "gpon onu wan 1 service-type internet",
-            "gpon onu wan 1 connection-type pppoe"
-        ])
-        
-        if is_pppoe:
-            config.append(f"gpon onu wan 1 pppoe username {sn} password {password}")
-            
-        config.extend([
-            f"gpon onu wan 1 tci vlan {vlan}",
-            "gpon onu wan 1 bind lan1 lan2 ssid1",
-            "gpon onu wan 1 auto-get-dns-address enable",
-            "gpon onu wan 1 lan-dhcp enable",
-            "quit",
-            "write all"
-        ])
-        
-        return '\n'.join(config)
-    
-    def generate_huawei_config(self, **kwargs) -> str:
-        """Generate Huawei configuration"""
-        sn = kwargs['sn']
-        fsp = kwargs['fsp']
-        vlan = kwargs['vlan']
-        sid = kwargs['sid']
-        name = kwargs['name']
-        password = kwargs.get('password', '')
-        is_replacement = kwargs['is_replacement']
-        is_pppoe = kwargs['is_pppoe']
-        use_nce = self.use_nce.get()
-        
-        split_fsp = re.split(r'\D', fsp)
-        config = ["config"]
-        
-        # First part - replacement logic
-        if is_replacement:
-            config.extend([
-                f"undo service-port {self.serviceport_entry.get()}",
-                f"interface gpon {split_fsp[0]}/{split_fsp[1]}",
-                f"ont delete {split_fsp[2]} {split_fsp[3]}"
-            ])
-        else:
-            config.append(f"interface gpon {split_fsp[0]}/{split_fsp[1]}")
-        
-        # Second part - PPPoE configuration
-        if is_pppoe:
-            if use_nce:
-                config.extend([
-                    f"ont add {split_fsp[2]} {split_fsp[3]} sn-auth {sn} omci "
-                    f"ont-lineprofile-name ICONNET.PPPOE.{vlan} "
-                    f"ont-srvprofile-name ICONNET.PPPOE.{vlan} desc {sid}-{name}",
-                    "",
-                    f"ont ipconfig {split_fsp[2]} {split_fsp[3]} pppoe vlan {vlan} "
-                    f"priority 0 user-account username {sn} password {password}",
-                    "",
-                    f"ont port route {split_fsp[2]} {split_fsp[3]} eth 1 enable",
-                    "",
-                    f"ont port route {split_fsp[2]} {split_fsp[3]} eth 2 enable",
-                    "",
-                    "quit",
-                    "",
-                    f"service-port vlan {vlan} gpon {split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]} "
-                    f"ont {split_fsp[3]} gemport 1 multi-service user-vlan {vlan} tag-transform translate",
-                    "",
-                    "quit"
-                ])
-            else:
-                config.extend([
-                    f"ont add {split_fsp[2]} {split_fsp[3]} sn-auth {sn} omci "
-                    f"ont-lineprofile-name ICONNET.PPPOE.{vlan} "
-                    f"ont-srvprofile-name ICONNET.PPPOE.{vlan} desc {sid}-{name}",
-                    "",
-                    f"ont ipconfig {split_fsp[2]} {split_fsp[3]} pppoe vlan {vlan} "
-                    f"priority 0 user-account username {sn} password {password}",
-                    "",
-                    f"ont internet-config {split_fsp[2]} {split_fsp[3]} ip-index 0",
-                    "",
-                    f"ont wan-config {split_fsp[2]} {split_fsp[3]} ip-index 0 profile-name ICONNET.AUTOPROV",
-                    "",
-                    f"ont policy-route-config {split_fsp[2]} {split_fsp[3]} profile-name ICONNET.AUTOPROV",
-                    "",
-                    f"ont port route {split_fsp[2]} {split_fsp[3]} eth 1 enable",
-                    "",
-                    f"ont port route {split_fsp[2]} {split_fsp[3]} eth 2 enable",
-                    "",
-                    "quit",
-                    "",
-                    f"service-port vlan {vlan} gpon {split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]} "
-                    f"ont {split_fsp[3]} gemport 1 multi-service user-vlan {vlan} tag-transform translate",
-                    "",
-                    "quit"
-                ])
-        
-        # Third part - IPoE configuration
-        else:
-            if vlan in ['2828', '2820', '2830', '2819']:
-                config.extend([
-                    f"ont add {split_fsp[2]} {split_fsp[3]} sn-auth {sn} omci "
-                    f"ont-lineprofile-name AUTOPROV.{self.SERVICES[vlan]}-{vlan} "
-                    f"ont-srvprofile-name AUTOPROV.{self.SERVICES[vlan]}-{vlan} desc {sid}-{name}",
-                    "",
-                    f"ont ipconfig {split_fsp[2]} {split_fsp[3]} dhcp vlan {vlan} priority 0",
-                    "",
-                    f"ont internet-config {split_fsp[2]} {split_fsp[3]} ip-index 0",
-                    "",
-                    f"ont wan-config {split_fsp[2]} {split_fsp[3]} ip-index 0 profile-name ICONNET.AUTOPROV",
-                    "",
-                    f"ont policy-route-config {split_fsp[2]} {split_fsp[3]} profile-name ICONNET.AUTOPROV",
-                    "",
-                    f"ont port route {split_fsp[2]} {split_fsp[3]} eth 1 enable",
-                    "",
-                    f"ont port route {split_fsp[2]} {split_fsp[3]} eth 2 enable",
-                    "",
-                    "quit",
-                    "",
-                    f"service-port vlan {vlan} gpon {split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]} "
-                    f"ont {split_fsp[3]} gemport 1 multi-service user-vlan {vlan} tag-transform translate",
-                    "",
-                    "quit"
-                ])
-            else:
-                config.extend([
-                    f"ont add {split_fsp[2]} {split_fsp[3]} sn-auth {sn} omci "
-                    f"ont-lineprofile-name AUTOPROV.{self.SERVICES[vlan]} "
-                    f"ont-srvprofile-name AUTOPROV.{self.SERVICES[vlan]} desc {sid}-{name}",
-                    "",
-                    f"ont ipconfig {split_fsp[2]} {split_fsp[3]} dhcp vlan {vlan} priority 0",
-                    "",
-                    f"ont internet-config {split_fsp[2]} {split_fsp[3]} ip-index 0",
-                    "",
-                    f"ont wan-config {split_fsp[2]} {split_fsp[3]} ip-index 0 profile-name ICONNET.AUTOPROV",
-                    "",
-                    f"ont policy-route-config {split_fsp[2]} {split_fsp[3]} profile-name ICONNET.AUTOPROV",
-                    "",
-                    f"ont port route {split_fsp[2]} {split_fsp[3]} eth 1 enable",
-                    "",
-                    f"ont port route {split_fsp[2]} {split_fsp[3]} eth 2 enable",
-                    "",
-                    "quit",
-                    "",
-                    f"service-port vlan {vlan} gpon {split_fsp[0]}/{split_fsp[1]}/{split_fsp[2]} "
-                    f"ont {split_fsp[3]} gemport 1 multi-service user-vlan {vlan} tag-transform translate",
-                    "",
-                    "quit"
-                ])
-        
-        return '\n'.join(config)
 
-    def validate_serviceport(self) -> bool:
-        """Validate serviceport for Huawei OLT"""
-        if self.olt_brand.get() == "huawei" and self.registration_type.get() == "replace":
-            if not hasattr(self, 'serviceport_entry'):
-                self.serviceport_entry = ttk.Entry(self.device_frame)
-                ttk.Label(self.device_frame, text="Serviceport:").pack(fill=tk.X)
-                self.serviceport_entry.pack(fill=tk.X, pady=(0, 10))
-            
-            if not self.serviceport_entry.get() or not self.serviceport_entry.get().isdigit():
-                messagebox.showerror("Error", "Invalid Serviceport")
-                return False
-        return True
+    def create_config_string(self) -> str:
+        """Create the configuration string based on selected options"""
+        return config_core.create_config_string(**self.get_input_values())
 
     def validate_inputs(self) -> bool:
         """Validate all input fields"""
-        # Basic validation
-        if not self.sn_entry.get() or len(self.sn_entry.get()) not in [12, 16]:
-            messagebox.showerror("Error", "Invalid Serial Number")
-            return False
-        
-        # FSP validation
-        fsp_patterns = {
-            "raisecom": r'^\d/\d+/\d+$',
-            "zte_c610": r'^\d/\d/\d+/\d+$',
-            "zte_c320": r'^\d/\d/\d+/\d+$',
-            "bdcom": r'^\d+/\d+$',
-            "huawei": r'^\d/\d/\d+/\d+$'
-        }
-        
-        if not re.match(fsp_patterns[self.olt_brand.get()], self.fsp_entry.get()):
-            messagebox.showerror("Error", "Invalid FSP format")
-            return False
-        
-        # VLAN validation
-        if not self.vlan_entry.get() or self.vlan_entry.get() not in self.VLAN_RANGE:
-            messagebox.showerror("Error", "Invalid VLAN")
-            return False
-        
-        # Customer information validation
-        if not self.sid_entry.get() or not self.sid_entry.get().isdigit():
-            messagebox.showerror("Error", "Invalid SID")
-            return False
-        
-        if not self.name_entry.get():
-            messagebox.showerror("Error", "Customer Name is required")
-            return False
-        
-        # PPPoE password validation
-        if (self.connection_type.get() == "pppoe" and 
-            not self.use_today_password.get() and 
-            not self.password_entry.get()):
-            messagebox.showerror("Error", "PPPoE password is required")
-            return False
-        
-        # Huawei-specific validation
-        if not self.validate_serviceport():
+        errors = validator.validate(
+            **self.get_input_values(),
+            use_today_password=self.use_today_password.get()
+        )
+        if errors:
+            messagebox.showerror("Error", errors[0].message)
             return False
         
         return True
@@ -730,33 +487,204 @@ class OLTConfigGenerator:
         
         # Show/hide serviceport for Huawei replacement
         if brand == "huawei" and is_replacement:
-            if not hasattr(self, 'serviceport_entry'):
-                self.serviceport_entry = ttk.Entry(self.device_frame)
-                ttk.Label(self.device_frame, text="Serviceport:").pack(fill=tk.X)
-                self.serviceport_entry.pack(fill=tk.X, pady=(0, 10))
-        elif hasattr(self, 'serviceport_entry'):
-            self.serviceport_entry.pack_forget()
+            self.serviceport_frame.pack(fill=tk.X)
+        else:
+            self.serviceport_frame.pack_forget()
 
     # Add trace to variables to update dynamic fields
     def add_traces(self):
-        """Add traces to variables to update dynamic fields"""
+        """Add traces to variables to update dynamic fields and the live preview"""
         self.olt_brand.trace_add('write', self.update_dynamic_fields)
         self.registration_type.trace_add('write', self.update_dynamic_fields)
         self.connection_type.trace_add('write', self.update_dynamic_fields)
+        
+        for variable in (self.olt_brand, self.registration_type, self.connection_type,
+                         self.use_today_password, self.use_nce):
+            variable.trace_add('write', self.schedule_preview)
+        for entry in (self.sn_entry, self.fsp_entry, self.vlan_entry, self.serviceport_entry,
+                      self.sid_entry, self.name_entry, self.password_entry):
+            entry.bind('<KeyRelease>', self.schedule_preview, add='+')
+            
+    def schedule_preview(self, *args):
+        """Re-render the preview once the input has been quiet for PREVIEW_DELAY_MS"""
+        if self.preview_job:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DELAY_MS, self.preview)
+        
+    def preview(self):
+        """Render the form as it is, without dialogs; invalid input keeps the last output"""
+        self.preview_job = None
+        values = self.get_input_values()
+        if (values["brand"] == "huawei" and values["is_replacement"] and not values["serviceport"]
+                and len(self.serviceport_index)):
+            try:
+                values["serviceport"] = self.serviceport_index.resolve(
+                    "", values["fsp"].strip(), values["vlan"].strip())
+            except ServicePortNotFound:
+                pass
+        
+        errors = validator.validate(**values, use_today_password=self.use_today_password.get())
+        if errors:
+            self.output_frame.config(text=f"Generated Configuration (preview: {errors[0].message})")
+            return
+        try:
+            config = config_core.create_config_string(**values)
+        except ValueError as e:
+            self.output_frame.config(text=f"Generated Configuration (preview: {str(e)})")
+            return
+        
+        # A background render started before this edit is out of date now
+        self.render_token += 1
+        self.output_frame.config(text="Generated Configuration")
+        self.update_output(config)
             
             
+    def set_input_values(self, values: Dict):
+        """Fill the form from create_config_string arguments"""
+        self.olt_brand.set(values["brand"])
+        self.registration_type.set("replace" if values["is_replacement"] else "new")
+        self.connection_type.set("pppoe" if values["is_pppoe"] else "ipoe")
+        self.use_nce.set(values["use_nce"])
+        
+        today = date.today().strftime('%Y%m%d')
+        self.use_today_password.set(not values["is_pppoe"] or values["password"] == today)
+        self.toggle_password_entry()
+        
+        for entry, field in ((self.sn_entry, "sn"), (self.fsp_entry, "fsp"), (self.vlan_entry, "vlan"),
+                             (self.sid_entry, "sid"), (self.name_entry, "name"),
+                             (self.serviceport_entry, "serviceport"), (self.password_entry, "password")):
+            state = entry.cget("state")
+            entry.config(state="normal")
+            entry.delete(0, tk.END)
+            if field != "password" or not self.use_today_password.get():
+                entry.insert(0, values[field])
+            entry.config(state=state)
+        
+    def queue_row(self, record_id: int) -> tuple:
+        """Treeview values of a queued record, its status being the first validation error"""
+        record = self.record_queue.get(record_id)
+        values = record.values
+        errors = self.record_queue.errors(record_id)
+        return (record.olt, values["brand"], values["sn"], values["fsp"], values["vlan"], values["name"],
+                "replace" if values["is_replacement"] else "new", errors[0].message if errors else "OK")
+        
+    def selected_record_ids(self) -> List[int]:
+        return [int(item) for item in self.queue_tree.selection()]
+        
+    def refresh_queue_status(self):
+        valid = sum(1 for record in self.record_queue if not self.record_queue.errors(record.id))
+        self.queue_status.config(text=f"{len(self.record_queue)} queued, {valid} valid")
+        
+    def add_to_queue(self):
+        """Queue the form as a new record; invalid records are queued with their error"""
+        if not self.fill_serviceport():
+            return
+        record_id = self.record_queue.add(self.get_input_values(), self.queue_olt_entry.get())
+        self.queue_tree.insert("", tk.END, iid=str(record_id), values=self.queue_row(record_id))
+        self.refresh_queue_status()
+        
+    def update_queued_record(self):
+        """Replace the selected record with the form"""
+        selected = self.selected_record_ids()
+        if len(selected) != 1:
+            messagebox.showwarning("Warning", "Select one queued record to update!")
+            return
+        if not self.fill_serviceport():
+            return
+        record_id = selected[0]
+        self.record_queue.update(record_id, self.get_input_values(), self.queue_olt_entry.get())
+        self.queue_tree.item(str(record_id), values=self.queue_row(record_id))
+        self.refresh_queue_status()
+        
+    def load_queued_record(self, event=None):
+        """Put the selected record into the form for editing and show its config"""
+        selected = self.selected_record_ids()
+        if len(selected) != 1:
+            return
+        record = self.record_queue.get(selected[0])
+        self.set_input_values(record.values)
+        self.queue_olt_entry.delete(0, tk.END)
+        self.queue_olt_entry.insert(0, record.olt)
+        config = self.record_queue.config(record.id)
+        if config is not None:
+            self.update_output(config)
+        
+    def remove_queued_records(self):
+        for record_id in self.selected_record_ids():
+            self.record_queue.remove(record_id)
+            self.queue_tree.delete(str(record_id))
+        self.refresh_queue_status()
+        
+    def clear_queue(self):
+        self.record_queue.clear()
+        self.queue_tree.delete(*self.queue_tree.get_children())
+        self.queue_status.config(text="Queue is empty")
+        
+    def copy_queue(self):
+        """Copy every valid queued config at once, reported in the status line instead of a dialog"""
+        text = self.record_queue.export_text()
+        if not text:
+            self.queue_status.config(text="No valid records to copy")
+            return
+        import pyperclip
+        with instrument.timed("clipboard"):
+            pyperclip.copy(text)
+        self.queue_status.config(text="Queue copied to clipboard")
+        
+    def save_queue(self):
+        """Save every valid queued config to one file"""
+        path = filedialog.asksaveasfilename(
+            title="Save Queue",
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write(self.record_queue.export_text() + '\n')
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save queue: {str(e)}")
+            return
+        self.queue_status.config(text=f"Queue saved to {path}")
+        
+    def export_queue_scripts(self):
+        """Write one script per OLT into a directory, as bulk.py does"""
+        directory = filedialog.askdirectory(title="Export Scripts")
+        if not directory:
+            return
+        try:
+            count = self.record_queue.export_scripts(directory)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export scripts: {str(e)}")
+            return
+        self.queue_status.config(text=f"{count} scripts written to {directory}")
+        
     def copy_to_clipboard(self):
         """Copy generated configuration to clipboard"""
-        config = self.output_text.get(1.0, tk.END).strip()
+        # While the output is still being inserted the pane holds only part of it
+        config = (self.output_config if self.output_job else self.output_text.get(1.0, tk.END)).strip()
         if config:
-            pyperclip.copy(config)
+            import pyperclip
+            with instrument.timed("clipboard"):
+                pyperclip.copy(config)
             messagebox.showinfo("Success", "Configuration copied to clipboard!")
         else:
             messagebox.showwarning("Warning", "No configuration to copy!")
 
 def main():
+    # OLT_METRICS=metrics.prom records every render and writes it on exit (see instrument.py)
+    metrics_path = os.environ.get("OLT_METRICS")
+    if metrics_path:
+        instrument.enable()
+    # OLT_PROFILES=profiles.json uses that profile catalog, reloaded when the file changes (see profile_catalog.py)
+    profiles_path = os.environ.get("OLT_PROFILES")
+    if profiles_path:
+        profile_catalog.use(profiles_path)
     app = OLTConfigGenerator()
     app.root.mainloop()
+    if metrics_path:
+        instrument.METRICS.write_prometheus(metrics_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
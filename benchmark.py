@@ -0,0 +1,207 @@
+"""Render benchmark and golden outputs
+
+Covers every brand x connection type x registration type combination (plus
+use_nce for Huawei) on generated records:
+
+    python benchmark.py                     # benchmark every combination
+    python benchmark.py --json run.json     # also save the results
+    python benchmark.py --compare run.json  # compare against an earlier run
+    python benchmark.py --update-golden     # accept intentional output changes
+    python -m pytest test_benchmark.py      # check the golden outputs (and time them with pytest-benchmark)
+
+The golden file holds the exact output of generate_*_config for the generated
+records, so an optimization is only accepted when it stays byte-identical;
+test_benchmark.py checks it with the rest of the test suite. Every tenth
+record uses a VLAN of the PPPoE-only range 2900-2999 where the brand can
+render it (PPPoE, or IPoE for brands whose templates read no profile).
+"""
+from typing import Dict, List, Tuple
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import config_core
+import profile_catalog
+import templates
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_golden.json")
+
+FSP_FORMATS = {
+    "raisecom": "{slot}/{port}/{onu}",
+    "zte_c610": "1/{slot}/{port}/{onu}",
+    "zte_c320": "1/{slot}/{port}/{onu}",
+    "bdcom": "{port}/{onu}",
+    "huawei": "0/{slot}/{port}/{onu}"
+}
+
+# SN prefixes per brand: the vendor's own ONU first, then a foreign one
+SN_PREFIXES = {
+    "raisecom": ("RCMG", "HWTC"),
+    "zte_c610": ("ZTEG", "HWTC"),
+    "zte_c320": ("ZTEG", "HWTC"),
+    "bdcom": ("5A544547", "HWTC"),
+    "huawei": ("HWTC", "48575443")
+}
+
+
+def combinations() -> List[Tuple[str, bool, bool, bool]]:
+    """Every (brand, is_pppoe, is_replacement, use_nce) combination"""
+    combos = []
+    for brand in config_core.BRANDS:
+        for is_pppoe in (True, False):
+            for is_replacement in (False, True):
+                for use_nce in ((False, True) if brand == "huawei" else (False,)):
+                    combos.append((brand, is_pppoe, is_replacement, use_nce))
+    return combos
+
+
+def combination_name(brand: str, is_pppoe: bool, is_replacement: bool, use_nce: bool) -> str:
+    name = f"{brand}-{'pppoe' if is_pppoe else 'ipoe'}-{'replace' if is_replacement else 'new'}"
+    return name + "-nce" if use_nce else name
+
+
+def generate_records(brand: str, is_pppoe: bool, is_replacement: bool, use_nce: bool,
+                     count: int = 20, seed: int = 0) -> List[Dict]:
+    """Deterministic generate_*_config arguments for one combination"""
+    rng = random.Random(f"{combination_name(brand, is_pppoe, is_replacement, use_nce)}-{seed}")
+    vlans = sorted(profile_catalog.current().table().bandwidths())
+    records = []
+    for i in range(count):
+        prefix = SN_PREFIXES[brand][i % 2]
+        sn = prefix + ''.join(rng.choice("0123456789ABCDEF") for _ in range(16 - len(prefix)))
+        if len(prefix) == 4 and i % 4 < 2:
+            sn = sn[:12]
+        records.append({
+            "sn": sn,
+            "fsp": FSP_FORMATS[brand].format(slot=rng.randint(1, 9), port=rng.randint(0, 15),
+                                             onu=rng.randint(1, 127)),
+            "vlan": rng.choice(vlans),
+            "sid": str(rng.randint(100000000, 999999999)),
+            "name": f"Customer.{rng.randint(1, 9999)}",
+            "password": "20261018" if is_pppoe else "",
+            "is_replacement": is_replacement,
+            "is_pppoe": is_pppoe,
+            "use_nce": use_nce,
+            "serviceport": str(rng.randint(1, 65535)) if is_replacement else ""
+        })
+        if i % 10 == 9 and (is_pppoe or not templates.template_for(brand, sn, "2900", is_replacement,
+                                                                    is_pppoe, use_nce).needs_profile):
+            records[-1]["vlan"] = str(2900 + i)
+    return records
+
+
+def render_all(brand: str, records: List[Dict]) -> List[str]:
+    generator = config_core.CONFIG_GENERATORS[brand]
+    return [generator(**record) for record in records]
+
+
+def build_golden() -> Dict[str, List[str]]:
+    golden = {}
+    for combo in combinations():
+        golden[combination_name(*combo)] = render_all(combo[0], generate_records(*combo))
+    return golden
+
+
+def benchmark(brand: str, records: List[Dict], rounds: int, min_time: float) -> Dict:
+    """Time one combination, pytest-benchmark style stats per record render"""
+    generator = config_core.CONFIG_GENERATORS[brand]
+
+    # Calibrate iterations so one round takes at least min_time
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for record in records:
+                generator(**record)
+        if time.perf_counter() - started >= min_time:
+            break
+        iterations *= 2
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for record in records:
+                generator(**record)
+        samples.append((time.perf_counter() - started) / (iterations * len(records)))
+
+    mean = statistics.mean(samples)
+    return {
+        "min": min(samples),
+        "max": max(samples),
+        "mean": mean,
+        "median": statistics.median(samples),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": rounds,
+        "iterations": iterations * len(records),
+        "ops": 1 / mean if mean else 0.0
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark config rendering for every combination")
+    parser.add_argument('--json', metavar='FILE', help="Write the results as JSON")
+    parser.add_argument('--compare', metavar='FILE', help="Compare means against an earlier --json run")
+    parser.add_argument('--update-golden', action='store_true', help="Rewrite the golden outputs and exit")
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--min-time', type=float, default=0.02, help="Minimum seconds per round")
+    parser.add_argument('-k', metavar='TEXT', default='', help="Only run combinations containing TEXT")
+    args = parser.parse_args(argv)
+
+    if args.update_golden:
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as handle:
+            json.dump(build_golden(), handle, indent=1, sort_keys=True)
+            handle.write('\n')
+        print(f"Golden outputs written to {GOLDEN_FILE}")
+        return 0
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = {bench["name"]: bench["stats"] for bench in json.load(handle)["benchmarks"]}
+
+    results = []
+    print(f"{'name':32s} {'mean':>10s} {'min':>10s} {'ops/s':>10s}")
+    for combo in combinations():
+        name = combination_name(*combo)
+        if args.k not in name:
+            continue
+
+        stats = benchmark(combo[0], generate_records(*combo), args.rounds, args.min_time)
+        results.append({
+            "name": name,
+            "group": combo[0],
+            "params": dict(zip(("brand", "is_pppoe", "is_replacement", "use_nce"), combo)),
+            "stats": stats
+        })
+
+        line = f"{name:32s} {stats['mean'] * 1e6:8.2f}us {stats['min'] * 1e6:8.2f}us {stats['ops']:10.0f}"
+        if name in baseline:
+            line += f"  {stats['mean'] / baseline[name]['mean']:6.2f}x vs baseline"
+        print(line)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump({
+                "machine_info": {
+                    "python_version": platform.python_version(),
+                    "python_implementation": platform.python_implementation(),
+                    "machine": platform.machine(),
+                    "system": platform.system()
+                },
+                "datetime": datetime.now().isoformat(),
+                "benchmarks": results
+            }, handle, indent=2)
+            handle.write('\n')
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
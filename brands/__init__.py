@@ -0,0 +1,104 @@
+"""Brand registry: every OLT brand as a plugin module, imported on first use
+
+Built-in brands live in this package, one module per vendor. Other packages
+add brands through the "olt_config.brands" entry point group, for example in
+their pyproject.toml:
+
+    [project.entry-points."olt_config.brands"]
+    zte_c300 = "olt_c300.brand"
+
+An entry point names a module with a BRANDS list (or a single Brand). A brand
+module is only imported when one of its brands is used, and the installed
+entry points are only scanned when a brand is not built in (or names() is
+called), so a shop that runs one brand only loads that one.
+
+A Brand declares everything the generator needs to know about it:
+    label         radio button text in the GUI
+    fsp_format    FSP hint shown in the GUI
+    fsp_pattern   regular expression a valid FSP matches (validator.py)
+    onu_ids       first and last ONU id of a port (onu_alloc.py)
+    template      vendor_prefix, fsp_parts, special_vlans and lines (templates.py)
+    mode          "enter", "exit" and "end" lines: entering the configuration
+                  mode, leaving a context, leaving the configuration mode
+    port_context  regular expression of the per-port context records share,
+                  None when a brand only has ONU contexts (coalesce.py)
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import importlib
+
+ENTRY_POINT_GROUP = "olt_config.brands"
+
+# Built-in brand -> module, in the order the GUI lists them
+BUILTIN = {
+    "raisecom": "brands.raisecom",
+    "zte_c610": "brands.zte",
+    "zte_c320": "brands.zte",
+    "bdcom": "brands.bdcom",
+    "huawei": "brands.huawei",
+}
+
+
+class Brand(NamedTuple):
+    """One OLT brand or model"""
+    name: str
+    label: str
+    fsp_format: str
+    fsp_pattern: str
+    template: Dict
+    mode: Dict[str, str]
+    port_context: Optional[str] = None
+    onu_ids: Tuple[int, int] = (1, 128)
+
+
+class UnknownBrand(ValueError):
+    """Raised for a brand that is neither built in nor installed"""
+
+
+_loaded: Dict[str, Brand] = {}
+
+# name -> entry point, filled on the first lookup that needs it
+_entry_points: Optional[Dict] = None
+
+
+def _installed() -> Dict:
+    global _entry_points
+    if _entry_points is None:
+        # Imported here: scanning the installed distributions costs more than loading a brand
+        from importlib.metadata import entry_points
+        _entry_points = {entry_point.name: entry_point for entry_point in entry_points(group=ENTRY_POINT_GROUP)}
+    return _entry_points
+
+
+def register(brand: Brand):
+    """Add or replace a brand, for plugins that are not installed as a package"""
+    _loaded[brand.name] = brand
+
+
+def _register_module(module):
+    declared = getattr(module, "BRANDS", module)
+    for brand in [declared] if isinstance(declared, Brand) else declared:
+        register(brand)
+
+
+def get(name: str) -> Brand:
+    """The brand called name, importing its module on first use"""
+    brand = _loaded.get(name)
+    if brand is not None:
+        return brand
+
+    if name in BUILTIN:
+        _register_module(importlib.import_module(BUILTIN[name]))
+    elif name in _installed():
+        _register_module(_installed()[name].load())
+    if name not in _loaded:
+        raise UnknownBrand(f"Unknown OLT brand: {name}")
+    return _loaded[name]
+
+
+def is_known(name: str) -> bool:
+    return name in _loaded or name in BUILTIN or name in _installed()
+
+
+def names() -> List[str]:
+    """Every brand: built-in ones first, then installed and registered ones"""
+    return list(dict.fromkeys([*BUILTIN, *_installed(), *_loaded]))
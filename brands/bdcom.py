@@ -0,0 +1,35 @@
+"""BDCOM OLTs: "P/ONU" FSPs, every setting inside the ONU's own interface"""
+from brands import Brand
+
+TEMPLATE = {
+    "vendor_prefix": "5a54",
+    "fsp_parts": 2,
+    "lines": [
+        "config",
+        "interface gpoN 0/{port}:{onu}",
+        "description {sid}-{name}",
+        ("vendor_onu", "gpon onu flow-mapping-profile ZTE"),
+        "gpon onu wan 1 admin-status enable",
+        "gpon onu wan 1 nat enable",
+        "gpon onu wan 1 service-type internet",
+        "gpon onu wan 1 connection-type pppoe",
+        ("pppoe", "gpon onu wan 1 pppoe username {sn} password {password}"),
+        "gpon onu wan 1 tci vlan {vlan}",
+        "gpon onu wan 1 bind lan1 lan2 ssid1",
+        "gpon onu wan 1 auto-get-dns-address enable",
+        "gpon onu wan 1 lan-dhcp enable",
+        "quit",
+        "write all"
+    ]
+}
+
+BRANDS = [
+    Brand(
+        name="bdcom",
+        label="BDCOM",
+        fsp_format="Format: P/Onu id",
+        fsp_pattern=r'^\d+/\d+$',
+        template=TEMPLATE,
+        mode={"enter": "config", "exit": "quit", "end": "write all"},
+    ),
+]
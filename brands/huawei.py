@@ -0,0 +1,51 @@
+"""Huawei OLTs: "F/S/P/ONU" FSPs, ONUs are added in the interface of their board"""
+from brands import Brand
+
+TEMPLATE = {
+    "fsp_parts": 4,
+    "lines": [
+        "config",
+        ("replace", "undo service-port {serviceport}"),
+        "interface gpon {board}",
+        ("replace", "ont delete {pon} {onu}"),
+        "ont add {pon} {onu} sn-auth {sn} omci "
+        "ont-lineprofile-name {line_profile} ont-srvprofile-name {srv_profile} desc {sid}-{name}",
+        "",
+        ("pppoe", "ont ipconfig {pon} {onu} pppoe vlan {vlan} "
+                  "priority 0 user-account username {sn} password {password}"),
+        ("!pppoe", "ont ipconfig {pon} {onu} dhcp vlan {vlan} priority 0"),
+        "",
+        ("!nce", [
+            "ont internet-config {pon} {onu} ip-index 0",
+            "",
+            "ont wan-config {pon} {onu} ip-index 0 profile-name ICONNET.AUTOPROV",
+            "",
+            "ont policy-route-config {pon} {onu} profile-name ICONNET.AUTOPROV",
+            ""
+        ]),
+        "ont port route {pon} {onu} eth 1 enable",
+        "",
+        "ont port route {pon} {onu} eth 2 enable",
+        "",
+        "quit",
+        "",
+        "service-port vlan {vlan} gpon {port} "
+        "ont {onu} gemport 1 multi-service user-vlan {vlan} tag-transform translate",
+        "",
+        "quit"
+    ]
+}
+
+BRANDS = [
+    Brand(
+        name="huawei",
+        label="Huawei",
+        fsp_format="Format: F/S/P/Onu id",
+        fsp_pattern=r'^\d/\d/\d+/\d+$',
+        template=TEMPLATE,
+        # Huawei leaves a context and the configuration mode with the same "quit"
+        mode={"enter": "config", "exit": "quit", "end": "quit"},
+        port_context=r'^interface gpon \d+/\d+$',
+        onu_ids=(0, 127),
+    ),
+]
@@ -0,0 +1,41 @@
+"""Raisecom OLTs: "S/P/ONU" FSPs, ONU settings through "gpon-onu S/P/ONU" (own ONUs only)"""
+from brands import Brand
+
+TEMPLATE = {
+    "vendor_prefix": "rcm",
+    "fsp_parts": 3,
+    "lines": [
+        "config",
+        "interface gpon-olt {port}",
+        ("replace", "no create gpon-onu {onu}"),
+        "create gpon-onu {onu} sn {sn} line-profile-id 1 service-profile-id 1",
+        "quit",
+        "interface gpon-onu {fsp}",
+        "description {sid}-{name}",
+        "quit",
+        ("vendor_onu", "gpon-onu {fsp}"),
+        ("vendor_onu pppoe", [
+            "iphost 1 mode pppoe",
+            "iphost 1 pppoe username {sn} password {password}"
+        ]),
+        ("vendor_onu !pppoe", "iphost 1 mode dhcp"),
+        ("vendor_onu", [
+            "iphost 1 vlan {vlan}",
+            "iphost 1 service Internet",
+            "iphost 1 service mode route nat enable cos 0 portlist 1,2 ssidlist 1",
+            "end"
+        ])
+    ]
+}
+
+BRANDS = [
+    Brand(
+        name="raisecom",
+        label="Raisecom",
+        fsp_format="Format: S/P/Onu id",
+        fsp_pattern=r'^\d/\d+/\d+$',
+        template=TEMPLATE,
+        mode={"enter": "config", "exit": "quit", "end": "end"},
+        port_context=r'^interface gpon-olt \S+$',
+    ),
+]
@@ -0,0 +1,86 @@
+"""ZTE C610 and C320 OLTs: "F/S/P/ONU" FSPs, C610 "gpon_olt-F/S/P" and C320 "gpon-olt_F/S/P" interfaces"""
+from brands import Brand
+
+C610_TEMPLATE = {
+    "vendor_prefix": "zte",
+    "fsp_parts": 4,
+    "lines": [
+        "config t",
+        "interface {gpon_olt}",
+        ("replace", "no onu {onu}"),
+        "onu {onu} type ZTEG-F609 sn {sn}",
+        "exit",
+        "interface {gpon_onu}:{onu}",
+        "description {sid}-{name}",
+        "tcont 1 name HSI profile {tcont_profile}",
+        "gemport 1 name HSI tcont 1",
+        "exit",
+        "interface {vport}.{onu}:1",
+        "service-port 1 user-vlan {vlan} vlan {vlan}",
+        "exit",
+        "pon-onu-mng {gpon_onu}:{onu}",
+        "service HSI gemport 1 vlan {vlan}",
+        ("vendor_onu pppoe", [
+            "wan-ip ipv4 mode pppoe username {sn} password {password} vlan-profile vlan{vlan} host 1",
+            "wan-ip ipv4 mode pppoe username {sn} password {password} vlan-profile wan{vlan} host 1"
+        ]),
+        ("vendor_onu !pppoe", "wan-ip ipv4 mode dhcp vlan-profile vlan{vlan} host 1"),
+        "vlan port eth_0/1 mode tag vlan {vlan}",
+        "vlan port eth_0/2 mode tag vlan {vlan}",
+        "dhcp-ip ethuni eth_0/1 from-onu",
+        "dhcp-ip ethuni eth_0/2 from-onu",
+        "end"
+    ]
+}
+
+C320_TEMPLATE = {
+    "vendor_prefix": "zte",
+    "fsp_parts": 4,
+    "lines": [
+        "config t",
+        "interface {gpon_olt_c320}",
+        ("replace", "no onu {onu}"),
+        "onu {onu} type ZTEG-F609 sn {sn}",
+        "exit",
+        "interface {gpon_onu_c320}:{onu}",
+        "description {sid}-{name}",
+        "sn-bind enable sn",
+        "tcont 1 name HSI profile {tcont_profile}",
+        "gemport 1 name HSI tcont 1",
+        "service-port 1 vport 1 user-vlan {vlan} vlan {vlan}",
+        "exit",
+        "pon-onu-mng {gpon_onu_c320}:{onu}",
+        "service HSI gemport 1 vlan {vlan}",
+        ("vendor_onu pppoe", "wan-ip 1 mode pppoe username {sn} password {password} vlan-profile vlan{vlan} host 1"),
+        ("vendor_onu !pppoe", [
+            "wan-ip 1 mode dhcp vlan-profile vlan{vlan} host 1",
+            "wan-ip 1 mode dhcp vlan-profile wan{vlan} host 1"
+        ]),
+        "vlan port eth_0/1 mode tag vlan {vlan}",
+        "dhcp-ip ethuni eth_0/1 from-onu",
+        "end"
+    ]
+}
+
+MODE = {"enter": "config t", "exit": "exit", "end": "end"}
+
+BRANDS = [
+    Brand(
+        name="zte_c610",
+        label="ZTE C610",
+        fsp_format="Format: F/S/P/Onu id",
+        fsp_pattern=r'^\d/\d/\d+/\d+$',
+        template=C610_TEMPLATE,
+        mode=MODE,
+        port_context=r'^interface gpon_olt-\S+$',
+    ),
+    Brand(
+        name="zte_c320",
+        label="ZTE C320",
+        fsp_format="Format: F/S/P/Onu id",
+        fsp_pattern=r'^\d/\d/\d+/\d+$',
+        template=C320_TEMPLATE,
+        mode=MODE,
+        port_context=r'^interface gpon-olt_\S+$',
+    ),
+]
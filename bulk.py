@@ -0,0 +1,735 @@
+"""Bulk provisioning: render a CSV/JSONL work order into per-OLT script files
+
+Usage:
+    python bulk.py workorder.csv -o scripts/
+
+Each row needs brand, sn, fsp, vlan, sid and name columns. Optional columns are
+olt, password, registration_type (new/replace), connection_type (pppoe/ipoe),
+use_nce, serviceport and old_sn (the SN of the ONU a replacement swaps out).
+Rows without an olt column are grouped by brand. VLANs are checked against the
+service profile catalog (--profiles, see profile_catalog.py); the olt of a row
+selects its region there.
+Huawei replace rows without a serviceport get it from --service-ports, saved
+"display service-port all" output of their OLT. With an inventory store
+(--inventory inventory.db, see olt_inventory.py) replace rows must name an ONU
+the store knows. An SN that is already registered (in the inventory or earlier
+in the work order) is rejected, and replace rows without an fsp get the FSP of
+the ONU they replace.
+
+With --running-config, rows of an OLT whose running config was saved are
+rendered as the delta against it (see config_delta.py): only missing or
+changed commands are written, and rows that are already configured as
+intended produce nothing.
+
+The work order is processed as a pipeline of generators (read -> validate ->
+render -> write), so only a small chunk of rows is in memory at a time and the script
+files start filling while the rest of the input is still being read.
+With --workers N the validate/render stage runs in a process pool; chunks are
+collected in submission order so the scripts are byte-identical to a
+single-process run.
+
+With --journal, the rows written to the scripts are recorded in a journal
+(see journal.py) every second or so, after the scripts were fsynced. Running
+the same command again after a crash truncates the scripts to what the
+journal vouches for and renders only the rows it does not list.
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, TextIO, Tuple
+from collections import deque
+from functools import partial
+from itertools import islice
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+import coalesce
+import config_core
+import config_delta
+import instrument
+import profile_catalog
+import templates
+import validator
+from fsp import split_fsp
+from journal import Journal, JournalError, file_digest
+from olt_inventory import InventoryStore, is_store_path
+from onu_alloc import InventoryWriter, OnuIdAllocator, OnuIdCollision, PonFull
+from record_store import RecordBatch
+from render_cache import RenderCache
+from serviceport_index import ServicePortIndex, ServicePortNotFound, parse_dump_argument
+from sn_index import DuplicateSerialNumber, SnIndex, UnknownSerialNumber
+
+# OLT -> saved running config, for delta rendering; set in every worker process
+RUNNING_CONFIGS: Dict[str, str] = {}
+
+
+class RowResult(NamedTuple):
+    """Outcome of one row: config is None when it was rejected with error"""
+    line_no: int
+    script_name: str
+    config: Optional[str]
+    error: Optional[str]
+    brand: str = ""
+    fsp: str = ""
+    cached: bool = False
+
+
+class Progress:
+    """Row/reject counters with a periodic rows/s report"""
+
+    def __init__(self, stream: Optional[TextIO] = sys.stderr, interval: float = 1.0):
+        self.stream = stream
+        self.interval = interval
+        self.rows = 0
+        self.rendered = 0
+        self.rejects = 0
+        self.unchanged = 0
+        self.cached = 0
+        # Rows an earlier run of a journaled job already wrote
+        self.resumed = 0
+        # Called with the line number of every row rejected before the render stage
+        self.on_reject: Optional[Callable[[int], None]] = None
+        self.started = time.perf_counter()
+        self._next_report = self.started + interval
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed else 0.0
+
+    def reject(self, line_no: int, reason: str, rendered: bool = False):
+        """Count a rejected row and report why, rendered for rows the render stage rejected"""
+        self.rejects += 1
+        if self.on_reject and not rendered:
+            self.on_reject(line_no)
+        if self.stream:
+            print(f"line {line_no}: rejected: {reason}", file=self.stream)
+
+    def tick(self) -> bool:
+        """Print a progress line when the interval has passed, returns True if it did"""
+        now = time.perf_counter()
+        if now < self._next_report:
+            return False
+        self._next_report = now + self.interval
+        if self.stream:
+            print(f"{self.rows} rows, {self.rendered} rendered, {self.rejects} rejects, "
+                  f"{self.rate:.0f} rows/s", file=self.stream)
+        return True
+
+    def summary(self) -> str:
+        unchanged = f", {self.unchanged} unchanged" if self.unchanged else ""
+        cached = f" ({self.cached} from cache)" if self.cached else ""
+        resumed = f", {self.resumed} done before" if self.resumed else ""
+        return (f"{self.rows} rows, {self.rendered} rendered{cached}{unchanged}{resumed}, {self.rejects} rejects "
+                f"in {self.elapsed:.2f}s ({self.rate:.0f} rows/s)")
+
+
+def read_work_order(path: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield (line number, record) pairs from a CSV or JSONL work order"""
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.lower().endswith(('.jsonl', '.json')):
+            for line_no, line in enumerate(handle, start=1):
+                if line.strip():
+                    yield line_no, json.loads(line)
+        else:
+            reader = csv.DictReader(handle)
+            for record in reader:
+                yield reader.line_num, record
+
+
+def olt_name(record: Dict) -> str:
+    """OLT a record belongs to, the brand when the work order has no olt column"""
+    return (record.get('olt') or record.get('brand') or 'olt').strip()
+
+
+def script_name(olt: str) -> str:
+    """File name of the per-OLT script of an OLT"""
+    return re.sub(r'[^\w.-]', '_', olt) + '.txt'
+
+
+def olt_script_name(record: Dict) -> str:
+    """File name of the per-OLT script a record belongs to"""
+    return script_name(olt_name(record))
+
+
+def assign_onu_ids(rows: Iterable[Tuple[int, Dict]], allocator: OnuIdAllocator, progress: Progress,
+                   registrations: Optional[Dict[int, Tuple[str, str, str, str]]] = None
+                   ) -> Iterator[Tuple[int, Dict]]:
+    """Fill in ONU ids for port-only FSP entries and reject ids already in use
+
+    New registrations whose FSP has no ONU id ("0/1/5" on Huawei) get the lowest
+    free id of that port. Explicit ids are checked against the occupancy index.
+    Runs in the main process, before any fan-out, so ids do not depend on the
+    number of workers. A row that does not validate is rejected here and gives
+    its id back, so it never shifts the ids of the rows after it. Each reserved
+    (olt, brand, fsp, sn) is added to registrations under its line number; a
+    later check that rejects the row before the fan-out releases it (see
+    release_onu_id). Rows the render stage rejects keep their id: by then the
+    ids of the rows after them may already be assigned, and how many are
+    depends on the number of workers.
+    """
+    for line_no, record in rows:
+        brand = (record.get('brand') or '').strip().lower()
+        fsp_text = (record.get('fsp') or '').strip()
+        is_replacement = (record.get('registration_type') or '').strip().lower() == 'replace'
+        fsp_parts = templates.TEMPLATES.get(brand, {}).get('fsp_parts')
+        if is_replacement or not fsp_parts or not fsp_text:
+            yield line_no, record
+            continue
+
+        olt = olt_name(record)
+        parts = split_fsp(fsp_text)
+        try:
+            if len(parts) == fsp_parts - 1:
+                fsp_text = allocator.allocate(olt, '/'.join(parts), brand)
+                record = dict(record, fsp=fsp_text)
+            elif len(parts) == fsp_parts and parts[-1].isdigit():
+                allocator.occupy(olt, fsp_text)
+            else:
+                # Malformed, leave it to the validator
+                yield line_no, record
+                continue
+        except (OnuIdCollision, PonFull) as e:
+            progress.rows += 1
+            progress.reject(line_no, str(e))
+            continue
+
+        try:
+            errors = validator.validate(**config_core.record_to_kwargs(record))
+        except (KeyError, AttributeError):
+            # A missing column, reported by the render stage
+            errors = []
+        if errors:
+            allocator.release(olt, fsp_text)
+            progress.rows += 1
+            progress.reject(line_no, '; '.join(error.message for error in errors))
+            continue
+
+        if registrations is not None:
+            registrations[line_no] = (olt, brand, fsp_text, (record.get('sn') or '').strip())
+        yield line_no, record
+
+
+def release_onu_id(allocator: OnuIdAllocator, registrations: Dict[int, Tuple[str, str, str, str]],
+                   line_no: int):
+    """Give back the ONU id reserved for a row that a later check rejected before the fan-out"""
+    entry = registrations.pop(line_no, None)
+    if entry:
+        olt, _, fsp_text, _ = entry
+        allocator.release(olt, fsp_text)
+
+
+def check_serial_numbers(rows: Iterable[Tuple[int, Dict]], index: SnIndex,
+                         progress: Progress) -> Iterator[Tuple[int, Dict]]:
+    """Reject SNs registered elsewhere and fill in the FSP of replace rows, in one pass
+
+    Every accepted row is added to the index, so an SN used twice in the same
+    work order is caught as well.
+    """
+    for line_no, record in rows:
+        sn = (record.get('sn') or '').strip()
+        if not sn:
+            yield line_no, record
+            continue
+
+        olt = olt_name(record)
+        fsp_text = (record.get('fsp') or '').strip()
+        is_replacement = (record.get('registration_type') or '').strip().lower() == 'replace'
+        try:
+            if is_replacement:
+                old_fsp = index.replace(sn, olt, fsp_text, (record.get('old_sn') or '').strip())
+                if old_fsp != fsp_text:
+                    record = dict(record, fsp=old_fsp)
+            else:
+                index.register(sn, olt, fsp_text)
+        except (DuplicateSerialNumber, UnknownSerialNumber) as e:
+            progress.rows += 1
+            progress.reject(line_no, str(e))
+            continue
+
+        yield line_no, record
+
+
+def check_replacements(rows: Iterable[Tuple[int, Dict]], store: InventoryStore,
+                       progress: Progress) -> Iterator[Tuple[int, Dict]]:
+    """Reject replace rows whose FSP has no ONU on an OLT the inventory store knows"""
+    known_olts = set(store.olts())
+    for line_no, record in rows:
+        is_replacement = (record.get('registration_type') or '').strip().lower() == 'replace'
+        olt = olt_name(record)
+        if is_replacement and olt in known_olts:
+            fsp_text = '/'.join(split_fsp((record.get('fsp') or '').strip()))
+            if store.by_fsp(olt, fsp_text) is None:
+                progress.rows += 1
+                progress.reject(line_no, f"No ONU registered at {olt} {fsp_text} to replace")
+                continue
+        yield line_no, record
+
+
+def resolve_service_ports(rows: Iterable[Tuple[int, Dict]], index: ServicePortIndex,
+                          progress: Progress) -> Iterator[Tuple[int, Dict]]:
+    """Fill in the serviceport of Huawei replace rows from the service-port index
+
+    Rows that already have a serviceport are left as they are; rows whose ONU
+    has no (or no unambiguous) service-port in the index are rejected.
+    """
+    for line_no, record in rows:
+        brand = (record.get('brand') or '').strip().lower()
+        is_replacement = (record.get('registration_type') or '').strip().lower() == 'replace'
+        if brand != 'huawei' or not is_replacement or (record.get('serviceport') or '').strip():
+            yield line_no, record
+            continue
+
+        fsp_text = '/'.join(split_fsp((record.get('fsp') or '').strip()))
+        try:
+            serviceport = index.resolve(olt_name(record), fsp_text, (record.get('vlan') or '').strip())
+        except ServicePortNotFound as e:
+            progress.rows += 1
+            progress.reject(line_no, str(e))
+            continue
+
+        yield line_no, dict(record, serviceport=serviceport)
+
+
+def resume_state(journal: Journal) -> Tuple[Set[int], Dict[str, List[Tuple[int, str]]]]:
+    """Line numbers an earlier run of the job finished, and the (size, hash) checkpoints of each script"""
+    done: Set[int] = set()
+    checkpoints: Dict[str, List[Tuple[int, str]]] = {}
+    for entry in journal.entries:
+        done.update(entry.get("lines", ()))
+        done.update(entry.get("unchanged", ()))
+        if "script" in entry:
+            checkpoints.setdefault(entry["script"], []).append((entry["size"], entry["hash"]))
+    return done, checkpoints
+
+
+def restore_scripts(output_dir: str, checkpoints: Dict[str, List[Tuple[int, str]]]):
+    """Check the scripts against their journaled hashes and cut them back to their last checkpoint
+
+    Each checkpoint hashes the bytes written since the one before, so every
+    kept byte is compared with what the earlier run wrote.
+    """
+    for name, script_checkpoints in checkpoints.items():
+        path = os.path.join(output_dir, name)
+        size = script_checkpoints[-1][0]
+        if not os.path.exists(path) or os.path.getsize(path) < size:
+            raise JournalError(f"{path} is shorter than the journal records ({size} bytes); "
+                               f"remove the journal to start over")
+        with open(path, 'rb') as handle:
+            start = 0
+            for end, expected in script_checkpoints:
+                if hashlib.sha1(handle.read(end - start)).hexdigest()[:16] != expected:
+                    raise JournalError(f"{path} differs from what the journal records (bytes {start}-{end}); "
+                                       f"remove the journal to start over")
+                start = end
+        os.truncate(path, size)
+
+
+def _as_written(text: str) -> bytes:
+    """Bytes a script file opened in text mode gets for text"""
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode('utf-8')
+
+
+def skip_done(rows: Iterable[Tuple[int, Dict]], done: Set[int], progress: Progress,
+              on_skip: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[int, Dict]]:
+    """Drop the rows an earlier run already wrote, on_skip is called with the line number of each"""
+    for line_no, record in rows:
+        if line_no in done:
+            progress.resumed += 1
+            if on_skip:
+                on_skip(line_no)
+            continue
+        yield line_no, record
+
+
+def render_row(batch: RecordBatch, index: int, script: str) -> RowResult:
+    """Render one validated row of a batch into the script named script
+
+    The config is the delta against the OLT's running config when one is set,
+    '' when the ONU is already configured as intended.
+    """
+    line_no = batch.line_nos[index]
+    running_config = RUNNING_CONFIGS.get(batch.get_group(index)) if RUNNING_CONFIGS else None
+    arguments = batch.arguments(index)
+    cache = config_core.RENDER_CACHE
+    hits = cache.hits if cache is not None else 0
+    try:
+        if running_config:
+            current = config_delta.load_running_config(running_config, arguments[0])
+            config = config_delta.render_delta(current, **batch.kwargs(index))
+        else:
+            config = config_core.create_config_string(*arguments)
+    except Exception as e:
+        return RowResult(line_no, '', None, f"failed to generate configuration: {e!r}")
+
+    cached = cache is not None and cache.hits > hits
+    return RowResult(line_no, script, config, None, arguments[0], arguments[2], cached)
+
+
+def set_running_configs(running_configs: Dict[str, str]):
+    """Set the OLT -> running config paths used by render_row, also the worker initializer"""
+    RUNNING_CONFIGS.clear()
+    RUNNING_CONFIGS.update(running_configs)
+
+
+def init_worker(running_configs: Dict[str, str], profile: bool = False,
+                render_cache: Optional[Tuple[int, Optional[str]]] = None,
+                profiles: Optional[str] = None):
+    """Worker initializer: the running configs, instrumentation when profiling,
+    the render cache as (maxsize, path) when one is used and the profile catalog file"""
+    set_running_configs(running_configs)
+    if profiles:
+        profile_catalog.use(profiles, watch=False)
+    if profile:
+        instrument.enable()
+    if render_cache:
+        config_core.set_render_cache(RenderCache(*render_cache))
+
+
+def profile_chunk(chunk: RecordBatch) -> Tuple[List[RowResult], instrument.Metrics]:
+    """process_chunk in a profiled worker, returns the results and the metrics they took"""
+    results = process_chunk(chunk)
+    return results, instrument.drain()
+
+
+def process_chunk(chunk: RecordBatch) -> List[RowResult]:
+    """Worker entry point: validate a batch of rows column by column, then render it in order
+
+    Errors are returned rather than raised so a bad row never aborts the batch,
+    whether it runs in this process or in a worker.
+    """
+    results: List[Optional[RowResult]] = [None] * len(chunk)
+    for index, error in chunk.errors.items():
+        results[index] = RowResult(chunk.line_nos[index], '', None, error)
+
+    valid = chunk.valid()
+    errors = validator.validate_columns(chunk.columns(valid))
+    # One script name per OLT of the batch rather than one per row
+    scripts = [script_name(olt) for olt in chunk.groups.strings]
+
+    for row, index in enumerate(valid):
+        if row in errors:
+            results[index] = RowResult(chunk.line_nos[index], '', None,
+                                       '; '.join(error.message for error in errors[row]))
+        else:
+            results[index] = render_row(chunk, index, scripts[chunk.group[index]])
+
+    if config_core.RENDER_CACHE is not None:
+        # Workers are not shut down cleanly, so every chunk's renders are stored right away
+        config_core.RENDER_CACHE.commit()
+    return results
+
+
+def chunked(rows: Iterable[Tuple[int, Dict]], size: int) -> Iterator[List[Tuple[int, Dict]]]:
+    """Group rows into lists of at most size rows"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_chunks(rows: Iterable[Tuple[int, Dict]], workers: int, chunk_size: int) -> Iterator[List]:
+    """Yield processed chunks in input order, fanned out over a process pool
+
+    Chunks travel as RecordBatch columns (see record_store.py). At most two
+    chunks per worker are in flight, so memory stays bounded and results are
+    written in exactly the order a single-process run would use.
+    """
+    chunks = (RecordBatch.from_rows(chunk, olt_name) for chunk in chunked(rows, chunk_size))
+    if workers <= 1:
+        yield from map(process_chunk, chunks)
+        return
+
+    # Imported here: concurrent.futures/multiprocessing roughly double bulk.py's import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    profile = instrument.enabled()
+    cache = config_core.RENDER_CACHE
+    render_cache = (cache.maxsize, cache.path) if cache is not None else None
+    profiles = profile_catalog.current().path
+
+    def collect(future) -> List[RowResult]:
+        if not profile:
+            return future.result()
+        results, metrics = future.result()
+        instrument.METRICS.merge(metrics)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(dict(RUNNING_CONFIGS), profile, render_cache, profiles)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(profile_chunk if profile else process_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield collect(pending.popleft())
+        while pending:
+            yield collect(pending.popleft())
+
+
+def render_rows(rows: Iterable[Tuple[int, Dict]], progress: Progress,
+                workers: int = 1, chunk_size: int = 500,
+                on_result: Optional[Callable[[int, bool], None]] = None,
+                coalesced: bool = False,
+                journal: Optional[Journal] = None) -> Iterator[Tuple[str, str, Tuple[int, ...]]]:
+    """Yield (script name, config, line numbers) for every row that validates and renders
+
+    on_result, when given, is called with (line number, rendered ok) for every row.
+    With coalesced, the configs of each script are collected up to chunk_size
+    rows and yielded as one block per port (see coalesce.py); the line numbers
+    of those rows come with the last block. Unchanged rows go to the journal.
+    """
+    pending: Dict[str, List[RowResult]] = {}
+    for results in map_chunks(rows, workers, chunk_size):
+        for result in results:
+            progress.rows += 1
+            if on_result:
+                on_result(result.line_no, result.error is None)
+            if result.error:
+                progress.reject(result.line_no, result.error, rendered=True)
+                continue
+            if not result.config:
+                progress.unchanged += 1
+                if journal is not None:
+                    journal.append({"unchanged": [result.line_no]})
+                continue
+            progress.rendered += 1
+            progress.cached += result.cached
+
+            if not coalesced:
+                yield result.script_name, result.config, (result.line_no,)
+                continue
+            script = pending.setdefault(result.script_name, [])
+            script.append(result)
+            if len(script) >= chunk_size:
+                yield from coalesce_script(result.script_name, pending.pop(result.script_name))
+
+    for script_name, script in pending.items():
+        yield from coalesce_script(script_name, script)
+
+
+def coalesce_script(script_name: str, results: List[RowResult]) -> Iterator[Tuple[str, str, Tuple[int, ...]]]:
+    """Yield (script name, block, line numbers) for the coalesced configs of one script
+
+    Blocks mix rows, so every line number comes with the last block: the rows
+    count as written once all of them are.
+    """
+    brand = results[0].brand
+    blocks = list(coalesce.coalesce(brand, ((result.fsp, result.config) for result in results)))
+    for block in blocks[:-1]:
+        yield script_name, block, ()
+    yield script_name, blocks[-1], tuple(result.line_no for result in results)
+
+
+def write_scripts(rendered: Iterable[Tuple[str, str, Tuple[int, ...]]], output_dir: str, progress: Progress,
+                  journal: Optional[Journal] = None, resumed: Iterable[str] = ()) -> int:
+    """Append each config to its per-OLT script, returns the number of scripts written
+
+    With a journal, the scripts are fsynced and what was written to each is
+    journaled (size, hash of the bytes written since the last checkpoint and
+    line numbers) once per journal group.
+    Scripts named in resumed are continued rather than started over.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    resumed = set(resumed)
+    scripts = {}
+    written = 0
+    # script -> (line numbers, hash) of what was written since the last checkpoint
+    unsaved = {}
+    unsaved_rows = 0
+    deadline = 0.0
+
+    def checkpoint():
+        for name, (lines, sha) in unsaved.items():
+            handle = scripts[name]
+            handle.flush()
+            os.fsync(handle.fileno())
+            journal.append({"script": name, "size": handle.tell(), "hash": sha.hexdigest()[:16], "lines": lines})
+        unsaved.clear()
+        journal.commit()
+
+    try:
+        for name, config, lines in rendered:
+            if name not in scripts:
+                mode = 'a' if name in resumed else 'w'
+                scripts[name] = open(os.path.join(output_dir, name), mode, encoding='utf-8')
+            block = config + '\n\n'
+            with instrument.timed("write"):
+                scripts[name].write(block)
+            written += 1
+
+            if journal is not None:
+                if not unsaved:
+                    deadline = time.monotonic() + journal.group_seconds
+                script_lines, sha = unsaved.setdefault(name, ([], hashlib.sha1()))
+                sha.update(_as_written(block))
+                script_lines.extend(lines)
+                unsaved_rows += len(lines)
+                # Only after the last block of a coalesced group, which carries its line numbers
+                if lines and (unsaved_rows >= journal.group_size or time.monotonic() >= deadline):
+                    checkpoint()
+                    unsaved_rows = 0
+
+            # Flush on every report so the scripts can be followed while the batch runs
+            if progress.tick() or written == 1:
+                for handle in scripts.values():
+                    handle.flush()
+        if journal is not None:
+            checkpoint()
+    finally:
+        for handle in scripts.values():
+            handle.close()
+
+    return len(scripts)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render a CSV/JSONL work order into per-OLT scripts")
+    parser.add_argument('work_order', help="CSV or JSONL file with one ONU per row")
+    parser.add_argument('-o', '--output-dir', default='scripts', help="Directory for the per-OLT script files")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="Render in N worker processes (output order is unchanged)")
+    parser.add_argument('--chunk-size', type=int, default=500, help="Rows sent to a worker at a time")
+    parser.add_argument('--inventory', metavar='FILE',
+                        help="Existing ONUs (olt, fsp) as CSV/JSONL or an olt_inventory.py store (.db): "
+                             "assign free ONU ids and reject collisions")
+    parser.add_argument('--update-inventory', action='store_true',
+                        help="Append the ONUs registered by this run to the --inventory file")
+    parser.add_argument('--service-ports', metavar='[OLT=]FILE', action='append', default=[],
+                        help="Saved 'display service-port all' output of an OLT (named after the file "
+                             "unless given as OLT=FILE), used for Huawei replace rows; repeatable")
+    parser.add_argument('--running-config', metavar='[OLT=]FILE', action='append', default=[],
+                        help="Saved running config of an OLT (named after the file unless given as "
+                             "OLT=FILE): its rows are rendered as the delta against it; repeatable")
+    parser.add_argument('--coalesce', action='store_true',
+                        help="Write the rows of each OLT port as one block, entering every context once")
+    parser.add_argument('--profiles', metavar='FILE',
+                        help="Service profile catalog (JSON, see profile_catalog.py) instead of the built-in one")
+    parser.add_argument('--render-cache', metavar='FILE',
+                        help="Keep rendered configs in a SQLite file, a re-run takes unchanged rows from it")
+    parser.add_argument('--cache-size', type=int, default=4096,
+                        help="Rendered configs kept in memory per process")
+    parser.add_argument('--journal', metavar='FILE',
+                        help="Journal the rows written to FILE; running the same command again resumes "
+                             "after the last journaled row")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print call counts and latencies per stage, brand and mode at the end")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="Write the same measurements as a Prometheus text file")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only print the final summary")
+    args = parser.parse_args(argv)
+
+    progress = Progress(stream=None if args.quiet else sys.stderr)
+    if args.journal and args.update_inventory:
+        # A resumed run would find the ONUs of the first one in the inventory and reject them
+        parser.error("--journal cannot be combined with --update-inventory")
+    if args.profile or args.metrics:
+        instrument.enable()
+    if args.profiles:
+        # Loaded once: every row of the batch is rendered with the same catalog
+        try:
+            profile_catalog.use(args.profiles, watch=False)
+        except profile_catalog.ProfileCatalogError as e:
+            parser.error(str(e))
+    if args.render_cache:
+        config_core.set_render_cache(RenderCache(args.cache_size, args.render_cache))
+    running_configs = {}
+    for argument in args.running_config:
+        olt, path = parse_dump_argument(argument)
+        running_configs[olt or os.path.splitext(os.path.basename(path))[0]] = path
+    set_running_configs(running_configs)
+
+    rows = read_work_order(args.work_order)
+    on_result = None
+    inventory_writer = None
+    inventory_store = None
+    registrations: Dict[int, Tuple[str, str, str, str]] = {}
+
+    sn_index = SnIndex()
+
+    if args.inventory:
+        allocator = OnuIdAllocator()
+        if os.path.exists(args.inventory):
+            allocator.load(args.inventory)
+            sn_index.load(args.inventory)
+        rows = assign_onu_ids(rows, allocator, progress, registrations)
+        # Rejected after their id was reserved but before the fan-out: give it back before the
+        # next row is assigned one. Render stage rejections keep it, see assign_onu_ids
+        progress.on_reject = partial(release_onu_id, allocator, registrations)
+
+        if args.update_inventory:
+            inventory_writer = InventoryWriter(args.inventory)
+
+        def on_result(line_no: int, ok: bool):
+            # registrations only holds rows still in flight, so it stays small
+            entry = registrations.pop(line_no, None)
+            if ok and entry and inventory_writer:
+                inventory_writer.add(*entry)
+
+    # After ONU id assignment, so the SN index holds complete FSPs
+    rows = check_serial_numbers(rows, sn_index, progress)
+
+    if args.service_ports:
+        service_ports = ServicePortIndex()
+        for argument in args.service_ports:
+            olt, path = parse_dump_argument(argument)
+            service_ports.load_dump(path, olt)
+        rows = resolve_service_ports(rows, service_ports, progress)
+
+    if args.inventory and is_store_path(args.inventory) and os.path.exists(args.inventory):
+        inventory_store = InventoryStore(args.inventory)
+        rows = check_replacements(rows, inventory_store, progress)
+
+    journal = None
+    checkpoints: Dict[str, List[Tuple[int, str]]] = {}
+    if args.journal:
+        header = {"job": "bulk", "work_order": file_digest(args.work_order),
+                  "output_dir": os.path.abspath(args.output_dir), "coalesce": args.coalesce}
+        try:
+            journal = Journal(args.journal, header)
+            # Skipped after the checks above, so ONU ids are assigned exactly as in the first run
+            done, checkpoints = resume_state(journal)
+            restore_scripts(args.output_dir, checkpoints)
+        except JournalError as e:
+            parser.error(str(e))
+        # Resumed rows keep their ids, they were written by the earlier run
+        rows = skip_done(rows, done, progress, on_skip=lambda line_no: registrations.pop(line_no, None))
+
+    try:
+        rendered = render_rows(rows, progress, workers=args.workers, chunk_size=args.chunk_size,
+                               on_result=on_result, coalesced=args.coalesce, journal=journal)
+        script_count = write_scripts(rendered, args.output_dir, progress, journal, resumed=checkpoints)
+    finally:
+        if journal:
+            journal.close()
+        if inventory_writer:
+            inventory_writer.close()
+        if inventory_store is not None:
+            inventory_store.close()
+        if config_core.RENDER_CACHE is not None:
+            config_core.RENDER_CACHE.close()
+
+    print(f"{progress.summary()} into {script_count} scripts", file=sys.stderr)
+    if instrument.enabled():
+        for result, count in (("rendered", progress.rendered), ("unchanged", progress.unchanged),
+                              ("rejected", progress.rejects)):
+            instrument.METRICS.count("rows", count, result=result)
+        if args.profile:
+            print(instrument.METRICS.report(), file=sys.stderr)
+        if args.metrics:
+            instrument.METRICS.write_prometheus(args.metrics)
+    return 1 if progress.rejects else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Coalesce rendered configs per OLT and port
+
+Usage:
+    python bulk.py workorder.csv -o scripts/ --coalesce
+
+Every rendered record enters and leaves its own contexts ("config t" ...
+"end" around "interface gpon_olt-1/1/1" ... "exit" for ZTE, "interface gpon
+0/1" ... "quit" for Huawei), so 40 ONUs on one PON mean 40 mode switches.
+Coalescing groups the records of an OLT by their port context and writes each
+group as one block: the configuration mode is entered once, the port context
+is opened once with the commands of every record, and the ONU contexts follow.
+
+Every record keeps the order of its own commands: what it has before its port
+context (Huawei "undo service-port") comes first, then the port context, then
+what follows it (ONU contexts, Huawei "service-port vlan"). Only the
+interleaving of different ONUs changes, and those do not depend on each other;
+a record for an ONU already in the group starts a new group, so a delete and
+a re-add of the same ONU are never reordered.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import re
+
+import brands
+
+# Lines that open a context
+_CONTEXT = re.compile(r'^(?:interface |pon-onu-mng |gpon-onu \d)')
+
+Section = Tuple[str, List[str]]   # (context, commands), context '' being the root
+
+
+def split_config(config: str, brand: str) -> Tuple[List[Section], bool]:
+    """Sections of a rendered config in order, and whether it leaves the configuration mode
+
+    Blank lines answer Huawei's "{ <cr>|... }" prompts, so they stay with the
+    command before them.
+    """
+    mode = brands.get(brand).mode
+    sections: List[Section] = []
+    context, commands = "", []
+    ended = False
+
+    lines = config.splitlines()
+    if lines and lines[0].strip() == mode["enter"]:
+        lines = lines[1:]
+    for line in lines:
+        stripped = line.strip()
+        opens = _CONTEXT.match(stripped)
+        if stripped == mode["end"] or (stripped == mode["exit"] and not context):
+            # Huawei leaves a context and the configuration mode with the same "quit"
+            ended = True
+        elif stripped != mode["exit"] and not opens:
+            if stripped or commands:
+                commands.append(line)
+            continue
+
+        if commands:
+            sections.append((context, commands))
+        context, commands = (stripped if opens else ""), []
+    if commands:
+        sections.append((context, commands))
+    return sections, ended
+
+
+class Group:
+    """Records of one OLT port that are written as one block"""
+
+    def __init__(self, brand: str, port: str):
+        self.brand = brand
+        self.port = port
+        self.onus = set()
+        self.before: List[Section] = []
+        self.commands: List[str] = []
+        self.after: List[Section] = []
+        self.ended = False
+
+    def add(self, fsp: str, sections: List[Section], ended: bool):
+        self.onus.add(fsp)
+        self.ended = self.ended or ended
+        target = self.before
+        for context, commands in sections:
+            if self.port and context == self.port and target is self.before:
+                self.commands.extend(commands)
+                target = self.after
+            elif target and target[-1][0] == context:
+                # Adjacent sections of the same context (the root, mostly) merge
+                target[-1][1].extend(commands)
+            else:
+                target.append((context, list(commands)))
+
+    def render(self) -> str:
+        mode = brands.get(self.brand).mode
+        lines = [mode["enter"]]
+        sections = self.before + ([(self.port, self.commands)] if self.commands else []) + self.after
+        for context, commands in sections:
+            if context:
+                lines.append(context)
+                lines.extend(commands)
+                lines.append(mode["exit"])
+            else:
+                lines.extend(commands)
+        if self.ended:
+            lines.append(mode["end"])
+        return '\n'.join(lines)
+
+
+def coalesce(brand: str, configs: Iterable[Tuple[str, str]]) -> List[str]:
+    """Coalesce (fsp, config) of one OLT into one block per port, in order of first appearance"""
+    # The per-port context the records of a brand share; BDCOM only has ONU contexts
+    pattern = brands.get(brand).port_context
+    port_context = pattern and re.compile(pattern)
+    open_groups: Dict[str, Group] = {}
+    groups: List[Group] = []
+
+    for fsp, config in configs:
+        sections, ended = split_config(config, brand)
+        port = ""
+        if port_context:
+            port = next((context for context, _ in sections if port_context.match(context)), "")
+
+        group: Optional[Group] = open_groups.get(port)
+        if group is None or fsp in group.onus:
+            group = open_groups[port] = Group(brand, port)
+            groups.append(group)
+        group.add(fsp, sections, ended)
+
+    return [group.render() for group in groups]
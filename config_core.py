@@ -0,0 +1,164 @@
+"""Headless configuration rendering core for the OLT Configuration Generator"""
+from typing import Dict, Iterable, List, Optional, Sequence
+from datetime import date
+from functools import partial
+
+import brands
+import profile_catalog
+import templates
+from profile_catalog import ProfileTable
+
+# VLANs, bandwidths and ONU profile names live in the profile catalog (see profile_catalog.py)
+
+# Built-in brands; plugin brands are listed by brands.names()
+BRANDS = tuple(brands.BUILTIN)
+
+# Optional render cache (see render_cache.py); None renders on every call
+RENDER_CACHE = None
+
+
+def _generate(brand: str, profiles: Optional[ProfileTable] = None, **kwargs) -> str:
+    """Render a brand's template with the given profiles, the catalog defaults when None"""
+    if profiles is None:
+        profiles = profile_catalog.current().table()
+    return templates.render(brand, profiles, **kwargs)
+
+
+def generate_raisecom_config(profiles: Optional[ProfileTable] = None, **kwargs) -> str:
+    """Generate Raisecom configuration"""
+    return _generate("raisecom", profiles, **kwargs)
+
+
+def generate_c610_config(profiles: Optional[ProfileTable] = None, **kwargs) -> str:
+    """Generate ZTE C610 configuration"""
+    return _generate("zte_c610", profiles, **kwargs)
+
+
+def generate_c320_config(profiles: Optional[ProfileTable] = None, **kwargs) -> str:
+    """Generate ZTE C320 configuration"""
+    return _generate("zte_c320", profiles, **kwargs)
+
+
+def generate_bdcom_config(profiles: Optional[ProfileTable] = None, **kwargs) -> str:
+    """Generate BDCOM configuration"""
+    return _generate("bdcom", profiles, **kwargs)
+
+
+def generate_huawei_config(profiles: Optional[ProfileTable] = None, **kwargs) -> str:
+    """Generate Huawei configuration"""
+    return _generate("huawei", profiles, **kwargs)
+
+
+CONFIG_GENERATORS = {
+    "raisecom": generate_raisecom_config,
+    "zte_c610": generate_c610_config,
+    "zte_c320": generate_c320_config,
+    "bdcom": generate_bdcom_config,
+    "huawei": generate_huawei_config
+}
+
+
+def get_generator(brand: str):
+    """Config generator of a brand, plugin brands (see brands/) render their template directly"""
+    generator = CONFIG_GENERATORS.get(brand)
+    if generator is None:
+        if not brands.is_known(brand):
+            raise ValueError(f"Unknown OLT brand: {brand}")
+        generator = CONFIG_GENERATORS[brand] = partial(_generate, brand)
+    return generator
+
+
+def create_config_string(brand: str, sn: str, fsp: str, vlan: str, sid: str, name: str,
+                         password: str = "", is_replacement: bool = False,
+                         is_pppoe: bool = True, use_nce: bool = False,
+                         serviceport: str = "", olt: str = "") -> str:
+    """Create the configuration string for a single ONU without any GUI state
+
+    The VLAN's profiles are those of the OLT's region in the profile catalog,
+    the catalog defaults when olt is empty or in no region.
+    """
+    generator = get_generator(brand)
+    profiles = profile_catalog.current().table(olt)
+
+    # Password defaults to today's date, same as the "Use Today's Date" option
+    if is_pppoe and not password:
+        password = date.today().strftime('%Y%m%d')
+    elif not is_pppoe:
+        password = ""
+    name = name.replace(' ', '.')
+
+    cache = RENDER_CACHE
+    if cache is not None:
+        key = (brand, sn, fsp, vlan, sid, name, password,
+               bool(is_replacement), bool(is_pppoe), bool(use_nce), serviceport, profiles.digest)
+        config = cache.get(key)
+        if config is not None:
+            return config
+
+    config = generator(
+        profiles=profiles,
+        sn=sn,
+        fsp=fsp,
+        vlan=vlan,
+        sid=sid,
+        name=name,
+        password=password,
+        is_replacement=is_replacement,
+        is_pppoe=is_pppoe,
+        use_nce=use_nce,
+        serviceport=serviceport
+    )
+    if cache is not None:
+        cache.put(key, config)
+    return config
+
+
+def set_render_cache(cache):
+    """Use cache (a render_cache.RenderCache, or None to disable) in create_config_string"""
+    global RENDER_CACHE
+    RENDER_CACHE = cache
+
+
+def _as_bool(value) -> bool:
+    """Interpret a work order cell ("1", "yes", "true", ...) as a boolean"""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def record_to_kwargs(record: Dict) -> Dict:
+    """Convert a provisioning record (CSV/JSONL row) into create_config_string arguments"""
+    return {field: values[0] for field, values in records_to_columns([record]).items()}
+
+
+def records_to_columns(records: Sequence[Dict]) -> Dict[str, List]:
+    """record_to_kwargs for many records at once: create_config_string argument -> value of every record
+
+    Raises KeyError for the first record with a missing column, AttributeError or
+    TypeError for a record that is not a dict or has a value that is not text.
+    """
+    return {
+        "brand": [record["brand"].strip().lower() for record in records],
+        "sn": [record["sn"].strip() for record in records],
+        "fsp": [record["fsp"].strip() for record in records],
+        "vlan": [str(record["vlan"]).strip() for record in records],
+        "sid": [str(record["sid"]).strip() for record in records],
+        "name": [record["name"].strip() for record in records],
+        "password": [(record.get("password") or "").strip() for record in records],
+        "is_replacement": [(record.get("registration_type") or "new").strip().lower() == "replace"
+                           for record in records],
+        "is_pppoe": [(record.get("connection_type") or "pppoe").strip().lower() == "pppoe" for record in records],
+        "use_nce": [_as_bool(record.get("use_nce") or False) for record in records],
+        "serviceport": [str(record.get("serviceport") or "").strip() for record in records],
+        "olt": [(record.get("olt") or "").strip() for record in records]
+    }
+
+
+def render_record(record: Dict) -> str:
+    """Render the configuration for one provisioning record"""
+    return create_config_string(**record_to_kwargs(record))
+
+
+def render_records(records: Iterable[Dict]) -> List[str]:
+    """Render the configuration for a list of provisioning records"""
+    return [render_record(record) for record in records]
@@ -0,0 +1,243 @@
+"""Minimal command delta between a rendered config and the running config
+
+The running config of an OLT (or just the part about one ONU) is parsed into
+sections: the root plus one section per "interface ..."/"pon-onu-mng ..."
+context, each holding its commands in a canonical form (single spaces, no
+quotes, SNs in 16 hex digit form). The intended config is rendered as a new
+registration and only the commands the running config does not already have
+are emitted, each inside its context. An ONU that is already configured as
+intended produces an empty delta.
+
+When a command replaces one with the same key (the same "service-port 1",
+"description", "ont add P ONU", ...) the brand's rule for that key decides:
+    overwrite   emit the new command, it replaces the old one (default)
+    negate      remove the old one first ("no service-port 1", "undo service-port 102")
+    modify      Huawei "ont add": emit "ont modify" with the changed fields
+    recreate    the ONU itself changed (ZTE "onu N ... sn"), the full replace
+                config is emitted instead
+
+A command the rendered config follows with a blank line (the Enter that
+answers a Huawei "{ <cr>|... }" prompt) is followed by one in the delta too.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from functools import lru_cache
+import re
+
+import brands
+import config_core
+from sn_index import normalize_sn
+
+# Lines that open a context
+_CONTEXT = re.compile(r'^(?:interface |pon-onu-mng |gpon-onu \d)')
+
+# Lines that close a context, in renders and in saved running configs
+_LEAVE = frozenset(("exit", "quit", "end", "!", "#", "$", "config", "config t", "write all"))
+
+_SN_ARGUMENT = re.compile(r'\b(sn|sn-auth) (\w+)')
+
+# Key pattern (the key is the "key" group, or the whole match), action and
+# the removal command for "negate", filled from the old line's groups; the
+# lines entering and leaving the modes of a brand are its Brand.mode (brands/)
+DELTA_RULES = {
+    "zte": {
+        "keys": [
+            (r'^onu \d+\b', "recreate", None),
+            (r'^tcont \d+\b', "recreate", None),
+            (r'^gemport \d+\b', "recreate", None),
+            (r'^(?P<key>service-port \d+)\b', "negate", "no {key}"),
+            (r'^(?P<key>service \S+)', "negate", "no {key}"),
+            (r'^description\b', "overwrite", None),
+        ],
+        "canonical": [],
+    },
+    "raisecom": {
+        "keys": [
+            (r'^create gpon-onu \d+\b', "recreate", None),
+            (r'^description\b', "overwrite", None),
+            (r'^iphost \d+ (?:mode|vlan|pppoe)\b', "overwrite", None),
+        ],
+        "canonical": [],
+    },
+    "bdcom": {
+        "keys": [
+            (r'^description\b', "overwrite", None),
+            (r'^gpon onu wan \d+ (?:tci vlan|pppoe username)\b', "overwrite", None),
+        ],
+        "canonical": [],
+    },
+    "huawei": {
+        "keys": [
+            (r'^ont add \d+ \d+\b', "modify", None),
+            (r'^service-port (?:(?P<index>\d+) )?vlan \d+ (?P<key>gpon \S+ ont \d+ gemport \d+)',
+             "negate", "undo service-port {index}"),
+            (r'^ont ipconfig \d+ \d+\b', "overwrite", None),
+        ],
+        # The running config numbers its service-ports, renders do not
+        "canonical": [(r'^service-port \d+ vlan ', 'service-port vlan ')],
+    },
+}
+
+DELTA_RULES["zte_c610"] = DELTA_RULES["zte_c320"] = DELTA_RULES.pop("zte")
+
+_compiled_keys = {
+    brand: [(re.compile(pattern), action, negation) for pattern, action, negation in rules["keys"]]
+    for brand, rules in DELTA_RULES.items()
+}
+
+_compiled_canonical = {
+    brand: [(re.compile(pattern), replacement) for pattern, replacement in rules["canonical"]]
+    for brand, rules in DELTA_RULES.items()
+}
+
+# Huawei "ont add" fields that "ont modify" can change, and its names for them
+_ONT_FIELDS = {"sn-auth": "sn", "ont-lineprofile-name": "ont-lineprofile-name",
+               "ont-srvprofile-name": "ont-srvprofile-name", "desc": "desc"}
+_ONT_FIELD = re.compile(r'\b(sn-auth|ont-lineprofile-name|ont-srvprofile-name|desc) (\S+)')
+
+
+def _clean(line: str) -> str:
+    """Single spaces, no quotes"""
+    if '"' in line:
+        line = line.replace('"', '')
+    return ' '.join(line.split())
+
+
+def canonical(line: str, brand: str) -> str:
+    """Compare form of a command: single spaces, no quotes, SNs normalized"""
+    line = _SN_ARGUMENT.sub(lambda match: f"{match.group(1)} {normalize_sn(match.group(2))}", line)
+    for pattern, replacement in _compiled_canonical[brand]:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+def command_key(line: str, brand: str) -> Tuple[str, str, Optional[str], Optional[re.Match]]:
+    """(key, action, negation, match) of a canonical command; unkeyed commands are their own key"""
+    for pattern, action, negation in _compiled_keys[brand]:
+        match = pattern.match(line)
+        if match:
+            return match.groupdict().get("key") or match.group(), action, negation, match
+    return line, "overwrite", None, None
+
+
+def split_sections(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Yield (context, command) for every command, context '' being the root"""
+    context = ""
+    for line in lines:
+        line = _clean(line)
+        if not line:
+            continue
+        if line in _LEAVE:
+            context = ""
+        elif _CONTEXT.match(line):
+            context = line
+        else:
+            yield context, line
+
+
+class RunningConfig:
+    """Commands of a running config per section, with a per-section key index"""
+
+    def __init__(self, lines: Iterable[str], brand: str):
+        self.brand = brand
+        self.commands: Dict[str, set] = {}
+        self.keyed: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        # Running configs repeat the same lines for every ONU, canonicalize each once
+        parsed: Dict[str, Tuple[str, str]] = {}
+        for context, line in split_sections(lines):
+            if line not in parsed:
+                command = canonical(line, brand)
+                parsed[line] = (command, command_key(command, brand)[0])
+            command, key = parsed[line]
+            commands = self.commands.setdefault(context, set())
+            if command not in commands:
+                commands.add(command)
+                self.keyed.setdefault(context, {}).setdefault(key, []).append((command, line))
+
+    def has(self, context: str, command: str) -> bool:
+        return command in self.commands.get(context, ())
+
+    def same_key(self, context: str, key: str) -> List[Tuple[str, str]]:
+        """(canonical, as written) commands of a section with the given key"""
+        return self.keyed.get(context, {}).get(key, [])
+
+
+@lru_cache(maxsize=64)
+def load_running_config(path: str, brand: str) -> RunningConfig:
+    """Parse a saved running config once per process"""
+    with open(path, encoding='utf-8', errors='replace') as handle:
+        return RunningConfig(handle, brand)
+
+
+def _ont_modify(intended: str, current: str, match: re.Match) -> Optional[str]:
+    """"ont modify" for the fields of an "ont add" that changed, None if none did"""
+    wanted = dict(_ONT_FIELD.findall(intended))
+    have = dict(_ONT_FIELD.findall(current))
+    changes = [f"{_ONT_FIELDS[field]} {value}" for field, value in wanted.items() if have.get(field) != value]
+    if not changes:
+        return None
+    _, _, pon, onu = match.group().split()
+    return f"ont modify {pon} {onu} " + ' '.join(changes)
+
+
+def _answered(lines: List[str]) -> set:
+    """Commands followed by a blank line, which answers the prompt they open"""
+    return {_clean(line) for line, after in zip(lines, lines[1:]) if not after.strip() and line.strip()}
+
+
+def delta(intended: str, current: RunningConfig) -> Optional[str]:
+    """Commands of intended that current lacks, '' when none; None when the ONU must be recreated"""
+    brand = current.brand
+    mode = brands.get(brand).mode
+    sections: Dict[str, List[str]] = {}
+    intended_lines = intended.splitlines()
+    answered = _answered(intended_lines)
+
+    for context, line in split_sections(intended_lines):
+        command = canonical(line, brand)
+        if current.has(context, command):
+            continue
+
+        key, action, negation, match = command_key(command, brand)
+        replaced = [old for old in current.same_key(context, key) if old[0] != command]
+        output = sections.setdefault(context, [])
+        if replaced and action == "recreate":
+            return None
+        if replaced and action == "modify":
+            modify = _ont_modify(command, replaced[0][0], match)
+            if modify:
+                output.append(modify)
+                if line in answered:
+                    output.append("")
+            continue
+        if replaced and action == "negate":
+            for _, written in replaced:
+                # The written line still has what canonical() drops, like the Huawei index
+                output.append(negation.format(**command_key(written, brand)[3].groupdict()))
+        output.append(line)
+        if line in answered:
+            output.append("")
+
+    lines = []
+    for context, commands in sections.items():
+        if not commands:
+            continue
+        if context:
+            lines.append(context)
+            lines.extend(commands)
+            lines.append(mode["exit"])
+        else:
+            lines.extend(commands)
+    if not lines:
+        return ""
+    return '\n'.join([mode["enter"], *lines, mode["end"]])
+
+
+def render_delta(current: RunningConfig, **kwargs) -> str:
+    """Render a record as the delta against the running config, '' when nothing changes"""
+    intended = config_core.create_config_string(**dict(kwargs, is_replacement=False))
+    commands = delta(intended, current)
+    if commands is not None:
+        return commands
+
+    # The ONU itself changed: replace it, as in replace mode
+    return config_core.create_config_string(**dict(kwargs, is_replacement=True))
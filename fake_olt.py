@@ -0,0 +1,166 @@
+"""Local simulated OLTs for trying push.py without real hardware
+
+Usage:
+    python fake_olt.py --olts 3 --base-port 2323
+    python fake_olt.py --olts 1 --fail "sn ZTEG0+BAD" --latency 0.01
+    python fake_olt.py --olts 1 --confirm "^no onu"
+
+Each OLT listens on its own port (base-port, base-port + 1, ...), asks for a
+username and password (any are accepted), keeps a prompt that follows the
+configuration mode ("OLT-1>", "OLT-1#", "OLT-1(config)#", "OLT-1(config-if)#"),
+echoes every command and answers commands matching --fail with an error line.
+Commands matching --confirm first ask "(y/n)" and keep the answer in answers.
+A devices.csv for push.py is printed on startup.
+"""
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import re
+import sys
+
+# Commands that enter or leave a configuration mode
+CONFIG_COMMANDS = ("config", "config t", "configure terminal")
+CONTEXT_COMMAND = re.compile(r'^(?:interface |pon-onu-mng |gpon-onu \d)')
+LEAVE_COMMANDS = ("exit", "quit")
+TOP_COMMANDS = ("end", "return")
+
+ERROR_LINE = "% Invalid input detected at '^' marker."
+CONFIRM_LINE = "Are you sure to continue? (y/n)[n]:"
+
+
+class FakeOLT:
+    """One simulated OLT; received keeps every configuration command in order, answers every (y/n) answer"""
+
+    def __init__(self, hostname: str, fail: Optional[str] = None, latency: float = 0.0,
+                 confirm: Optional[str] = None):
+        self.hostname = hostname
+        self.fail = re.compile(fail) if fail else None
+        self.confirm = re.compile(confirm) if confirm else None
+        self.latency = latency
+        self.received: List[str] = []
+        self.answers: List[str] = []
+        self.sessions = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening, returns the port"""
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def prompt(self, modes: List[str]) -> str:
+        if not modes:
+            return f"{self.hostname}#"
+        return f"{self.hostname}({modes[-1]})#"
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.sessions += 1
+
+        async def send(text: str):
+            writer.write(text.encode('utf-8'))
+            await writer.drain()
+
+        async def read_line() -> Optional[str]:
+            line = await reader.readline()
+            return None if not line else line.decode('utf-8', errors='replace').strip()
+
+        try:
+            await send("\r\nUser Access Verification\r\n\r\nUsername:")
+            if await read_line() is None:
+                return
+            await send("Password:")
+            if await read_line() is None:
+                return
+            await send(f"\r\n{self.hostname}>")
+
+            enabled = False
+            modes: List[str] = []
+            while True:
+                command = await read_line()
+                if command is None:
+                    return
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                output = ""
+                if not enabled:
+                    if command == "enable":
+                        enabled = True
+                    elif command:
+                        output = ERROR_LINE + "\r\n"
+                    await send(f"{command}\r\n{output}" + (self.prompt(modes) if enabled else f"{self.hostname}>"))
+                    continue
+
+                echo = f"{command}\r\n"
+                if self.confirm and self.confirm.search(command):
+                    await send(f"{command}\r\n{CONFIRM_LINE}")
+                    answer = await read_line()
+                    if answer is None:
+                        return
+                    self.answers.append(answer)
+                    # The answer is not echoed; the newline comes right away, the prompt once the command ran
+                    await send("\r\n")
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    echo = ""
+
+                if self.fail and self.fail.search(command):
+                    output = ERROR_LINE + "\r\n"
+                elif command in CONFIG_COMMANDS:
+                    modes = ["config"]
+                elif CONTEXT_COMMAND.match(command) and modes:
+                    modes = ["config", "config-if"]
+                elif command in LEAVE_COMMANDS:
+                    modes = modes[:-1]
+                elif command in TOP_COMMANDS:
+                    modes = []
+                if modes and command:
+                    self.received.append(command)
+
+                await send(f"{echo}{output}{self.prompt(modes)}")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(count: int, base_port: int, fail: Optional[str], latency: float,
+                confirm: Optional[str] = None):
+    olts: Dict[str, FakeOLT] = {}
+    print("olt,brand,host,port,protocol,username,password,max_sessions")
+    for number in range(1, count + 1):
+        olt = FakeOLT(f"OLT-{number}", fail, latency, confirm)
+        port = await olt.start(port=base_port + number - 1)
+        olts[olt.hostname] = olt
+        print(f"{olt.hostname},zte_c610,127.0.0.1,{port},telnet,admin,admin,4")
+    sys.stdout.flush()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for olt in olts.values():
+            print(f"{olt.hostname}: {olt.sessions} sessions, {len(olt.received)} commands", file=sys.stderr)
+            await olt.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run simulated OLTs on local ports")
+    parser.add_argument('--olts', type=int, default=1, help="Number of OLTs")
+    parser.add_argument('--base-port', type=int, default=2323, help="Port of the first OLT")
+    parser.add_argument('--fail', help="Regular expression of commands to answer with an error")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before every answer")
+    parser.add_argument('--confirm', help="Regular expression of commands that ask (y/n) first")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.olts, args.base_port, args.fail, args.latency, args.confirm))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
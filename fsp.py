@@ -0,0 +1,75 @@
+"""Parsed FSP (frame/slot/port/ONU) values
+
+An FSP entry is a PON port followed by the ONU id: "F/S/P/ONU" on ZTE and
+Huawei, "S/P/ONU" on Raisecom and "P/ONU" on BDCOM. Ports are parsed once and
+shared by every ONU on them, together with the interface names the brands
+build from them; whole FSP strings are memoized as well.
+"""
+from typing import Tuple
+from functools import lru_cache
+import re
+
+_non_digit = re.compile(r'\D')
+
+
+class PonPort:
+    """A PON port ("F/S/P", "S/P" or "P") and its interface names"""
+    __slots__ = ('path', 'parts', 'board', 'pon',
+                 'gpon_olt', 'gpon_onu', 'vport', 'gpon_olt_c320', 'gpon_onu_c320')
+
+    def __init__(self, parts: Tuple[str, ...]):
+        self.parts = parts
+        self.path = '/'.join(parts)
+        self.board = '/'.join(parts[:2])   # Huawei "interface gpon F/S"
+        self.pon = parts[-1]               # Huawei "ont add P ONU"
+
+        # ZTE C610 / C320 interface prefixes, the ONU id is appended by the template
+        self.gpon_olt = f"gpon_olt-{self.path}"
+        self.gpon_onu = f"gpon_onu-{self.path}"
+        self.vport = f"vport-{self.path}"
+        self.gpon_olt_c320 = f"gpon-olt_{self.path}"
+        self.gpon_onu_c320 = f"gpon-onu_{self.path}"
+
+    def __repr__(self) -> str:
+        return f"PonPort({self.path!r})"
+
+
+class FSP:
+    """An FSP entry: the text as typed, its PON port and the ONU id"""
+    __slots__ = ('text', 'port', 'onu', 'size')
+
+    def __init__(self, text: str, port: PonPort, onu: str):
+        self.text = text
+        self.port = port
+        self.onu = onu
+        self.size = len(port.parts) + 1
+
+    def __repr__(self) -> str:
+        return f"FSP({self.text!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FSP) and self.port.parts == other.port.parts and self.onu == other.onu
+
+    def __hash__(self) -> int:
+        return hash((self.port.parts, self.onu))
+
+
+@lru_cache(maxsize=8192)
+def parse_port(parts: Tuple[str, ...]) -> PonPort:
+    """Return the shared PonPort for a tuple of port components"""
+    return PonPort(parts)
+
+
+def split_fsp(text: str) -> Tuple[str, ...]:
+    """Split an FSP entry into components; any non-digit separates, like re.split(r'\\D')"""
+    # Plain "F/S/P" strings split the same with str.split, which is much cheaper
+    return tuple(text.split('/') if text.replace('/', '').isdecimal() else _non_digit.split(text))
+
+
+@lru_cache(maxsize=65536)
+def parse_fsp(text: str) -> FSP:
+    """Parse an FSP entry into its shared PonPort and ONU id"""
+    parts = split_fsp(text)
+    if len(parts) < 2:
+        raise ValueError(f"Invalid FSP: {text!r}")
+    return FSP(text, parse_port(parts[:-1]), parts[-1])
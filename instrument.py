@@ -0,0 +1,279 @@
+"""Optional instrumentation of the render path: call counters and latency histograms
+
+Usage:
+    python bulk.py workorder.csv -o scripts/ --profile
+    python bulk.py workorder.csv -o scripts/ --metrics metrics.prom
+    OLT_METRICS=metrics.prom python GUITest.py
+
+enable() wraps validator.validate, validator.validate_columns, the FSP parsing
+of templates.render, config_core.create_config_string, every
+generate_*_config and config_delta.render_delta; disable() puts the originals
+back. Nothing is wrapped until enable() is called, so the normal path pays
+nothing. Every call is recorded per (stage, brand, mode, registration), mode
+being "pppoe" or "ipoe" and registration "new" or "replace"; stages that do
+not get a brand themselves (FSP parsing) are labelled with the record being
+rendered by the same thread. Stages nest: "create_config" includes
+"generate", which includes "parse_fsp".
+
+Output writing and the clipboard are timed by their callers with timed().
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import wraps
+import threading
+import time
+
+import config_core
+import templates
+import validator
+
+# Histogram bucket upper bounds in seconds, a render is typically 5-50 us
+BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+           0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Labels = Tuple[str, str, str, str]   # (stage, brand, mode, registration)
+
+
+class Histogram:
+    """Latency distribution of one stage, with its error count"""
+    __slots__ = ('buckets', 'count', 'sum', 'errors')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, ok: bool = True):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if not ok:
+            self.errors += 1
+
+    def merge(self, other: 'Histogram'):
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.sum += other.sum
+        self.errors += other.errors
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q quantile (the last bound for the overflow bucket)"""
+        wanted = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return bound
+        return BUCKETS[-1]
+
+
+class Metrics:
+    """Histograms per (stage, brand, mode, registration) and free-form counters"""
+
+    def __init__(self):
+        self.histograms: Dict[Labels, Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observe(self, stage: str, brand: str, mode: str, registration: str, seconds: float, ok: bool = True):
+        labels = (stage, brand, mode, registration)
+        histogram = self.histograms.get(labels)
+        if histogram is None:
+            histogram = self.histograms[labels] = Histogram()
+        histogram.observe(seconds, ok)
+
+    def count(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def merge(self, other: 'Metrics'):
+        """Add the metrics of a worker process"""
+        for labels, histogram in other.histograms.items():
+            self.histograms.setdefault(labels, Histogram()).merge(histogram)
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def report(self) -> str:
+        """Table of every stage, slowest total first"""
+        lines = [f"{'stage':16s} {'brand':10s} {'mode':8s} {'registration':12s} {'calls':>8s} {'errors':>7s} "
+                 f"{'total ms':>10s} {'mean us':>9s} {'p50 us':>8s} {'p95 us':>8s}"]
+        for (stage, brand, mode, registration), histogram in sorted(self.histograms.items(),
+                                                                     key=lambda item: -item[1].sum):
+            mean = histogram.sum / histogram.count if histogram.count else 0.0
+            lines.append(f"{stage:16s} {brand or '-':10s} {mode or '-':8s} {registration or '-':12s} "
+                         f"{histogram.count:8d} "
+                         f"{histogram.errors:7d} {histogram.sum * 1000:10.1f} {mean * 1e6:9.1f} "
+                         f"{histogram.quantile(0.5) * 1e6:8.0f} {histogram.quantile(0.95) * 1e6:8.0f}")
+        return '\n'.join(lines)
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = ["# HELP oltconfig_stage_seconds Time spent per render stage",
+                 "# TYPE oltconfig_stage_seconds histogram"]
+        for (stage, brand, mode, registration), histogram in sorted(self.histograms.items()):
+            labels = f'stage="{stage}",brand="{brand}",mode="{mode}",registration="{registration}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f'oltconfig_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'oltconfig_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'oltconfig_stage_seconds_sum{{{labels}}} {histogram.sum:.9f}')
+            lines.append(f'oltconfig_stage_seconds_count{{{labels}}} {histogram.count}')
+
+        lines += ["# HELP oltconfig_stage_errors_total Calls of a render stage that raised",
+                  "# TYPE oltconfig_stage_errors_total counter"]
+        for (stage, brand, mode, registration), histogram in sorted(self.histograms.items()):
+            lines.append(f'oltconfig_stage_errors_total{{stage="{stage}",brand="{brand}",mode="{mode}",'
+                         f'registration="{registration}"}} {histogram.errors}')
+
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE oltconfig_{name}_total counter")
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    text = ','.join(f'{label}="{value}"' for label, value in labels)
+                    lines.append(f"oltconfig_{name}_total{{{text}}} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(self.prometheus())
+
+
+METRICS = Metrics()
+
+# Called with (stage, brand, mode, registration, seconds, ok) after every instrumented call
+HOOKS: List[Callable[[str, str, str, str, float, bool], None]] = []
+
+
+class _Record(threading.local):
+    """(brand, mode, registration) of the record this thread renders, for stages that do not know it"""
+
+    def __init__(self):
+        self.labels = ("", "", "")
+
+
+# Thread-local: the GUI renders on a worker thread while the Tk thread writes output
+_record = _Record()
+
+# Positions of is_replacement and is_pppoe in validate() and create_config_string(), for positional calls
+_REPLACEMENT_ARG = 7
+_PPPOE_ARG = 8
+
+# (module or dict, attribute or key, original) of every wrapped function, while enabled
+_originals: List[Tuple[object, str, Callable]] = []
+
+
+def _observe(stage: str, brand: str, mode: str, registration: str, seconds: float, ok: bool):
+    METRICS.observe(stage, brand, mode, registration, seconds, ok)
+    for hook in HOOKS:
+        hook(stage, brand, mode, registration, seconds, ok)
+
+
+def _call_labels(args: tuple, kwargs: Dict) -> Tuple[str, str, str]:
+    """(brand, mode, registration) of a validate/create_config_string/render_delta/generate call"""
+    brand = kwargs.get("brand") or (args[0] if args else "")
+    pppoe = kwargs.get("is_pppoe", args[_PPPOE_ARG] if len(args) > _PPPOE_ARG else True)
+    replacement = kwargs.get("is_replacement", len(args) > _REPLACEMENT_ARG and args[_REPLACEMENT_ARG])
+    return brand, "pppoe" if pppoe else "ipoe", "replace" if replacement else "new"
+
+
+def _instrumented(stage: str, function: Callable, brand: Optional[str] = None,
+                  labelled: bool = False) -> Callable:
+    """Wrap function so every call is observed
+
+    The labels come from the brand, is_pppoe and is_replacement arguments of
+    the call when labelled (brand fixed when given), or else from the record
+    the calling thread is rendering.
+    """
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        outer = labels = _record.labels
+        if brand is not None or labelled:
+            labels = _call_labels(args, kwargs)
+            if brand is not None:
+                labels = (brand,) + labels[1:]
+            _record.labels = labels
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = function(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            _observe(stage, *labels, time.perf_counter() - started, ok)
+            _record.labels = outer
+
+    return wrapper
+
+
+def _patch(module: object, attribute: str, stage: str, labelled: bool = False):
+    original = getattr(module, attribute)
+    _originals.append((module, attribute, original))
+    setattr(module, attribute, _instrumented(stage, original, labelled=labelled))
+
+
+def enable():
+    """Wrap the render path, a no-op when already enabled"""
+    if _originals:
+        return
+    # Imported here: config_delta pulls in the inventory modules (and sqlite3), which the GUI does not need
+    import config_delta
+
+    _patch(validator, "validate", "validate", labelled=True)
+    _patch(validator, "validate_columns", "validate_columns")
+    _patch(templates, "parse_fsp", "parse_fsp")
+    _patch(config_core, "create_config_string", "create_config", labelled=True)
+    _patch(config_delta, "render_delta", "render_delta", labelled=True)
+    for brand, generator in list(config_core.CONFIG_GENERATORS.items()):
+        _originals.append((config_core.CONFIG_GENERATORS, brand, generator))
+        config_core.CONFIG_GENERATORS[brand] = _instrumented("generate", generator, brand)
+
+
+def disable():
+    """Put the original functions back"""
+    for target, attribute, original in _originals:
+        if isinstance(target, dict):
+            target[attribute] = original
+        else:
+            setattr(target, attribute, original)
+    _originals.clear()
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def drain() -> Metrics:
+    """Return the metrics collected so far and start over, for worker processes"""
+    global METRICS
+    metrics, METRICS = METRICS, Metrics()
+    return metrics
+
+
+class _Timer:
+    __slots__ = ('stage', 'brand', 'mode', 'registration', 'started')
+
+    def __init__(self, stage: str, brand: str, mode: str, registration: str):
+        self.stage = stage
+        self.brand = brand
+        self.mode = mode
+        self.registration = registration
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, traceback):
+        _observe(self.stage, self.brand, self.mode, self.registration, time.perf_counter() - self.started,
+                 exc_type is None)
+
+
+_NOT_TIMED = nullcontext()
+
+
+def timed(stage: str, brand: str = "", mode: str = "", registration: str = ""):
+    """Context manager observing a block as stage, free when instrumentation is off"""
+    if not _originals:
+        return _NOT_TIMED
+    return _Timer(stage, brand, mode, registration)
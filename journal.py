@@ -0,0 +1,121 @@
+"""Append-only job journal, fsynced in groups, so a stopped job resumes where it was
+
+Usage:
+    python bulk.py workorder.csv -o scripts/ --journal scripts.journal
+    python push.py scripts/ --devices devices.csv --journal push.journal
+
+    journal = Journal("scripts.journal", {"job": "bulk", "work_order": file_digest("workorder.csv")})
+    for entry in journal.entries: ...            # what earlier runs of the job recorded
+    journal.append({"script": "OLT-A.txt", "size": 4096, "hash": "...", "lines": [2, 3]})
+    journal.close()
+
+A journal is a JSON lines file. The first line describes the job (the work
+order digest, the output directory, ...), so a journal is never resumed
+against another job; every other line is an entry the job appended. Entries
+are buffered and written with one fsync per group, GROUP_SIZE entries or
+GROUP_SECONDS after the first one, whichever comes first. A crash loses at
+most the group in flight, whose work the next run simply does again, and a
+line torn by the crash is dropped when the journal is opened again. A job
+records an entry only once the work it vouches for is on disk itself. Work
+that must not be done twice (push.py sending a block to an OLT) calls
+commit() after each entry instead.
+"""
+from typing import Dict, List
+import hashlib
+import json
+import os
+import time
+
+# Entries written with one fsync at most, and the longest an entry waits for it
+GROUP_SIZE = 10000
+GROUP_SECONDS = 1.0
+
+
+class JournalError(ValueError):
+    """Raised for a journal that belongs to another job or that the job cannot resume from"""
+
+
+def digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def file_digest(path: str) -> str:
+    """Digest of a file's contents"""
+    sha = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()[:16]
+
+
+class Journal:
+    """Entries of one job: those of earlier runs in entries, new ones appended in fsynced groups"""
+
+    def __init__(self, path: str, header: Dict, group_size: int = GROUP_SIZE,
+                 group_seconds: float = GROUP_SECONDS):
+        self.path = path
+        self.header = header
+        self.group_size = group_size
+        self.group_seconds = group_seconds
+        self.entries: List[Dict] = []
+        self.commits = 0
+        self._pending: List[str] = []
+        self._deadline = 0.0
+        if os.path.exists(path) and self._load():
+            self._handle = open(path, 'a', encoding='utf-8')
+        else:
+            self._handle = open(path, 'w', encoding='utf-8')
+            self._handle.write(json.dumps(header) + '\n')
+            self._sync()
+
+    def _load(self) -> bool:
+        """Read the entries of earlier runs, False when the journal has no complete line yet"""
+        with open(self.path, 'rb') as handle:
+            data = handle.read()
+        lines = data.split(b'\n')
+        # The part after the last newline is a line the previous run did not finish writing
+        complete = len(data) - len(lines[-1])
+        if complete < len(data):
+            os.truncate(self.path, complete)
+        try:
+            records = [json.loads(line) for line in lines[:-1]]
+        except ValueError as e:
+            raise JournalError(f"{self.path}: damaged journal ({e}), remove it to start over") from None
+        if not records:
+            return False
+
+        header = records[0]
+        for key in sorted(set(header) | set(self.header)):
+            if header.get(key) != self.header.get(key):
+                raise JournalError(f"{self.path} is the journal of another job ({key}: "
+                                   f"{header.get(key)!r}, now {self.header.get(key)!r}); "
+                                   f"remove it or use another journal")
+        self.entries = records[1:]
+        return True
+
+    def append(self, entry: Dict):
+        """Record an entry, written with the rest of its group"""
+        if not self._pending:
+            self._deadline = time.monotonic() + self.group_seconds
+        self._pending.append(json.dumps(entry, separators=(',', ':')))
+        if len(self._pending) >= self.group_size or time.monotonic() >= self._deadline:
+            self.commit()
+
+    def commit(self):
+        """Write and fsync the pending entries"""
+        if not self._pending:
+            return
+        self._handle.write('\n'.join(self._pending) + '\n')
+        self._sync()
+        self._pending.clear()
+        self.commits += 1
+
+    def _sync(self):
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def close(self):
+        if self._handle is not None:
+            self.commit()
+            self._handle.close()
+            self._handle = None
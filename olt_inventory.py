@@ -0,0 +1,320 @@
+"""OLT inventory store built from saved "display"/"show" CLI output
+
+The dumps a technician saves from an OLT are parsed line by line and merged
+into a SQLite file with one row per ONU (olt, brand, fsp, sn, state, vlan),
+indexed for the lookups the generator needs: SN -> FSP, FSP -> SN and
+VLAN -> ONUs. Opening the store is instant, so it is simply reopened on startup.
+SNs are stored and looked up in their 16 hex digit form (see sn_index.py), so
+"HWTC1234ABCD" and "485754431234ABCD" are the same ONU.
+
+Recognized output per brand:
+    huawei     display ont info, display service-port all, current-configuration
+    zte_*      show gpon onu baseinfo, show gpon onu state, running-config
+    raisecom   show gpon-onu information, running-config
+    bdcom      show gpon onu-information, running-config
+
+Usage:
+    python olt_inventory.py load inventory.db --brand huawei OLT-A.txt [OLT-B.txt ...]
+    python olt_inventory.py sn inventory.db HWTC12345678
+    python olt_inventory.py fsp inventory.db OLT-A 0/1/5/17
+    python olt_inventory.py vlan inventory.db OLT-A 2801
+"""
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+import argparse
+import os
+import re
+import sqlite3
+import sys
+
+from sn_index import normalize_sn
+
+_digits = re.compile(r'\d+')
+
+SN_TOKEN = re.compile(r'\b(?:[0-9A-Fa-f]{16}|[A-Za-z]{4}[0-9A-Fa-f]{8})\b')
+
+STATE_TOKEN = re.compile(
+    r'\b(online|offline|working|ready|los|dyinggasp|syncmib|logging|authpass|active|inactive|up|down)\b',
+    re.IGNORECASE
+)
+
+# Line rules per brand, tried in order, the first match wins:
+#   onu      the line names the ONU (port + onu), sn/state/vlan when present;
+#            a bare port + onu rule is a table row whose SN and state are
+#            searched for in the rest of the line
+#   port     running-config interface of a PON port (or Huawei board, with
+#            the pon given by the onu_add line)
+#   onu_add  ONU created under the current port
+#   context  running-config interface of an ONU
+#   vlan     VLAN of the ONU of the current context
+DUMP_RULES = {
+    "huawei": [
+        ("onu", r'^\s*(?P<port>\d+\s*/\s*\d+\s*/\s*\d+)\s+(?P<onu>\d+)\s+(?P<sn>[0-9A-Fa-f]{16})\s+\S+\s+(?P<state>\S+)'),
+        ("onu", r'^\s*\d+\s+(?P<vlan>\d+)\s+\S+\s+x?gpon\s+(?P<port>\d+\s*/\s*\d+\s*/\s*\d+)\s+(?P<onu>\d+)\s+\d+'),
+        ("onu", r'^\s*service-port (?:\d+ )?vlan (?P<vlan>\d+) gpon (?P<port>\d+/\d+/\d+) ont (?P<onu>\d+)'),
+        ("port", r'^\s*interface gpon (?P<port>\d+/\d+)\s*$'),
+        ("onu_add", r'^\s*ont add (?P<pon>\d+) (?P<onu>\d+) sn-auth "?(?P<sn>\w+)'),
+    ],
+    "zte": [
+        ("onu", r'gpon[-_]onu[-_](?P<port>\d+/\d+/\d+):(?P<onu>\d+)\s+\S+\s+\S+\s+SN:(?P<sn>\w+)\s+(?P<state>\S+)'),
+        # show gpon onu state: OnuIndex, Admin State, OMCC State, O7 State, Phase State
+        ("onu", r'^\s*(?P<port>\d+/\d+/\d+):(?P<onu>\d+)\s+(?:enable|disable)\s+\S+\s+\S+\s+(?P<state>\S+)'),
+        ("port", r'^\s*interface gpon[-_]olt[-_](?P<port>\d+/\d+/\d+)'),
+        ("onu_add", r'^\s*onu (?P<onu>\d+) type \S+ sn (?P<sn>\w+)'),
+        ("context", r'^\s*(?:interface (?:gpon[-_]onu[-_]|vport-)|pon-onu-mng gpon[-_]onu[-_])'
+                    r'(?P<port>\d+/\d+/\d+)[.:](?P<onu>\d+)'),
+        ("vlan", r'^\s*service-port \d+ (?:vport \d+ )?user-vlan (?P<vlan>\d+)'),
+    ],
+    "raisecom": [
+        ("onu", r'^\s*(?P<port>\d+/\d+)/(?P<onu>\d+)\s'),
+        ("port", r'^\s*interface gpon-olt (?P<port>\d+/\d+)'),
+        ("onu_add", r'^\s*create gpon-onu (?P<onu>\d+) sn (?P<sn>\w+)'),
+        ("context", r'^\s*(?:interface )?gpon-onu (?P<port>\d+/\d+)/(?P<onu>\d+)\s*$'),
+        ("vlan", r'^\s*iphost \d+ vlan (?P<vlan>\d+)'),
+    ],
+    "bdcom": [
+        ("onu", r'^\s*gpon\s*0/(?P<port>\d+):(?P<onu>\d+)\s'),
+        ("context", r'^\s*interface gpon\s*0/(?P<port>\d+):(?P<onu>\d+)'),
+        ("vlan", r'^\s*gpon onu wan \d+ tci vlan (?P<vlan>\d+)'),
+    ],
+}
+
+DUMP_RULES["zte_c610"] = DUMP_RULES["zte_c320"] = DUMP_RULES.pop("zte")
+
+_compiled_rules = {
+    brand: [(kind, re.compile(pattern, re.IGNORECASE)) for kind, pattern in rules]
+    for brand, rules in DUMP_RULES.items()
+}
+
+
+class OnuEntry(NamedTuple):
+    """What a dump says about one ONU; fields it does not mention are empty"""
+    fsp: str
+    sn: str = ""
+    state: str = ""
+    vlan: str = ""
+
+
+class StoredOnu(NamedTuple):
+    olt: str
+    brand: str
+    fsp: str
+    sn: str
+    state: str
+    vlan: str
+
+
+def _path(text: str) -> str:
+    """Normalize "0/ 1/5" style port columns to "0/1/5" """
+    return '/'.join(_digits.findall(text))
+
+
+def parse_dump(lines: Iterable[str], brand: str) -> Iterator[OnuEntry]:
+    """Yield an OnuEntry for every line of a dump that says something about an ONU"""
+    if brand not in _compiled_rules:
+        raise ValueError(f"Unknown OLT brand: {brand}")
+    rules = _compiled_rules[brand]
+
+    port = None      # PON port (or Huawei board) of the running-config section
+    onu_fsp = None   # ONU of the running-config section
+
+    for line in lines:
+        for kind, pattern in rules:
+            match = pattern.search(line)
+            if match:
+                break
+        else:
+            continue
+
+        groups = match.groupdict()
+        if kind == "onu":
+            sn = groups.get("sn")
+            state = groups.get("state")
+            if sn is None and state is None and "vlan" not in groups:
+                # Generic table row: SN and state are wherever the columns put them
+                rest = line[match.end():]
+                found = SN_TOKEN.search(rest)
+                if not found:
+                    # A table row without an SN is not an ONU row
+                    continue
+                sn = found.group()
+                found = STATE_TOKEN.search(rest)
+                state = found.group() if found else ""
+            yield OnuEntry(f"{_path(groups['port'])}/{groups['onu']}", normalize_sn(sn or ""),
+                           (state or "").lower(), groups.get("vlan") or "")
+        elif kind == "port":
+            port = _path(groups["port"])
+            onu_fsp = None
+        elif kind == "onu_add" and port is not None:
+            path = f"{port}/{groups['pon']}" if groups.get("pon") else port
+            yield OnuEntry(f"{path}/{groups['onu']}", normalize_sn(groups["sn"]))
+        elif kind == "context":
+            onu_fsp = f"{_path(groups['port'])}/{groups['onu']}"
+        elif kind == "vlan" and onu_fsp is not None:
+            yield OnuEntry(onu_fsp, vlan=groups["vlan"])
+
+
+def merge_entries(entries: Iterable[OnuEntry]) -> Dict[str, OnuEntry]:
+    """Combine the entries of one dump per FSP, later non-empty fields win"""
+    merged: Dict[str, OnuEntry] = {}
+    for entry in entries:
+        known = merged.get(entry.fsp)
+        if known is None:
+            merged[entry.fsp] = entry
+        else:
+            merged[entry.fsp] = OnuEntry(entry.fsp, entry.sn or known.sn,
+                                         entry.state or known.state, entry.vlan or known.vlan)
+    return merged
+
+
+class InventoryStore:
+    """SQLite backed ONU inventory keyed by (olt, fsp) with SN and VLAN indexes"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS onus (
+            olt TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            fsp TEXT NOT NULL,
+            sn TEXT NOT NULL DEFAULT '',
+            state TEXT NOT NULL DEFAULT '',
+            vlan TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (olt, fsp)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS onus_sn ON onus (sn);
+        CREATE INDEX IF NOT EXISTS onus_vlan ON onus (olt, vlan);
+    """
+
+    # Fields a dump does not mention keep what the store already had
+    UPSERT = """
+        INSERT INTO onus (olt, brand, fsp, sn, state, vlan) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (olt, fsp) DO UPDATE SET
+            brand = excluded.brand,
+            sn = CASE WHEN excluded.sn != '' THEN excluded.sn ELSE sn END,
+            state = CASE WHEN excluded.state != '' THEN excluded.state ELSE state END,
+            vlan = CASE WHEN excluded.vlan != '' THEN excluded.vlan ELSE vlan END
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(self.SCHEMA)
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM onus").fetchone()[0]
+
+    def add_entries(self, olt: str, brand: str, entries: Iterable[OnuEntry]) -> int:
+        """Store entries of one OLT in a single transaction, returns how many"""
+        rows = [(olt, brand, entry.fsp, entry.sn, entry.state, entry.vlan) for entry in entries]
+        with self.db:
+            self.db.executemany(self.UPSERT, rows)
+        return len(rows)
+
+    def add(self, olt: str, brand: str, fsp: str, sn: str = "", state: str = "", vlan: str = ""):
+        """Store one ONU; it is written by the next commit() or close()"""
+        self.db.execute(self.UPSERT, (olt, brand, fsp, normalize_sn(sn), state, vlan))
+
+    def commit(self):
+        self.db.commit()
+
+    def load_dump(self, path: str, brand: str, olt: Optional[str] = None) -> int:
+        """Parse a saved dump into the store, olt defaults to the file name; returns the ONU count"""
+        if olt is None:
+            olt = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding='utf-8', errors='replace') as handle:
+            merged = merge_entries(parse_dump(handle, brand))
+        return self.add_entries(olt, brand, merged.values())
+
+    def forget(self, olt: str):
+        """Drop every ONU of an OLT, before loading a complete fresh dump"""
+        with self.db:
+            self.db.execute("DELETE FROM onus WHERE olt = ?", (olt,))
+
+    def by_sn(self, sn: str) -> List[StoredOnu]:
+        """Every ONU registered with an SN, in either spelling, on any OLT"""
+        rows = self.db.execute("SELECT * FROM onus WHERE sn = ?", (normalize_sn(sn),))
+        return [StoredOnu(*row) for row in rows]
+
+    def by_fsp(self, olt: str, fsp: str) -> Optional[StoredOnu]:
+        """The ONU at an F/S/P/ONU of an OLT, None when the slot is free"""
+        row = self.db.execute("SELECT * FROM onus WHERE olt = ? AND fsp = ?", (olt, fsp)).fetchone()
+        return StoredOnu(*row) if row else None
+
+    def by_vlan(self, olt: str, vlan: str) -> List[StoredOnu]:
+        """Every ONU of an OLT on a VLAN"""
+        rows = self.db.execute("SELECT * FROM onus WHERE olt = ? AND vlan = ?", (olt, vlan))
+        return [StoredOnu(*row) for row in rows]
+
+    def olts(self) -> List[str]:
+        return [row[0] for row in self.db.execute("SELECT DISTINCT olt FROM onus")]
+
+    def records(self) -> Iterator[Dict]:
+        """Every ONU as an inventory dict (olt, brand, fsp, ...), see onu_alloc.read_inventory"""
+        for row in self.db.execute("SELECT * FROM onus"):
+            yield StoredOnu(*row)._asdict()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def is_store_path(path: str) -> bool:
+    """Whether an inventory path names a SQLite store rather than a CSV/JSONL file"""
+    return path.lower().endswith(('.db', '.sqlite', '.sqlite3'))
+
+
+def print_onus(onus: Iterable[StoredOnu]) -> int:
+    count = 0
+    for onu in onus:
+        print(f"{onu.olt}\t{onu.brand}\t{onu.fsp}\t{onu.sn}\t{onu.state}\t{onu.vlan}")
+        count += 1
+    return count
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build and query the OLT inventory store")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load = commands.add_parser('load', help="Parse saved OLT dumps into the store")
+    load.add_argument('store', help="SQLite inventory file")
+    load.add_argument('dumps', nargs='+', help="Saved CLI output, one file per OLT named after the OLT")
+    load.add_argument('--brand', required=True, choices=sorted(DUMP_RULES), help="OLT brand of the dumps")
+    load.add_argument('--olt', help="OLT name (default: the dump's file name)")
+    load.add_argument('--fresh', action='store_true', help="Forget what the store had for these OLTs first")
+
+    sn = commands.add_parser('sn', help="Where an SN is registered")
+    sn.add_argument('store')
+    sn.add_argument('sn')
+
+    fsp = commands.add_parser('fsp', help="Which ONU is at an F/S/P/ONU")
+    fsp.add_argument('store')
+    fsp.add_argument('olt')
+    fsp.add_argument('fsp')
+
+    vlan = commands.add_parser('vlan', help="ONUs of an OLT on a VLAN")
+    vlan.add_argument('store')
+    vlan.add_argument('olt')
+    vlan.add_argument('vlan')
+
+    args = parser.parse_args(argv)
+    store = InventoryStore(args.store)
+    try:
+        if args.command == 'load':
+            for path in args.dumps:
+                olt = args.olt or os.path.splitext(os.path.basename(path))[0]
+                if args.fresh:
+                    store.forget(olt)
+                count = store.load_dump(path, args.brand, olt)
+                print(f"{path}: {count} ONUs for {olt}", file=sys.stderr)
+            return 0
+        if args.command == 'sn':
+            found = print_onus(store.by_sn(args.sn))
+        elif args.command == 'fsp':
+            found = print_onus(filter(None, [store.by_fsp(args.olt, args.fsp)]))
+        else:
+            found = print_onus(store.by_vlan(args.olt, args.vlan))
+        return 0 if found else 1
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
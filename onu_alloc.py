@@ -0,0 +1,143 @@
+"""ONU id allocation with a per-PON occupancy index
+
+Every PON port of every OLT gets one integer bitmap of the ONU ids in use, so
+checking an id is a bit test and the lowest free id is found with a couple of
+integer operations, however full the port is.
+
+The inventory file is a CSV (or JSONL) with olt and fsp columns, one existing
+ONU per row; a brand column selects the ONU id range (default 1-128). A
+SQLite store built by olt_inventory.py (.db) can be used instead.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import csv
+import json
+import os
+
+import brands
+from fsp import parse_fsp
+from olt_inventory import InventoryStore, is_store_path
+
+# ONU ids of a brand that is not known; known brands declare Brand.onu_ids
+DEFAULT_ONU_ID_RANGE = (1, 128)
+
+
+class OnuIdCollision(ValueError):
+    """Raised when an ONU id is already in use on its PON port"""
+
+
+class PonFull(ValueError):
+    """Raised when a PON port has no free ONU id left"""
+
+
+class OnuIdAllocator:
+    """Occupancy bitmaps keyed by (olt, port path), bit n set when ONU id n is used"""
+
+    def __init__(self):
+        self._used: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return sum(bin(bitmap).count('1') for bitmap in self._used.values())
+
+    def is_used(self, olt: str, port: str, onu_id: int) -> bool:
+        return bool(self._used.get((olt, port), 0) >> onu_id & 1)
+
+    def occupy(self, olt: str, fsp: str):
+        """Mark the ONU of an F/S/P/ONU entry as used, raises OnuIdCollision if it already is"""
+        parsed = parse_fsp(fsp)
+        key = (olt, parsed.port.path)
+        bit = 1 << int(parsed.onu)
+        bitmap = self._used.get(key, 0)
+        if bitmap & bit:
+            raise OnuIdCollision(f"ONU {parsed.onu} is already registered on {olt} {parsed.port.path}")
+        self._used[key] = bitmap | bit
+
+    def release(self, olt: str, fsp: str):
+        """Mark the ONU of an F/S/P/ONU entry as free again"""
+        parsed = parse_fsp(fsp)
+        key = (olt, parsed.port.path)
+        self._used[key] = self._used.get(key, 0) & ~(1 << int(parsed.onu))
+
+    def allocate(self, olt: str, port: str, brand: Optional[str] = None) -> str:
+        """Reserve the lowest free ONU id on a port and return the full F/S/P/ONU entry"""
+        first, last = brands.get(brand).onu_ids if brand and brands.is_known(brand) else DEFAULT_ONU_ID_RANGE
+        key = (olt, port)
+        bitmap = self._used.get(key, 0)
+
+        # Ids below the brand's first id count as used, so they are never handed out
+        free = ~(bitmap | ((1 << first) - 1))
+        onu_id = (free & -free).bit_length() - 1
+        if onu_id > last:
+            raise PonFull(f"No free ONU id left on {olt} {port}")
+
+        self._used[key] = bitmap | (1 << onu_id)
+        return f"{port}/{onu_id}"
+
+    def load(self, path: str) -> int:
+        """Add the ONUs of an inventory file, returns how many were loaded"""
+        count = 0
+        for record in read_inventory(path):
+            olt = (record.get('olt') or record.get('brand') or '').strip()
+            try:
+                self.occupy(olt, record['fsp'].strip())
+            except ValueError:
+                # Duplicate or unparsable rows do not change the occupancy
+                continue
+            count += 1
+        return count
+
+
+def read_inventory(path: str) -> Iterable[Dict]:
+    """Yield the rows of a CSV or JSONL inventory file, or of an inventory store"""
+    if is_store_path(path):
+        store = InventoryStore(path)
+        try:
+            yield from store.records()
+        finally:
+            store.close()
+        return
+
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.lower().endswith(('.jsonl', '.json')):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+class InventoryWriter:
+    """Appends (olt, brand, fsp, sn) entries to a CSV or JSONL inventory file, or an inventory store"""
+
+    def __init__(self, path: str):
+        self.store = InventoryStore(path) if is_store_path(path) else None
+        if self.store is not None:
+            return
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.is_jsonl = path.lower().endswith(('.jsonl', '.json'))
+        self.handle = open(path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.handle)
+        if is_new:
+            self.columns = ['olt', 'brand', 'fsp', 'sn']
+            if not self.is_jsonl:
+                self.writer.writerow(self.columns)
+        elif not self.is_jsonl:
+            # Older inventories have no sn column, keep writing the columns the file has
+            with open(path, newline='', encoding='utf-8') as existing:
+                self.columns = next(csv.reader(existing), [])
+
+    def add(self, olt: str, brand: str, fsp: str, sn: str = ''):
+        if self.store is not None:
+            self.store.add(olt, brand, fsp, sn)
+            return
+
+        entry = {'olt': olt, 'brand': brand, 'fsp': fsp, 'sn': sn}
+        if self.is_jsonl:
+            self.handle.write(json.dumps(entry) + '\n')
+        else:
+            self.writer.writerow([entry.get(column, '') for column in self.columns])
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+        else:
+            self.handle.close()
@@ -0,0 +1,343 @@
+"""Service profile catalog: per VLAN bandwidth, ONU profile names and allowed modes
+
+Usage:
+    python bulk.py workorder.csv -o scripts/ --profiles profiles.json
+    OLT_PROFILES=profiles.json python GUITest.py
+    python profile_catalog.py > profiles.json      # the built-in catalog, as a starting point
+
+A catalog file is JSON:
+
+    {
+      "defaults": {
+        "modes": ["pppoe", "ipoe"],
+        "pppoe": {"line_profile": "ICONNET.PPPOE.{vlan}", "srv_profile": "ICONNET.PPPOE.{vlan}",
+                  "tcont_profile": "PPPOE"},
+        "ipoe": {"line_profile": "AUTOPROV.{bandwidth}", "srv_profile": "AUTOPROV.{bandwidth}",
+                 "tcont_profile": "{bandwidth}Mbps"}
+      },
+      "vlans": {
+        "2801": {"bandwidth": "10"},
+        "2828": {"bandwidth": "20", "ipoe": {"line_profile": "AUTOPROV.{bandwidth}-{vlan}"}},
+        "2900-2999": {"modes": ["pppoe"]}
+      },
+      "regions": {
+        "JATIM": {"olts": ["OLT-SBY-1", "OLT-MLG-2"], "vlans": {"2801": {"bandwidth": "15"}}}
+      }
+    }
+
+A VLAN entry (a single VLAN or a "first-last" range) overrides the defaults,
+a region's defaults and VLAN entries override the top-level ones for the OLTs
+it lists. Profile names are formatted with {vlan} and {bandwidth} when the
+catalog is loaded, so a render only looks up a ready Profile by (VLAN, mode).
+
+The catalog in use is replaced when its file changes: current() checks the
+file's modification time at most once every RELOAD_CHECK_SECONDS, so the GUI
+and long-running services pick up an edited catalog without a restart. A file
+that fails to load leaves the previous catalog in place (see last_error).
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import os
+import sys
+import threading
+import time
+
+MODES = ("pppoe", "ipoe")
+
+PROFILE_FIELDS = ("line_profile", "srv_profile", "tcont_profile")
+
+# Seconds between two checks of the catalog file for changes
+RELOAD_CHECK_SECONDS = 1.0
+
+# IPoE profiles of VLANs whose profiles are named after the VLAN as well as the bandwidth
+_NAMED_BY_VLAN = {"line_profile": "AUTOPROV.{bandwidth}-{vlan}", "srv_profile": "AUTOPROV.{bandwidth}-{vlan}"}
+
+# The catalog used without a catalog file
+BUILTIN = {
+    "defaults": {
+        "modes": ["pppoe", "ipoe"],
+        "pppoe": {"line_profile": "ICONNET.PPPOE.{vlan}", "srv_profile": "ICONNET.PPPOE.{vlan}",
+                  "tcont_profile": "PPPOE"},
+        "ipoe": {"line_profile": "AUTOPROV.{bandwidth}", "srv_profile": "AUTOPROV.{bandwidth}",
+                 "tcont_profile": "{bandwidth}Mbps"},
+    },
+    "vlans": {
+        # PPPoE only, the BRAS sets the speed; brands whose templates read no profile render IPoE anyway
+        "2900-2999": {"modes": ["pppoe"]},
+        "2801": {"bandwidth": "10"}, "2802": {"bandwidth": "10"},
+        "2828": {"bandwidth": "20", "ipoe": _NAMED_BY_VLAN},
+        "2887": {"bandwidth": "5"}, "2888": {"bandwidth": "20"}, "2889": {"bandwidth": "50"},
+        "2890": {"bandwidth": "100"}, "1601": {"bandwidth": "10"}, "1602": {"bandwidth": "20"},
+        "1603": {"bandwidth": "30"}, "1604": {"bandwidth": "50"}, "1605": {"bandwidth": "100"},
+        "2820": {"bandwidth": "10", "ipoe": _NAMED_BY_VLAN},
+        "2830": {"bandwidth": "20", "ipoe": _NAMED_BY_VLAN},
+        "2819": {"bandwidth": "50", "ipoe": _NAMED_BY_VLAN},
+    },
+}
+
+
+class ProfileCatalogError(ValueError):
+    """Raised for a catalog file that cannot be loaded"""
+
+
+class UnknownProfile(ValueError):
+    """Raised for a VLAN that has no profile for the requested mode"""
+
+
+class Profile(NamedTuple):
+    """What a VLAN means in one mode: its bandwidth (Mbps, '' if none) and ONU profile names"""
+    vlan: str
+    mode: str
+    bandwidth: str
+    line_profile: str
+    srv_profile: str
+    tcont_profile: str
+
+
+class ProfileTable:
+    """Profiles of one scope (the defaults or a region), indexed by (vlan, is_pppoe)"""
+    __slots__ = ('name', 'vlans', 'keys', '_profiles', '_digest')
+
+    def __init__(self, name: str, profiles: Iterable[Profile]):
+        self.name = name
+        self._profiles: Dict[Tuple[str, bool], Profile] = {
+            (profile.vlan, profile.mode == "pppoe"): profile for profile in profiles}
+        self.vlans = frozenset(vlan for vlan, _ in self._profiles)
+        self.keys = frozenset(self._profiles)
+        self._digest: Optional[str] = None
+
+    @property
+    def digest(self) -> str:
+        """Short hash of every profile, changes whenever a render could"""
+        if self._digest is None:
+            # Imported here: only render caches need the digest, hashlib adds to every startup
+            import hashlib
+            data = repr(sorted(self._profiles.values()))
+            self._digest = hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]
+        return self._digest
+
+    def __contains__(self, vlan: str) -> bool:
+        return vlan in self.vlans
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def get(self, vlan: str, is_pppoe: bool) -> Optional[Profile]:
+        return self._profiles.get((vlan, is_pppoe))
+
+    def profile(self, vlan: str, is_pppoe: bool) -> Profile:
+        """Profile of a VLAN in a mode, raises UnknownProfile when it has none"""
+        profile = self._profiles.get((vlan, is_pppoe))
+        if profile is None:
+            raise UnknownProfile(f"VLAN {vlan} has no {'PPPoE' if is_pppoe else 'IPoE'} profile")
+        return profile
+
+    def bandwidths(self) -> Dict[str, str]:
+        """VLAN -> bandwidth of every VLAN that has one"""
+        return {vlan: profile.bandwidth for (vlan, _), profile in self._profiles.items() if profile.bandwidth}
+
+
+class Catalog:
+    """Every scope of a catalog, with the OLT -> scope index"""
+    __slots__ = ('path', 'default', 'regions', '_by_olt')
+
+    def __init__(self, default: ProfileTable, regions: Dict[str, ProfileTable],
+                 olts: Dict[str, str], path: Optional[str] = None):
+        self.path = path
+        self.default = default
+        self.regions = regions
+        self._by_olt = {olt: regions[region] for olt, region in olts.items()}
+
+    def table(self, olt: str = "") -> ProfileTable:
+        """Profiles that apply to an OLT: its region's, or the defaults"""
+        return self._by_olt.get(olt, self.default) if olt else self.default
+
+
+def _expand_vlans(key: str) -> List[str]:
+    first, dash, last = key.partition('-')
+    if not first.isdigit() or dash and not last.isdigit():
+        raise ProfileCatalogError(f"Invalid VLAN {key!r}")
+    if not dash:
+        return [first]
+    if int(last) < int(first):
+        raise ProfileCatalogError(f"Invalid VLAN range {key!r}")
+    return [str(vlan) for vlan in range(int(first), int(last) + 1)]
+
+
+def _merge(base: Dict, override: Dict) -> Dict:
+    """Entry override on top of base, the per-mode profile names merged field by field"""
+    merged = dict(base, **override)
+    for mode in MODES:
+        if mode in base and mode in override:
+            merged[mode] = dict(base[mode], **override[mode])
+    return merged
+
+
+_ENTRY_KEYS = frozenset(("bandwidth", "modes") + MODES)
+
+
+def _check_entry(entry, where: str):
+    if not isinstance(entry, dict) or set(entry) - _ENTRY_KEYS:
+        raise ProfileCatalogError(f"{where}: expected an object with {', '.join(sorted(_ENTRY_KEYS))}")
+    if "bandwidth" in entry and not str(entry["bandwidth"]).isdigit():
+        raise ProfileCatalogError(f"{where}: invalid bandwidth {entry['bandwidth']!r}")
+    if "modes" in entry and (not isinstance(entry["modes"], list) or set(entry["modes"]) - set(MODES)):
+        raise ProfileCatalogError(f"{where}: modes must be a list of {', '.join(MODES)}")
+    for mode in MODES:
+        if mode in entry and (not isinstance(entry[mode], dict) or set(entry[mode]) - set(PROFILE_FIELDS)):
+            raise ProfileCatalogError(f"{where}: {mode} must be an object with {', '.join(PROFILE_FIELDS)}")
+
+
+def _entries(vlans: Dict, where: str) -> Dict[str, Dict]:
+    """VLAN -> entry, ranges expanded, later keys overriding earlier ones"""
+    entries = {}
+    for key, entry in vlans.items():
+        _check_entry(entry, f"{where} VLAN {key}")
+        for vlan in _expand_vlans(str(key)):
+            entries[vlan] = _merge(entries.get(vlan, {}), entry)
+    return entries
+
+
+def _build_table(name: str, defaults: Dict, entries: Dict[str, Dict], interned: Dict) -> ProfileTable:
+    profiles = []
+    for vlan, entry in entries.items():
+        entry = _merge(defaults, entry)
+        bandwidth = sys.intern(str(entry.get("bandwidth", "")))
+        for mode in entry.get("modes", MODES):
+            names = entry.get(mode, {})
+            try:
+                fields = [sys.intern(names.get(field, "").format(vlan=vlan, bandwidth=bandwidth))
+                          for field in PROFILE_FIELDS]
+            except (KeyError, IndexError, ValueError) as e:
+                raise ProfileCatalogError(f"{name} VLAN {vlan}: invalid {mode} profile name ({e})") from None
+            if not bandwidth and any("{bandwidth}" in names.get(field, "") for field in PROFILE_FIELDS):
+                raise ProfileCatalogError(f"{name} VLAN {vlan}: {mode} profiles need a bandwidth")
+            profile = Profile(sys.intern(vlan), mode, bandwidth, *fields)
+            # Regions repeating a default profile share the same tuple
+            profiles.append(interned.setdefault(profile, profile))
+    return ProfileTable(name, profiles)
+
+
+def parse_catalog(data: Dict, path: Optional[str] = None) -> Catalog:
+    """Build a Catalog from the JSON structure described above"""
+    if not isinstance(data, dict) or set(data) - {"defaults", "vlans", "regions"}:
+        raise ProfileCatalogError("expected an object with defaults, vlans and regions")
+    defaults = data.get("defaults", {})
+    _check_entry(defaults, "defaults")
+    entries = _entries(data.get("vlans", {}), "vlans")
+    interned: Dict[Profile, Profile] = {}
+    default = _build_table("default", defaults, entries, interned)
+
+    regions, olts = {}, {}
+    for region, spec in data.get("regions", {}).items():
+        if not isinstance(spec, dict) or set(spec) - {"olts", "defaults", "vlans"}:
+            raise ProfileCatalogError(f"region {region}: expected an object with olts, defaults and vlans")
+        region_defaults = spec.get("defaults", {})
+        _check_entry(region_defaults, f"region {region} defaults")
+        region_entries = dict(entries)
+        for vlan, entry in _entries(spec.get("vlans", {}), f"region {region}").items():
+            region_entries[vlan] = _merge(region_entries.get(vlan, {}), entry)
+        regions[region] = _build_table(region, _merge(defaults, region_defaults), region_entries, interned)
+        for olt in spec.get("olts", []):
+            if olt in olts:
+                raise ProfileCatalogError(f"OLT {olt} is in regions {olts[olt]} and {region}")
+            olts[olt] = region
+    return Catalog(default, regions, olts, path)
+
+
+def load(path: str) -> Catalog:
+    """Read a catalog file, raises ProfileCatalogError when it is unusable"""
+    # Imported here: the built-in catalog is a dict already, json is only needed for a file
+    import json
+
+    try:
+        with open(path, encoding='utf-8') as handle:
+            data = json.load(handle)
+    except (OSError, ValueError) as e:
+        raise ProfileCatalogError(f"{path}: {e}") from None
+    try:
+        return parse_catalog(data, path)
+    except ProfileCatalogError as e:
+        raise ProfileCatalogError(f"{path}: {e}") from None
+
+
+# The catalog in use, built from BUILTIN on first use unless use() set a file
+_catalog: Optional[Catalog] = None
+
+# (path, (mtime_ns, size)) of the watched catalog file, None when not watching
+_watched: Optional[Tuple[str, Tuple[int, int]]] = None
+_next_check = 0.0
+
+# Why the last reload of the watched file failed, None after a successful one
+last_error: Optional[str] = None
+
+# use() and reload() replace the globals above together; the GUI's Tk thread and
+# its render worker (or a service's executor threads) may call current() at once
+_lock = threading.RLock()
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def use(path: Optional[str], watch: bool = True):
+    """Use the catalog in path (the built-in one for None), reloading it when the file changes if watch"""
+    global _catalog, _watched, _next_check, last_error
+    with _lock:
+        if path is None:
+            _catalog, _watched = parse_catalog(BUILTIN), None
+        else:
+            try:
+                stamp = _stamp(path) if watch else None
+            except OSError as e:
+                raise ProfileCatalogError(f"{path}: {e}") from None
+            _catalog = load(path)
+            _watched = (path, stamp) if watch else None
+        _next_check = time.monotonic() + RELOAD_CHECK_SECONDS
+        last_error = None
+
+
+def reload() -> bool:
+    """Re-read the watched file if it changed, returns whether the catalog was replaced"""
+    global _catalog, _watched, _next_check, last_error
+    with _lock:
+        _next_check = time.monotonic() + RELOAD_CHECK_SECONDS
+        if _watched is None:
+            return False
+        path, stamp = _watched
+        try:
+            new_stamp = _stamp(path)
+        except OSError as e:
+            last_error = str(e)
+            return False
+        if new_stamp == stamp:
+            return False
+
+        # A file that fails to load is tried again once it changes again
+        _watched = (path, new_stamp)
+        try:
+            catalog = load(path)
+        except ProfileCatalogError as e:
+            last_error = str(e)
+            return False
+        _catalog, last_error = catalog, None
+        return True
+
+
+def current() -> Catalog:
+    """The catalog in use, reloaded first when its file changed"""
+    catalog = _catalog
+    if catalog is not None and (_watched is None or time.monotonic() < _next_check):
+        # Every render asks, so the common case does not take the lock
+        return catalog
+    with _lock:
+        if _catalog is None:
+            use(None)
+        elif _watched is not None and time.monotonic() >= _next_check:
+            reload()
+        return _catalog
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(BUILTIN, indent=2))
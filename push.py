@@ -0,0 +1,549 @@
+"""Push per-OLT scripts to the OLTs over pooled Telnet/SSH sessions
+
+Usage:
+    python push.py scripts/ --devices devices.csv
+    python push.py scripts/OLT-A.txt --devices devices.csv --max-olts 20 --log push.jsonl
+
+The scripts are the files bulk.py writes, one per OLT, named after the OLT;
+every config block (one ONU, starting at "config"/"config t") is sent command
+by command, waiting for the prompt and checking the output for the brand's
+error messages. A block that fails is abandoned (the session returns to
+privileged mode) and the next block continues.
+
+devices.csv has olt, brand, host, port, protocol (telnet/ssh), username,
+password, enable_password and max_sessions columns. Every OLT gets up to
+max_sessions persistent sessions (default 1) and at most --max-olts OLTs are
+worked on at once. SSH needs the optional asyncssh package.
+
+With --journal, the outcome of every block is recorded in a journal (see
+journal.py), keyed by the OLT and the block's text, and fsynced as soon as the
+block finishes rather than with a group: a block the journal lost would be
+configured on the OLT twice. Running the same command again skips the blocks
+the journal lists as pushed and retries the others, so after a push stopped
+halfway only the blocks that were in flight (at most one per session) are
+sent again. The journal records digests of the script files and the devices
+file; it is refused for other ones.
+
+fake_olt.py runs local simulated OLTs to try this against.
+"""
+from typing import Callable, Collection, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from collections import deque
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+from journal import Journal, JournalError, digest, file_digest
+
+# Telnet protocol bytes
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+
+PROMPT = re.compile(r'[\w.\-/:@]+(?:\([\w.\-/: ]*\))?[>#]\s*$')
+LOGIN_PROMPT = re.compile(r'(?:user ?name|login)\s*:\s*$', re.IGNORECASE)
+PASSWORD_PROMPT = re.compile(r'password\s*:\s*$', re.IGNORECASE)
+MORE_PROMPT = re.compile(r'-+\s*more\s*(?:\(.*?\))?\s*-*\s*$', re.IGNORECASE)
+
+# Questions the OLT asks in the middle of a command, and the answer
+CONFIRM_PROMPTS = [
+    (re.compile(r'\{\s*<cr>[^}]*\}:\s*$'), '\n'),          # Huawei optional parameters
+    (re.compile(r'\(y/n\)\s*(?:\[\w\])?:?\s*$', re.IGNORECASE), 'y\n'),
+]
+
+# Per brand: commands run once per session, the error lines and the command
+# that leaves any configuration mode
+BRAND_SESSION = {
+    "huawei": {
+        "setup": ["screen-length 0 temporary"],
+        "errors": r'^\s*(?:%\s*)?(?:Failure|Error|Unknown command|Parameter error|Incomplete command|Too many parameters)',
+        "reset": "return",
+    },
+    "zte": {
+        "setup": ["terminal length 0"],
+        "errors": r'^\s*%\s*(?:Error|Code|Invalid|Unknown|Incomplete|Ambiguous)',
+        "reset": "end",
+    },
+    "raisecom": {
+        "setup": ["terminal page-break disable"],
+        "errors": r'^\s*(?:%|Error|Invalid)',
+        "reset": "end",
+    },
+    "bdcom": {
+        "setup": ["terminal length 0"],
+        "errors": r'^\s*%\s*(?:Invalid|Unknown|Incomplete|Ambiguous|Error)',
+        "reset": "end",
+    },
+}
+
+BRAND_SESSION["zte_c610"] = BRAND_SESSION["zte_c320"] = BRAND_SESSION.pop("zte")
+
+_error_patterns = {brand: re.compile(rules["errors"], re.IGNORECASE | re.MULTILINE)
+                   for brand, rules in BRAND_SESSION.items()}
+
+# A config block starts at one of these lines
+BLOCK_START = frozenset(("config", "config t"))
+
+
+class Device(NamedTuple):
+    olt: str
+    brand: str
+    host: str
+    port: int = 23
+    protocol: str = "telnet"
+    username: str = ""
+    password: str = ""
+    enable_password: str = ""
+    max_sessions: int = 1
+
+
+class PushResult(NamedTuple):
+    """Outcome of one config block"""
+    olt: str
+    block: int
+    ok: bool
+    error: Optional[str]
+    seconds: float
+
+
+class CommandError(Exception):
+    """Raised when the OLT answers a command with an error"""
+
+    def __init__(self, command: str, output: str):
+        super().__init__(f"{command!r}: {output.strip()}")
+        self.command = command
+        self.output = output
+
+
+class TelnetConnection:
+    """Minimal Telnet on asyncio streams: refuses every option, passes text through"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> "TelnetConnection":
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def read(self) -> str:
+        data = await self.reader.read(4096)
+        if not data:
+            return ""
+        if IAC not in data:
+            return data.decode('utf-8', errors='replace')
+
+        text = bytearray()
+        replies = bytearray()
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte != IAC or i + 1 >= len(data):
+                text.append(byte)
+                i += 1
+                continue
+            command = data[i + 1]
+            if command == IAC:
+                text.append(IAC)
+                i += 2
+            elif command in (DO, DONT, WILL, WONT) and i + 2 < len(data):
+                if command == DO:
+                    replies += bytes((IAC, WONT, data[i + 2]))
+                elif command == WILL:
+                    replies += bytes((IAC, DONT, data[i + 2]))
+                i += 3
+            elif command == SB:
+                end = data.find(bytes((IAC, SE)), i)
+                i = len(data) if end < 0 else end + 2
+            else:
+                i += 2
+        if replies:
+            self.writer.write(bytes(replies))
+        return text.decode('utf-8', errors='replace')
+
+    async def write(self, text: str):
+        self.writer.write(text.encode('utf-8').replace(b'\xff', b'\xff\xff'))
+        await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class SSHConnection:
+    """Interactive shell over asyncssh, with the same read/write interface"""
+
+    def __init__(self, connection, process):
+        self.connection = connection
+        self.process = process
+
+    @classmethod
+    async def open(cls, host: str, port: int, username: str, password: str) -> "SSHConnection":
+        # Optional dependency, only needed for protocol=ssh devices
+        try:
+            import asyncssh
+        except ImportError:
+            raise RuntimeError("SSH devices need the asyncssh package (pip install asyncssh)")
+        connection = await asyncssh.connect(host, port, username=username, password=password,
+                                            known_hosts=None)
+        process = await connection.create_process(term_type='vt100')
+        return cls(connection, process)
+
+    async def read(self) -> str:
+        return await self.process.stdout.read(4096)
+
+    async def write(self, text: str):
+        self.process.stdin.write(text)
+
+    async def close(self):
+        self.connection.close()
+
+
+class Session:
+    """A logged in CLI session on one OLT"""
+
+    def __init__(self, device: Device, timeout: float = 30.0):
+        self.device = device
+        self.timeout = timeout
+        self.connection = None
+        self.errors = _error_patterns.get(device.brand, _error_patterns["zte_c610"])
+        self.rules = BRAND_SESSION.get(device.brand, BRAND_SESSION["zte_c610"])
+
+    async def open(self):
+        device = self.device
+        if device.protocol == "ssh":
+            self.connection = await SSHConnection.open(device.host, device.port, device.username, device.password)
+            prompt = await self.read_until_prompt()
+        else:
+            self.connection = await TelnetConnection.open(device.host, device.port)
+            prompt = await self.login()
+
+        if prompt.rstrip().endswith('>'):
+            await self.connection.write("enable\n")
+            answer = await self.read_until(PROMPT, PASSWORD_PROMPT)
+            if PASSWORD_PROMPT.search(answer):
+                await self.connection.write(device.enable_password + "\n")
+                await self.read_until_prompt()
+
+        for command in self.rules["setup"]:
+            await self.run(command, check=False)
+
+    async def login(self) -> str:
+        """Answer the Telnet login prompts, returns the text up to the first CLI prompt"""
+        while True:
+            text = await self.read_until(PROMPT, LOGIN_PROMPT, PASSWORD_PROMPT)
+            if LOGIN_PROMPT.search(text):
+                await self.connection.write(self.device.username + "\n")
+            elif PASSWORD_PROMPT.search(text):
+                await self.connection.write(self.device.password + "\n")
+            else:
+                return text
+
+    async def read_until(self, *patterns: re.Pattern) -> str:
+        """Read until the end of the output matches one of patterns, paging and confirming on the way"""
+        buffer = ""
+        # Where the output after the last answered prompt starts, so a prompt is answered once
+        answered = 0
+        while True:
+            chunk = await asyncio.wait_for(self.connection.read(), self.timeout)
+            if not chunk:
+                raise ConnectionError(f"{self.device.olt}: connection closed")
+            buffer += chunk
+            tail = buffer[max(answered, len(buffer) - 256):]
+
+            if MORE_PROMPT.search(tail):
+                buffer = MORE_PROMPT.sub('', buffer)
+                answered = min(answered, len(buffer))
+                await self.connection.write(' ')
+                continue
+            for prompt, answer in CONFIRM_PROMPTS:
+                if prompt.search(tail):
+                    await self.connection.write(answer)
+                    answered = len(buffer)
+                    break
+            else:
+                if any(pattern.search(tail) for pattern in patterns):
+                    return buffer
+
+    async def read_until_prompt(self) -> str:
+        return await self.read_until(PROMPT)
+
+    async def run(self, command: str, check: bool = True) -> str:
+        """Send one command and return its output, raises CommandError on an error line"""
+        await self.connection.write(command + "\n")
+        lines = (await self.read_until_prompt()).replace('\r', '').split('\n')
+        # Drop the echoed command (when the OLT echoes) and the prompt
+        if lines and lines[0].strip().endswith(command.strip()):
+            lines = lines[1:]
+        output = '\n'.join(lines[:-1])
+        if check and self.errors.search(output):
+            raise CommandError(command, output)
+        return output
+
+    async def run_block(self, commands: List[str]):
+        """Run a config block; on an error return to privileged mode and re-raise"""
+        try:
+            for command in commands:
+                await self.run(command)
+        except CommandError:
+            await self.run(self.rules["reset"], check=False)
+            raise
+
+    async def close(self):
+        if self.connection:
+            await self.connection.close()
+            self.connection = None
+
+
+class SessionPool:
+    """Persistent sessions per OLT, at most device.max_sessions open at a time"""
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._idle: Dict[str, List[Session]] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._all: List[Session] = []
+
+    async def acquire(self, device: Device) -> Session:
+        limit = self._limits.setdefault(device.olt, asyncio.Semaphore(max(1, device.max_sessions)))
+        await limit.acquire()
+        idle = self._idle.setdefault(device.olt, [])
+        if idle:
+            return idle.pop()
+        session = Session(device, self.timeout)
+        try:
+            await session.open()
+        except BaseException:
+            limit.release()
+            await session.close()
+            raise
+        self._all.append(session)
+        return session
+
+    def release(self, session: Session, broken: bool = False):
+        olt = session.device.olt
+        if broken:
+            self._all.remove(session)
+        else:
+            self._idle[olt].append(session)
+        self._limits[olt].release()
+
+    async def close(self):
+        for session in self._all:
+            await session.close()
+        self._all.clear()
+        self._idle.clear()
+
+
+def split_blocks(lines: Iterable[str]) -> List[List[str]]:
+    """Split a script into config blocks, one per ONU, dropping blank lines"""
+    blocks: List[List[str]] = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            continue
+        if line.strip() in BLOCK_START or not blocks:
+            blocks.append([])
+        blocks[-1].append(line)
+    return blocks
+
+
+def block_keys(blocks: List[List[str]]) -> List[str]:
+    """Journal key of every block of a script: its digest, numbered when the same block repeats"""
+    keys = []
+    seen: Dict[str, int] = {}
+    for block in blocks:
+        key = digest('\n'.join(block))
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}:{seen[key]}")
+    return keys
+
+
+def pushed_blocks(journal: Journal, scripts: Dict[str, List[List[str]]]) -> Dict[str, Set[int]]:
+    """Indices of the blocks of every OLT that an earlier run pushed"""
+    pushed = {(entry["olt"], entry["key"]) for entry in journal.entries if entry["ok"]}
+    return {olt: {index for index, key in enumerate(block_keys(blocks)) if (olt, key) in pushed}
+            for olt, blocks in scripts.items()}
+
+
+async def push_olt(device: Device, blocks: List[List[str]], pool: SessionPool,
+                   skip: Collection[int] = (),
+                   on_result: Optional[Callable[[PushResult], None]] = None) -> List[PushResult]:
+    """Run the blocks of one OLT over up to max_sessions pooled sessions
+
+    Blocks whose index is in skip are left out; on_result is called as each block finishes.
+    """
+    results: List[Optional[PushResult]] = [None] * len(blocks)
+    pending = deque((index, block) for index, block in enumerate(blocks) if index not in skip)
+
+    async def worker():
+        while pending:
+            index, block = pending.popleft()
+            started = time.perf_counter()
+            try:
+                session = await pool.acquire(device)
+            except (OSError, asyncio.TimeoutError, RuntimeError) as e:
+                results[index] = PushResult(device.olt, index, False, f"connect failed: {e!r}", 0.0)
+                if on_result:
+                    on_result(results[index])
+                continue
+            broken = False
+            try:
+                await session.run_block(block)
+                error = None
+            except CommandError as e:
+                error = str(e)
+            except (OSError, asyncio.TimeoutError) as e:
+                error, broken = f"session failed: {e!r}", True
+                await session.close()
+            finally:
+                pool.release(session, broken)
+            results[index] = PushResult(device.olt, index, error is None, error,
+                                        time.perf_counter() - started)
+            if on_result:
+                on_result(results[index])
+
+    await asyncio.gather(*(worker() for _ in range(max(1, device.max_sessions))))
+    return [result for result in results if result is not None]
+
+
+async def push_all(scripts: Dict[str, List[List[str]]], devices: Dict[str, Device],
+                   max_olts: int = 10, timeout: float = 30.0,
+                   journal: Optional[Journal] = None) -> List[PushResult]:
+    """Push every OLT's blocks, at most max_olts OLTs at a time
+
+    With a journal, blocks it lists as pushed are skipped and every outcome is
+    journaled and committed as the block finishes.
+    """
+    pool = SessionPool(timeout)
+    limit = asyncio.Semaphore(max_olts)
+    skip = pushed_blocks(journal, scripts) if journal is not None else {}
+
+    async def one_olt(olt: str, blocks: List[List[str]]) -> List[PushResult]:
+        on_result = None
+        if journal is not None:
+            keys = block_keys(blocks)
+
+            def on_result(result: PushResult):
+                journal.append({"olt": olt, "block": result.block, "key": keys[result.block],
+                                "ok": result.ok, "error": result.error})
+                # Not left to the group: after a crash, a pushed block missing from the journal is sent again
+                journal.commit()
+
+        device = devices.get(olt)
+        if device is None:
+            return [PushResult(olt, index, False, "no device entry", 0.0)
+                    for index in range(len(blocks)) if index not in skip.get(olt, ())]
+        async with limit:
+            return await push_olt(device, blocks, pool, skip.get(olt, ()), on_result)
+
+    try:
+        per_olt = await asyncio.gather(*(one_olt(olt, blocks) for olt, blocks in scripts.items()))
+    finally:
+        await pool.close()
+    return [result for results in per_olt for result in results]
+
+
+def read_devices(path: str) -> Dict[str, Device]:
+    """Device entries by OLT name from a CSV or JSONL file"""
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.lower().endswith(('.jsonl', '.json')):
+            rows = [json.loads(line) for line in handle if line.strip()]
+        else:
+            rows = list(csv.DictReader(handle))
+
+    devices = {}
+    for row in rows:
+        device = Device(
+            olt=row["olt"].strip(),
+            brand=(row.get("brand") or "").strip().lower(),
+            host=row["host"].strip(),
+            port=int(row.get("port") or (22 if row.get("protocol") == "ssh" else 23)),
+            protocol=(row.get("protocol") or "telnet").strip().lower(),
+            username=row.get("username") or "",
+            password=row.get("password") or "",
+            enable_password=row.get("enable_password") or "",
+            max_sessions=int(row.get("max_sessions") or 1),
+        )
+        devices[device.olt] = device
+    return devices
+
+
+def script_files(paths: Iterable[str]) -> List[Tuple[str, str]]:
+    """(file name, path) of the script files given as files or directories of them"""
+    files: List[Tuple[str, str]] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend((name, os.path.join(path, name)) for name in sorted(os.listdir(path))
+                         if name.endswith('.txt'))
+        else:
+            files.append((os.path.basename(path), path))
+    return files
+
+
+def read_scripts(paths: Iterable[str]) -> Dict[str, List[List[str]]]:
+    """Config blocks per OLT from script files or directories of them"""
+    scripts = {}
+    for name, path in script_files(paths):
+        with open(path, encoding='utf-8') as handle:
+            scripts[os.path.splitext(name)[0]] = split_blocks(handle)
+    return scripts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Push per-OLT scripts over Telnet/SSH")
+    parser.add_argument('scripts', nargs='+', help="Script files or directories (bulk.py output)")
+    parser.add_argument('--devices', required=True, help="CSV/JSONL with the OLT connection details")
+    parser.add_argument('--max-olts', type=int, default=10, help="OLTs worked on at the same time")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Seconds to wait for a prompt")
+    parser.add_argument('--log', metavar='FILE', help="Write one JSON line per block to FILE")
+    parser.add_argument('--journal', metavar='FILE',
+                        help="Journal every block pushed to FILE; running the same command again "
+                             "skips the blocks already pushed")
+    args = parser.parse_args(argv)
+
+    devices = read_devices(args.devices)
+    scripts = read_scripts(args.scripts)
+    journal = None
+    if args.journal:
+        try:
+            # The scripts and devices it was started with, so another push never resumes from it
+            files = ' '.join(f"{name}:{file_digest(path)}" for name, path in script_files(args.scripts))
+            journal = Journal(args.journal, {"job": "push", "scripts": digest(files),
+                                             "devices": file_digest(args.devices)})
+        except JournalError as e:
+            parser.error(str(e))
+
+    started = time.perf_counter()
+    try:
+        results = asyncio.run(push_all(scripts, devices, args.max_olts, args.timeout, journal))
+    finally:
+        if journal:
+            journal.close()
+    elapsed = time.perf_counter() - started
+    skipped = sum(len(blocks) for blocks in scripts.values()) - len(results)
+
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        print(f"{result.olt} block {result.block + 1}: {result.error}", file=sys.stderr)
+
+    if args.log:
+        with open(args.log, 'w', encoding='utf-8') as handle:
+            for result in results:
+                handle.write(json.dumps(result._asdict()) + '\n')
+
+    rate = len(results) / elapsed * 60 if elapsed else 0.0
+    before = f", {skipped} pushed before" if skipped else ""
+    print(f"{len(results) - len(failed)} of {len(results)} blocks pushed to {len(scripts)} OLTs{before} "
+          f"in {elapsed:.1f}s ({rate:.0f} ONUs/min)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
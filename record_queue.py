@@ -0,0 +1,123 @@
+"""Queue of ONU records for the GUI, rendered once per change
+
+Usage:
+    records = RecordQueue()
+    record_id = records.add(values, olt="OLT-A")
+    records.update(record_id, values)      # re-rendered only if the values changed
+    text = records.export_text()
+    records.export_scripts("scripts/")     # one script per OLT, as bulk.py writes them
+
+values are create_config_string arguments, as GUITest.get_input_values()
+returns them. Every record keeps its validation errors and its rendered config
+for the values they were computed from, so exporting a queue of hundreds of
+records only renders the ones edited since the last export.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import config_core
+import profile_catalog
+import validator
+
+
+class QueuedRecord:
+    """One queued ONU: its OLT, create_config_string arguments and cached results"""
+    __slots__ = ('id', 'olt', 'values', '_key', '_errors', '_config')
+
+    def __init__(self, record_id: int, olt: str, values: Dict):
+        self.id = record_id
+        self.olt = olt
+        self.values = dict(values)
+        self._key = None
+        self._errors: List[validator.ValidationError] = []
+        self._config: Optional[str] = None
+
+    @property
+    def brand(self) -> str:
+        return self.values.get("brand", "")
+
+
+class RecordQueue:
+    """Records in the order they were added, with per-record validation and render caches"""
+
+    def __init__(self):
+        self._records: Dict[int, QueuedRecord] = {}
+        self._next_id = 1
+        self.renders = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[QueuedRecord]:
+        return iter(list(self._records.values()))
+
+    def get(self, record_id: int) -> QueuedRecord:
+        return self._records[record_id]
+
+    def add(self, values: Dict, olt: str = "") -> int:
+        record = QueuedRecord(self._next_id, olt.strip(), values)
+        self._records[record.id] = record
+        self._next_id += 1
+        return record.id
+
+    def update(self, record_id: int, values: Dict, olt: Optional[str] = None):
+        record = self._records[record_id]
+        record.values = dict(values)
+        if olt is not None:
+            record.olt = olt.strip()
+
+    def remove(self, record_id: int):
+        self._records.pop(record_id, None)
+
+    def clear(self):
+        self._records.clear()
+
+    def _refresh(self, record: QueuedRecord):
+        """Validate and render a record again if its values changed since the last time"""
+        # A reloaded profile catalog changes the digest, so its records render again
+        profiles = profile_catalog.current().table(record.olt)
+        key = (record.olt, profiles.digest) + tuple(sorted(record.values.items()))
+        if key == record._key:
+            return
+        record._key = key
+        record._config = None
+        # The GUI fills in today's date itself, an empty PPPoE password is an error here
+        record._errors = validator.validate(**record.values, olt=record.olt, use_today_password=False)
+        if record._errors:
+            return
+        try:
+            record._config = config_core.create_config_string(**record.values, olt=record.olt)
+        except ValueError as e:
+            record._errors = [validator.ValidationError("fsp", str(e))]
+        self.renders += 1
+
+    def errors(self, record_id: int) -> List[validator.ValidationError]:
+        record = self._records[record_id]
+        self._refresh(record)
+        return record._errors
+
+    def config(self, record_id: int) -> Optional[str]:
+        """Rendered config of a record, None while it does not validate"""
+        record = self._records[record_id]
+        self._refresh(record)
+        return record._config
+
+    def rendered(self) -> Iterator[Tuple[QueuedRecord, str]]:
+        """(record, config) of every record that validates, in queue order"""
+        for record in self:
+            config = self.config(record.id)
+            if config is not None:
+                yield record, config
+
+    def export_text(self) -> str:
+        """Configs of every valid record, separated like the per-OLT scripts"""
+        return '\n\n'.join(config for _, config in self.rendered())
+
+    def export_scripts(self, output_dir: str) -> int:
+        """Write one script per OLT (the brand for records without one), returns how many"""
+        # Imported here: bulk pulls in the inventory modules, only needed for this export
+        import bulk
+
+        progress = bulk.Progress(stream=None)
+        rendered = ((bulk.olt_script_name({"olt": record.olt, "brand": record.brand}), config, ())
+                    for record, config in self.rendered())
+        return bulk.write_scripts(rendered, output_dir, progress)
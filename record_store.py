@@ -0,0 +1,259 @@
+"""Columnar storage of provisioning records
+
+Usage:
+    batch = RecordBatch.from_rows(rows, group=bulk.olt_name)   # (line number, work order record) pairs
+    errors = validator.validate_columns(batch.columns())
+    config = config_core.create_config_string(*batch.arguments(index))
+
+A work order row read as a dict keeps a key and a fresh string for every cell,
+and rendering it used to build another dict of create_config_string arguments.
+A RecordBatch keeps one column per argument instead: brand, VLAN, OLT and
+group (the OLT whose script a row goes to) as codes into per-batch tables of
+interned strings, the three flags as bits of one byte, and every FSP as one
+integer: the code of its port ("F/S/P") and its ONU id. Only sn, sid, name,
+password and serviceport stay strings, so a chunk on its way to a worker
+process pickles a few objects per column rather than several per cell. An FSP
+that would not come back as typed (no ONU id, an id over ONU_MASK, leading
+zeros, other separators or digits) is kept as text.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from array import array
+from operator import itemgetter
+import sys
+
+import brands
+import config_core
+
+# Flag bits of a row
+REPLACEMENT = 1
+PPPOE = 2
+USE_NCE = 4
+
+# A packed FSP is port code << ONU_BITS | ONU id
+ONU_BITS = 16
+ONU_MASK = (1 << ONU_BITS) - 1
+
+# create_config_string's parameters, in order
+ARGUMENTS = ("brand", "sn", "fsp", "vlan", "sid", "name", "password", "is_replacement", "is_pppoe",
+             "use_nce", "serviceport", "olt")
+
+# A readable record, whose columns are replaced one at a time to find the one a record cannot be read for
+_READABLE = {"brand": "", "sn": "", "fsp": "", "vlan": "", "sid": "", "name": ""}
+
+
+class StringTable:
+    """Interned strings and their codes, in order of first appearance"""
+    __slots__ = ('strings', '_codes')
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getstate__(self):
+        return self.strings
+
+    def __setstate__(self, strings: List[str]):
+        self.strings = [sys.intern(string) for string in strings]
+        self._codes = {string: code for code, string in enumerate(self.strings)}
+
+    def encode(self, values: Iterable[str]) -> array:
+        """Codes of values, adding the ones not seen before"""
+        values = list(values)
+        codes = self._codes
+        for value in dict.fromkeys(values):
+            if value not in codes:
+                codes[value] = len(self.strings)
+                self.strings.append(sys.intern(value))
+        return array('I', map(codes.__getitem__, values))
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        return list(map(self.strings.__getitem__, codes))
+
+
+def _split_fsp(fsp: str) -> Optional[Tuple[str, int]]:
+    """(port, ONU id) of an FSP whose text comes back from them, None for any other"""
+    port, slash, onu = fsp.rpartition('/')
+    if not slash or not onu.isdecimal() or str(int(onu)) != onu or int(onu) > ONU_MASK:
+        return None
+    return port, int(onu)
+
+
+class RecordBatch:
+    """Rows of a work order as columns, indexed 0..len-1 in input order"""
+    __slots__ = ('line_nos', 'brands', 'brand', 'sn', 'ports', 'fsp', 'fsp_text', 'vlans', 'vlan', 'sid',
+                 'name', 'password', 'flags', 'serviceport', 'olts', 'olt', 'groups', 'group', 'errors')
+
+    def __init__(self):
+        self.line_nos = array('q')
+        self.brands = StringTable()
+        self.brand = array('I')
+        self.sn: List[str] = []
+        self.ports = StringTable()
+        self.fsp = array('Q')
+        # index -> FSP that does not pack (no ONU id, leading zeros, other separators)
+        self.fsp_text: Dict[int, str] = {}
+        self.vlans = StringTable()
+        self.vlan = array('I')
+        self.sid: List[str] = []
+        self.name: List[str] = []
+        self.password: List[str] = []
+        self.flags = array('B')
+        self.serviceport: List[str] = []
+        self.olts = StringTable()
+        self.olt = array('I')
+        self.groups = StringTable()
+        self.group = array('I')
+        # index -> why the row could not be read
+        self.errors: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.line_nos)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, Dict]],
+                  group: Optional[Callable[[Dict], str]] = None) -> 'RecordBatch':
+        """Batch of (line number, work order record) pairs; group names the OLT of a record (its olt by default)
+
+        A record that cannot be read (a missing column, a value that is not text,
+        an unknown brand) is kept as an empty row with an error, so indices stay aligned.
+        """
+        batch = cls()
+        rows = list(rows)
+        records = [record for _, record in rows]
+        try:
+            columns = config_core.records_to_columns(records)
+            groups = list(map(group, records)) if group else columns["olt"]
+        except (KeyError, AttributeError, TypeError):
+            columns, groups = batch._read_each(records, group)
+        batch.line_nos.extend(line_no for line_no, _ in rows)
+        batch._extend(columns, groups)
+        return batch
+
+    def _read_each(self, records: List[Dict], group: Optional[Callable[[Dict], str]]):
+        """Columns and groups of records read one by one, recording the errors of the unreadable ones"""
+        columns: Dict[str, List] = {field: [] for field in ARGUMENTS}
+        groups = []
+        for index, record in enumerate(records):
+            try:
+                kwargs = config_core.record_to_kwargs(record)
+                olt = group(record) if group else kwargs["olt"]
+            except (KeyError, AttributeError, TypeError):
+                self.errors[index] = record_error(record)
+                kwargs, olt = _EMPTY, ""
+            for field in ARGUMENTS:
+                columns[field].append(kwargs[field])
+            groups.append(olt)
+        return columns, groups
+
+    def _extend(self, columns: Dict[str, List], groups: List[str]):
+        start = len(self.brand)
+        self.brand.extend(self.brands.encode(columns["brand"]))
+        self.sn.extend(columns["sn"])
+        self._extend_fsp(columns["fsp"], start)
+        self.vlan.extend(self.vlans.encode(columns["vlan"]))
+        self.sid.extend(columns["sid"])
+        self.name.extend(columns["name"])
+        self.password.extend(columns["password"])
+        self.flags.extend(REPLACEMENT * replacement | PPPOE * pppoe | USE_NCE * nce for replacement, pppoe, nce
+                          in zip(columns["is_replacement"], columns["is_pppoe"], columns["use_nce"]))
+        self.serviceport.extend(columns["serviceport"])
+        self.olt.extend(self.olts.encode(columns["olt"]))
+        self.group.extend(self.groups.encode(groups))
+
+    def _extend_fsp(self, texts: List[str], start: int):
+        split = [text.rpartition('/') for text in texts]
+        onus = list(map(itemgetter(2), split))
+        # Whole-column checks for the usual case, every FSP being port/ONU id without leading zeros
+        packs = all(map(itemgetter(1), split)) and all(onus) and ''.join(onus).isdecimal()
+        if packs:
+            onu_ids = list(map(int, onus))
+            packs = list(map(str, onu_ids)) == onus and max(onu_ids, default=0) <= ONU_MASK
+        if packs:
+            ports = self.ports.encode(map(itemgetter(0), split))
+            self.fsp.extend(port << ONU_BITS | onu for port, onu in zip(ports, onu_ids))
+            return
+
+        for index, text in enumerate(texts, start):
+            parts = _split_fsp(text)
+            if parts is None:
+                self.fsp_text[index] = text
+                self.fsp.append(0)
+            else:
+                self.fsp.append(self.ports.encode([parts[0]])[0] << ONU_BITS | parts[1])
+
+    def get_fsp(self, index: int) -> str:
+        if index in self.fsp_text:
+            return self.fsp_text[index]
+        packed = self.fsp[index]
+        return f"{self.ports.strings[packed >> ONU_BITS]}/{packed & ONU_MASK}"
+
+    def get_brand(self, index: int) -> str:
+        return self.brands.strings[self.brand[index]]
+
+    def get_group(self, index: int) -> str:
+        return self.groups.strings[self.group[index]]
+
+    def arguments(self, index: int) -> Tuple:
+        """create_config_string arguments of a row, in its positional order"""
+        flags = self.flags[index]
+        return (self.brands.strings[self.brand[index]], self.sn[index], self.get_fsp(index),
+                self.vlans.strings[self.vlan[index]], self.sid[index], self.name[index], self.password[index],
+                bool(flags & REPLACEMENT), bool(flags & PPPOE), bool(flags & USE_NCE), self.serviceport[index],
+                self.olts.strings[self.olt[index]])
+
+    def kwargs(self, index: int) -> Dict:
+        """create_config_string arguments of a row, by name"""
+        return dict(zip(ARGUMENTS, self.arguments(index)))
+
+    def columns(self, indices: Optional[Sequence[int]] = None) -> Dict[str, List]:
+        """validator.validate_columns input for the given rows (every row by default)"""
+        every = indices is None or len(indices) == len(self)
+
+        def take(column: Sequence) -> Sequence:
+            return column if every else list(map(column.__getitem__, indices))
+
+        flags = take(self.flags)
+        return {
+            "brand": self.brands.decode(take(self.brand)),
+            "sn": take(self.sn),
+            "fsp": list(map(self.get_fsp, range(len(self)) if every else indices)),
+            "vlan": self.vlans.decode(take(self.vlan)),
+            "sid": take(self.sid),
+            "name": take(self.name),
+            "is_pppoe": [bool(flag & PPPOE) for flag in flags],
+            "is_replacement": [bool(flag & REPLACEMENT) for flag in flags],
+            "use_nce": [bool(flag & USE_NCE) for flag in flags],
+            "serviceport": take(self.serviceport),
+            "olt": self.olts.decode(take(self.olt)),
+        }
+
+    def valid(self) -> Sequence[int]:
+        """Indices of the rows that could be read"""
+        if not self.errors:
+            return range(len(self))
+        return [index for index in range(len(self)) if index not in self.errors]
+
+
+def record_error(record) -> str:
+    """Why config_core.record_to_kwargs cannot read a record"""
+    if not isinstance(record, dict):
+        return f"expected an object, not {type(record).__name__}"
+    brand = record.get("brand")
+    if isinstance(brand, str) and not brands.is_known(brand.strip().lower()):
+        return f"Unknown OLT brand: {brand.strip().lower()}"
+    for column in _READABLE:
+        if column not in record:
+            return f"missing column '{column}'"
+    for column, value in record.items():
+        try:
+            config_core.record_to_kwargs(dict(_READABLE, **{column: value}))
+        except (AttributeError, TypeError):
+            return f"invalid value for '{column}'"
+    return "unreadable record"
+
+
+# Placeholder of a row that could not be read, so the columns stay aligned
+_EMPTY = dict(dict.fromkeys(ARGUMENTS, ""), is_replacement=False, is_pppoe=False, use_nce=False)
@@ -0,0 +1,156 @@
+"""LRU cache of rendered configs, optionally kept on disk
+
+Usage:
+    python bulk.py workorder.csv -o scripts/ --render-cache renders.db
+    config_core.set_render_cache(RenderCache(maxsize=4096))
+
+The key is the record as create_config_string renders it: brand, sn, fsp,
+vlan, sid, name (spaces already turned into dots), the password after today's
+date was filled in, is_replacement, is_pppoe, use_nce, serviceport and the
+digest of the service profiles it was rendered with (see profile_catalog.py),
+so a reloaded catalog never returns a stale config. The most recently used
+maxsize configs are kept in memory. With a path every render is also stored in
+a SQLite file, so re-running a batch that stopped halfway takes the rows it
+already rendered from the file. The file keeps a fingerprint of the template of
+every brand it holds renders of, checked when the cache first sees the brand,
+so only the brands being rendered are imported; a brand's entries are dropped
+when its template changed. A cache can be shared between threads (the GUI's
+Tk thread and its render worker).
+"""
+from typing import Optional, Set, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+import templates
+
+CacheKey = Tuple[str, str, str, str, str, str, str, bool, bool, bool, str, str]
+
+# Stored renders are committed in batches of this many
+COMMIT_EVERY = 500
+
+
+def fingerprint(brand: str) -> str:
+    """Hash of everything besides the key that decides a rendered config of brand"""
+    data = json.dumps(templates.TEMPLATES.get(brand), sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """Rendered configs by CacheKey with size-bounded LRU eviction and hit/miss counts"""
+
+    def __init__(self, maxsize: int = 4096, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.path = path
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        self._pending = 0
+        # Brands whose stored renders were checked against their template
+        self._checked: Set[str] = set()
+        # get() reorders the entries too, so every access holds the lock
+        self._lock = threading.RLock()
+        if path:
+            self._open(path)
+
+    def _open(self, path: str):
+        # Imported here: the GUI uses an in-memory cache and does not need sqlite3
+        import sqlite3
+
+        # Worker processes share the file, WAL lets them read while another writes
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS renders (key TEXT PRIMARY KEY, config TEXT NOT NULL) "
+                         "WITHOUT ROWID")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+
+    def _check(self, brand: str):
+        """Drop the stored renders of brand when they were made with another template"""
+        self._checked.add(brand)
+        name = f"fingerprint:{brand}"
+        current = fingerprint(brand)
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        if row is None or row[0] != current:
+            # Stored keys start with the brand and the separator, see _stored_key
+            self._db.execute("DELETE FROM renders WHERE key >= ? AND key < ?", (brand + '\x1f', brand + '\x20'))
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, current))
+            self._db.commit()
+            self._pending = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _stored_key(key: CacheKey) -> str:
+        return '\x1f'.join(map(str, key))
+
+    def _remember(self, key: CacheKey, config: str):
+        self._entries[key] = config
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        """Cached config for key, None (counted as a miss) when it was never rendered"""
+        with self._lock:
+            config = self._entries.get(key)
+            if config is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return config
+
+            if self._db is not None:
+                if key[0] not in self._checked:
+                    self._check(key[0])
+                row = self._db.execute("SELECT config FROM renders WHERE key = ?",
+                                       (self._stored_key(key),)).fetchone()
+                if row is not None:
+                    self._remember(key, row[0])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: CacheKey, config: str):
+        with self._lock:
+            self._remember(key, config)
+            if self._db is not None:
+                if key[0] not in self._checked:
+                    self._check(key[0])
+                self._db.execute("INSERT OR REPLACE INTO renders VALUES (?, ?)", (self._stored_key(key), config))
+                self._pending += 1
+                if self._pending >= COMMIT_EVERY:
+                    self.commit()
+
+    def commit(self):
+        """Write pending renders to the file"""
+        with self._lock:
+            if self._db is not None and self._pending:
+                self._db.commit()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self.commit()
+                self._db.close()
+                self._db = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM renders")
+                self._db.commit()
+                self._pending = 0
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {self.evictions} evictions"
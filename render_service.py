@@ -0,0 +1,321 @@
+"""Local HTTP/JSON rendering service for ticketing systems and scripts
+
+Usage:
+    python render_service.py --port 8765
+    python render_service.py --port 8765 --profiles profiles.json -v
+
+    curl -s localhost:8765/render -d '{"brand": "huawei", "sn": "HWTC12345678", "fsp": "0/1/1/1",
+                                       "vlan": "2801", "sid": "1", "name": "Budi"}'
+
+POST /render takes one record (a JSON object) or a list of them, with the same
+fields as a bulk.py JSONL work order. One record answers {"config": ...}, or
+{"error": ...} with status 422; a list answers a list of those, in order.
+GET /health reports the brands, the profile catalog and batching counters,
+GET /metrics the request latencies in the Prometheus text format. Every
+response carries its own latency in a Server-Timing header.
+
+Requests are micro-batched: every record that arrives during one pass of the
+event loop is validated and rendered as one chunk, the way bulk.py renders a
+work order (see bulk.process_chunk). Single records and small lists go before
+the chunks of large lists, so a big batch call does not hold up interactive
+requests. Brands, compiled templates and the profile catalog are loaded at
+startup and stay in memory; the catalog is reloaded when its file changes.
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+
+import brands
+import bulk
+import config_core
+import instrument
+import profile_catalog
+import templates
+import validator
+from record_store import RecordBatch
+from render_cache import RenderCache
+
+# Records rendered together at most, larger lists are split into chunks of this
+# size; 100 records take about 3 ms, the most a single request waits behind a chunk
+MAX_BATCH = 100
+
+# Bodies from this size on are decoded and encoded in a thread, so the event
+# loop keeps answering other requests meanwhile
+LARGE_BODY = 64 * 1024
+
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 422: "Unprocessable Entity"}
+
+
+class BadRequest(ValueError):
+    """Raised for a request the service cannot answer, with its HTTP status"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def warm():
+    """Import every brand and compile every template, so no request pays for it"""
+    profile_catalog.current()
+    for brand in brands.names():
+        validator.fsp_pattern(brand)
+        for values in itertools.product((False, True), repeat=len(templates.FLAGS)):
+            templates.get_template(brand, dict(zip(templates.FLAGS, values)))
+
+
+class RenderService:
+    """Micro-batching renderer: records queued during one loop pass are rendered as one chunk"""
+
+    def __init__(self, max_batch: int = MAX_BATCH):
+        self.max_batch = max_batch
+        self.metrics = instrument.Metrics()
+        # (records, future) of single records and small lists, then of large list chunks
+        self._interactive: deque = deque()
+        self._bulk: deque = deque()
+        self._scheduled = False
+        self.batches = 0
+        self.records = 0
+
+    def render(self, records: List[Dict]) -> "asyncio.Future":
+        """Queue records, the future resolves to one result dict per record"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        if not records:
+            future = loop.create_future()
+            future.set_result([])
+            return future
+        queue = self._interactive if len(records) <= self.max_batch else self._bulk
+        for start in range(0, len(records), self.max_batch):
+            future = loop.create_future()
+            queue.append((records[start:start + self.max_batch], future))
+            futures.append(future)
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._flush)
+        if len(futures) == 1:
+            return futures[0]
+        return asyncio.ensure_future(self._joined(futures))
+
+    @staticmethod
+    async def _joined(futures: List["asyncio.Future"]) -> List[Dict]:
+        results = []
+        for chunk in await asyncio.gather(*futures):
+            results.extend(chunk)
+        return results
+
+    def _flush(self):
+        """Render up to max_batch queued records, rescheduling itself while more are queued"""
+        jobs: List[Tuple[List[Dict], "asyncio.Future"]] = []
+        size = 0
+        for queue in (self._interactive, self._bulk):
+            while queue and (not jobs or size + len(queue[0][0]) <= self.max_batch):
+                records, future = queue.popleft()
+                jobs.append((records, future))
+                size += len(records)
+
+        chunk = RecordBatch.from_rows(enumerate(record for records, _ in jobs for record in records), bulk.olt_name)
+        started = time.perf_counter()
+        try:
+            results = [_as_response(result) for result in bulk.process_chunk(chunk)]
+        except Exception as e:
+            results = [{"error": f"failed to generate configuration: {e!r}"}] * len(chunk)
+        self.metrics.observe("render_batch", "", "", "", time.perf_counter() - started)
+        self.batches += 1
+        self.records += len(chunk)
+
+        offset = 0
+        for records, future in jobs:
+            if not future.cancelled():
+                future.set_result(results[offset:offset + len(records)])
+            offset += len(records)
+
+        if self._interactive or self._bulk:
+            # The next chunk waits for one loop pass, so requests read meanwhile can join it
+            asyncio.get_running_loop().call_soon(self._flush)
+        else:
+            self._scheduled = False
+
+
+def _as_response(result: bulk.RowResult) -> Dict:
+    if result.error is not None:
+        return {"error": result.error}
+    return {"config": result.config}
+
+
+def _parse_records(body: bytes) -> Tuple[List[Dict], bool]:
+    """Records of a /render body and whether it was a single record"""
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise BadRequest(f"Invalid JSON: {e}") from None
+    if isinstance(data, dict):
+        return [data], True
+    if isinstance(data, list):
+        return data, False
+    raise BadRequest("Expected a record object or a list of records")
+
+
+def _encode(data) -> bytes:
+    return json.dumps(data).encode('utf-8')
+
+
+class Server:
+    """HTTP/1.1 with keep-alive on asyncio streams, answering from a RenderService"""
+
+    def __init__(self, service: RenderService, verbose: bool = False):
+        self.service = service
+        self.verbose = verbose
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening, returns the port"""
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, str, bytes, str]:
+        """(status, content type, body, request kind) of one request"""
+        path = path.split('?', 1)[0]
+        if path == "/render":
+            if method != "POST":
+                raise BadRequest("Use POST", 405)
+            large = len(body) >= LARGE_BODY
+            loop = asyncio.get_running_loop()
+            if large:
+                records, single = await loop.run_in_executor(None, _parse_records, body)
+            else:
+                records, single = _parse_records(body)
+            # Entries that are not objects get an error of their own (see RecordBatch.from_rows)
+            results = await self.service.render(records)
+            if single:
+                status = 422 if "error" in results[0] else 200
+                return status, "application/json", _encode(results[0]), "single"
+            if large:
+                return 200, "application/json", await loop.run_in_executor(None, _encode, results), "batch"
+            return 200, "application/json", _encode(results), "batch"
+
+        if method != "GET":
+            raise BadRequest("Use GET", 405)
+        if path == "/health":
+            catalog = profile_catalog.current()
+            health = {
+                "status": "ok",
+                "brands": brands.names(),
+                "profiles": catalog.path,
+                "profile_error": profile_catalog.last_error,
+                "batches": self.service.batches,
+                "records": self.service.records,
+            }
+            if config_core.RENDER_CACHE is not None:
+                health["render_cache"] = config_core.RENDER_CACHE.stats()
+            return 200, "application/json", _encode(health), "health"
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.service.metrics.prometheus().encode('utf-8'), "metrics"
+        raise BadRequest(f"No such endpoint: {path}", 404)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                keep_alive = False
+                kind = "invalid"
+                try:
+                    parts = request_line.decode('latin-1').split()
+                    if len(parts) != 3:
+                        raise BadRequest("Malformed request line")
+                    method, path, version = parts
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    length = int(headers.get("content-length") or 0)
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise BadRequest(f"Request body over {MAX_BODY} bytes", 413)
+                    body = await reader.readexactly(length) if length > 0 else b''
+                    status, content_type, payload, kind = await self.dispatch(method, path, body)
+                except ValueError as e:
+                    status = getattr(e, "status", 400)
+                    content_type, payload = "application/json", _encode({"error": str(e)})
+
+                elapsed = time.perf_counter() - started
+                self.service.metrics.observe("request", "", kind, "", elapsed, status < 400)
+                head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        f"Content-Type: {content_type}\r\n"
+                        f"Content-Length: {len(payload)}\r\n"
+                        f"Server-Timing: render;dur={elapsed * 1000:.3f}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode('latin-1') + payload)
+                await writer.drain()
+                if self.verbose:
+                    print(f"{request_line.decode('latin-1').strip()} {status} {elapsed * 1000:.2f} ms",
+                          file=sys.stderr)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int, service: RenderService, verbose: bool = False):
+    server = Server(service, verbose)
+    port = await server.start(host, port)
+    print(f"Rendering on http://{host}:{port}/render", file=sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve config rendering over local HTTP/JSON")
+    parser.add_argument('--host', default="127.0.0.1", help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on")
+    parser.add_argument('--profiles', metavar='FILE',
+                        help="Service profile catalog (JSON, see profile_catalog.py), reloaded when it changes")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="Records rendered together at most")
+    parser.add_argument('--cache-size', type=int, default=4096,
+                        help="Rendered configs kept in memory, 0 to render every request")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Print every request with its latency")
+    args = parser.parse_args(argv)
+
+    if args.profiles:
+        try:
+            profile_catalog.use(args.profiles)
+        except profile_catalog.ProfileCatalogError as e:
+            parser.error(str(e))
+    if args.cache_size > 0:
+        config_core.set_render_cache(RenderCache(args.cache_size))
+    warm()
+
+    try:
+        asyncio.run(serve(args.host, args.port, RenderService(max(1, args.max_batch)), args.verbose))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Huawei service-port index built from saved "display service-port all" output
+
+Replace mode has to "undo service-port N" before the ONT is deleted. Instead
+of looking N up by hand, save the output of "display service-port all" per OLT
+and load it here; lookups by F/S/P/ONU or by VLAN are then dict hits.
+
+Dump rows look like this (the F/S/P column may contain spaces):
+
+     INDEX VLAN VLAN     PORT F/ S/ P VPI  VCI   FLOW  FLOW       RX   TX   STATE
+           ID   ATTR     TYPE                    TYPE  PARA
+       102 2801 common   gpon 0/1 /5  17   1     vlan  2801       -    -    up
+"""
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+import os
+import re
+
+# INDEX VLAN ATTR gpon F/S/P ONT-ID GEMPORT
+_SERVICE_PORT_ROW = re.compile(
+    r'^\s*(\d+)\s+(\d+)\s+\S+\s+x?gpon\s+(\d+)\s*/\s*(\d+)\s*/\s*(\d+)\s+(\d+)\s+(\d+)'
+)
+
+
+class ServicePort(NamedTuple):
+    index: str
+    vlan: str
+    fsp: str
+    gemport: str
+
+
+class ServicePortNotFound(LookupError):
+    """Raised when no service-port, or more than one candidate, matches a record"""
+
+
+class ServicePortIndex:
+    """Service-ports of one or more OLTs, indexed by (olt, F/S/P/ONU) and (olt, VLAN)"""
+
+    def __init__(self):
+        self.by_onu: Dict[Tuple[str, str], List[ServicePort]] = {}
+        self.by_vlan: Dict[Tuple[str, str], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(ports) for ports in self.by_onu.values())
+
+    def add(self, olt: str, service_port: ServicePort):
+        self.by_onu.setdefault((olt, service_port.fsp), []).append(service_port)
+        self.by_vlan.setdefault((olt, service_port.vlan), set()).add(service_port.index)
+
+    def load_dump(self, path: str, olt: Optional[str] = None) -> int:
+        """Index a saved "display service-port all" output, olt defaults to the file name"""
+        if olt is None:
+            olt = os.path.splitext(os.path.basename(path))[0]
+
+        count = 0
+        with open(path, encoding='utf-8', errors='replace') as handle:
+            for line in handle:
+                match = _SERVICE_PORT_ROW.match(line)
+                if not match:
+                    continue
+                index, vlan, frame, slot, port, ont_id, gemport = match.groups()
+                self.add(olt, ServicePort(index, vlan, f"{frame}/{slot}/{port}/{ont_id}", gemport))
+                count += 1
+        return count
+
+    def service_ports(self, olt: str, fsp: str) -> List[ServicePort]:
+        """All service-ports of an ONU"""
+        return self.by_onu.get((olt, fsp), [])
+
+    def indexes_for_vlan(self, olt: str, vlan: str) -> Set[str]:
+        """Service-port indexes carrying a VLAN"""
+        return self.by_vlan.get((olt, vlan), set())
+
+    def resolve(self, olt: str, fsp: str, vlan: Optional[str] = None) -> str:
+        """Service-port index to undo when replacing the ONU at fsp
+
+        An ONU with a single service-port resolves to it; with several, the
+        one on the record's VLAN wins.
+        """
+        candidates = self.service_ports(olt, fsp)
+        if len(candidates) > 1 and vlan is not None:
+            candidates = [port for port in candidates if port.vlan == vlan] or candidates
+        if not candidates:
+            raise ServicePortNotFound(f"No service-port found for {olt} {fsp}")
+        if len(candidates) > 1:
+            indexes = ', '.join(port.index for port in candidates)
+            raise ServicePortNotFound(f"Several service-ports for {olt} {fsp}: {indexes}")
+        return candidates[0].index
+
+
+def parse_dump_argument(argument: str) -> Tuple[Optional[str], str]:
+    """Split an "OLT=path" command line argument, a bare path keeps olt None"""
+    olt, separator, path = argument.partition('=')
+    return (olt, path) if separator and not os.path.exists(argument) else (None, argument)
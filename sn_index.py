@@ -0,0 +1,100 @@
+"""Serial-number index across every known OLT
+
+A GPON SN is written either as 12 characters, the 4-letter vendor id followed by
+8 hex digits ("ZTEGC8A12345"), or as 16 hex digits with the vendor id in hex
+("5A544547C8A12345"). Both spellings normalize to the same key, the uppercase
+16 hex digit form, so an ONU is found however the technician or the OLT dump
+wrote it.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+Registration = Tuple[str, str]   # (olt, fsp)
+
+
+class DuplicateSerialNumber(ValueError):
+    """Raised when an SN is already registered at another FSP"""
+
+
+class UnknownSerialNumber(LookupError):
+    """Raised when an SN the record relies on is not registered anywhere"""
+
+
+def normalize_sn(sn: str) -> str:
+    """Uppercase 16 hex digit form of an SN; anything else is returned uppercased"""
+    sn = sn.strip().upper()
+    if len(sn) == 12 and sn[:4].isascii() and sn[:4].isalnum():
+        return sn[:4].encode('ascii').hex().upper() + sn[4:]
+    return sn
+
+
+class SnIndex:
+    """Normalized SN -> (olt, fsp) of the ONU registered with it"""
+
+    def __init__(self):
+        self._registrations: Dict[str, Registration] = {}
+
+    def __len__(self) -> int:
+        return len(self._registrations)
+
+    def __contains__(self, sn: str) -> bool:
+        return normalize_sn(sn) in self._registrations
+
+    def get(self, sn: str) -> Optional[Registration]:
+        return self._registrations.get(normalize_sn(sn))
+
+    def add(self, sn: str, olt: str, fsp: str):
+        self._registrations[normalize_sn(sn)] = (olt, fsp)
+
+    def remove(self, sn: str):
+        self._registrations.pop(normalize_sn(sn), None)
+
+    def register(self, sn: str, olt: str, fsp: str):
+        """Add a new registration, raises DuplicateSerialNumber if the SN is registered elsewhere"""
+        key = normalize_sn(sn)
+        known = self._registrations.get(key)
+        if known is not None and known != (olt, fsp):
+            raise DuplicateSerialNumber(f"SN {sn} is already registered on {known[0]} {known[1]}")
+        self._registrations[key] = (olt, fsp)
+
+    def replace(self, sn: str, olt: str, fsp: str = "", old_sn: str = "") -> str:
+        """Move a replacement into the index and return the FSP of the ONU it replaces
+
+        The replaced ONU is looked up by old_sn, or by sn when the same ONU is
+        re-registered. An empty fsp is filled in from that ONU; a given fsp
+        must match it.
+        """
+        old_key = normalize_sn(old_sn or sn)
+        known = self._registrations.get(old_key)
+        if known is None:
+            if not fsp:
+                raise UnknownSerialNumber(f"SN {old_sn or sn} is not registered, FSP cannot be filled in")
+        elif known[0] != olt or (fsp and known[1] != fsp):
+            raise DuplicateSerialNumber(f"SN {old_sn or sn} is registered on {known[0]} {known[1]}")
+        else:
+            fsp = known[1]
+
+        key = normalize_sn(sn)
+        current = self._registrations.get(key)
+        if key != old_key and current is not None:
+            raise DuplicateSerialNumber(f"SN {sn} is already registered on {current[0]} {current[1]}")
+
+        self._registrations.pop(old_key, None)
+        self._registrations[key] = (olt, fsp)
+        return fsp
+
+    def load(self, path: str) -> int:
+        """Add the ONUs of an inventory file or store that have an sn, returns how many"""
+        # Imported here: onu_alloc imports olt_inventory, which normalizes SNs with this module
+        from onu_alloc import read_inventory
+        return self.update((record.get('sn') or '', (record.get('olt') or record.get('brand') or '').strip(),
+                            (record.get('fsp') or '').strip())
+                           for record in read_inventory(path))
+
+    def update(self, entries: Iterable[Tuple[str, str, str]]) -> int:
+        """Add (sn, olt, fsp) entries, skipping those without an SN"""
+        count = 0
+        for sn, olt, fsp in entries:
+            if sn.strip():
+                self.add(sn, olt, fsp)
+                count += 1
+        return count
@@ -0,0 +1,110 @@
+"""Startup time report for the headless core and the GUI
+
+Usage:
+    python startup_report.py          # headless: imports and first render
+    python startup_report.py --gui    # also toolkit import, window and widget tree (needs a display)
+
+Each phase runs in a fresh interpreter started with -X importtime, so the
+numbers match a cold start; the slowest imports are listed after the phases.
+"""
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Runs in the child interpreter and prints {phase: seconds} as JSON; json is
+# imported last so it does not show up in the import report
+HEADLESS_PHASES = """
+import time
+t0 = time.perf_counter()
+import config_core
+t1 = time.perf_counter()
+config_core.create_config_string('huawei', 'HWTC00000001', '0/1/1/1', '2801', '1', 'Startup Check')
+t2 = time.perf_counter()
+import bulk
+t3 = time.perf_counter()
+import json
+print(json.dumps({'import config_core': t1 - t0, 'first render': t2 - t1, 'import bulk': t3 - t2}))
+"""
+
+GUI_PHASES = """
+import time
+t0 = time.perf_counter()
+import GUITest
+t1 = time.perf_counter()
+GUITest.load_gui_modules()
+t2 = time.perf_counter()
+timings = {}
+class Timed(GUITest.OLTConfigGenerator):
+    def setup_gui(self):
+        started = time.perf_counter()
+        timings['window and theme'] = started - t2
+        super().setup_gui()
+        timings['widget tree'] = time.perf_counter() - started
+app = Timed()
+t3 = time.perf_counter()
+app.root.update()
+t4 = time.perf_counter()
+app.root.destroy()
+import json
+print(json.dumps({'import GUITest': t1 - t0, 'import tkinter/ttkbootstrap': t2 - t1,
+                  **timings, 'first paint': t4 - t3}))
+"""
+
+
+def run_phases(code: str) -> Tuple[Dict[str, float], List[Tuple[int, str]]]:
+    """Run code in a fresh interpreter, returns (phase timings, imports by cumulative us)"""
+    # From the repository, so the modules import wherever the report is started
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("\n".join(errors[-5:]))
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level entries: nested imports are indented under their parent
+        if not name.startswith("  "):
+            imports.append((int(cumulative), name.strip()))
+
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return phases, sorted(imports, reverse=True)
+
+
+def print_report(title: str, phases: Dict[str, float], imports: List[Tuple[int, str]], top: int):
+    print(title)
+    for phase, seconds in phases.items():
+        print(f"  {phase:30s} {seconds * 1000:8.1f} ms")
+    print(f"  {'total':30s} {sum(phases.values()) * 1000:8.1f} ms")
+    print("  slowest imports (cumulative):")
+    for cumulative, name in imports[:top]:
+        print(f"    {name:28s} {cumulative / 1000:8.1f} ms")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report import and startup times")
+    parser.add_argument('--gui', action='store_true', help="Also measure the GUI startup")
+    parser.add_argument('--top', type=int, default=10, help="Number of slowest imports to list")
+    args = parser.parse_args(argv)
+
+    print_report("Headless startup", *run_phases(HEADLESS_PHASES), args.top)
+
+    if args.gui:
+        try:
+            phases, imports = run_phases(GUI_PHASES)
+        except RuntimeError as e:
+            print(f"GUI startup could not be measured:\n{e}", file=sys.stderr)
+            return 1
+        print()
+        print_report("GUI startup", phases, imports, args.top)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Declarative per-brand configuration templates
+
+Every brand is described as data: a list of command lines with {slot}
+placeholders, where a line can be guarded by a condition. A condition is a
+space separated list of flags that must all be set, "!flag" meaning the flag
+must not be set, and it can guard a single line or a list of lines:
+
+    ("replace", "no onu {onu}")
+    ("vendor_onu !pppoe", ["wan-ip 1 mode dhcp ...", "..."])
+
+Flags of a record:
+    replace       registration_type is "replace"
+    pppoe         connection_type is "pppoe"
+    nce           use_nce on a PPPoE record (NCE only provisions PPPoE)
+    vendor_onu    SN starts with the brand's vendor_prefix
+    special_vlan  VLAN is one of the brand's special_vlans
+
+Slots: sn, vlan, sid, name, password, serviceport, the record's service
+profile (see profile_catalog.py): bandwidth, line_profile, srv_profile and
+tcont_profile, and the parsed FSP (see fsp.py): fsp (as typed), onu, port ("F/S/P"),
+board ("F/S"), pon ("P") and the ZTE interface prefixes gpon_olt, gpon_onu,
+vport, gpon_olt_c320 and gpon_onu_c320.
+
+The data of a brand is its Brand.template (see brands/): vendor_prefix,
+fsp_parts, special_vlans and lines. TEMPLATES reads it from the brand registry,
+so a brand module is only imported when its brand is rendered.
+
+Each combination of flags is compiled once, on first use, into a function that
+returns a single f-string, so rendering a record is one cache lookup plus one
+string build.
+"""
+from typing import Callable, Dict, Iterator, List, Tuple
+from collections.abc import Mapping
+from string import Formatter
+
+import brands
+from fsp import parse_fsp
+from profile_catalog import ProfileTable
+
+
+class _Templates(Mapping):
+    """Template data of every brand, read from its brand module (see brands/) on first use"""
+
+    def __getitem__(self, brand: str) -> Dict:
+        try:
+            return brands.get(brand).template
+        except brands.UnknownBrand:
+            raise KeyError(brand) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(brands.names())
+
+    def __len__(self) -> int:
+        return len(brands.names())
+
+
+TEMPLATES = _Templates()
+
+FLAGS = ("replace", "pppoe", "nce", "vendor_onu", "special_vlan")
+
+# Positional arguments of every compiled renderer; f is the parsed fsp.FSP, p
+# the profile_catalog.Profile of the record's VLAN and mode
+RENDER_ARGS = ("sn", "f", "vlan", "sid", "name", "password", "serviceport", "p")
+
+# FSP slots and how the renderer reads them from f
+FSP_SLOTS = {
+    "fsp": "f.text",
+    "onu": "f.onu",
+    "port": "f.port.path",
+    "board": "f.port.board",
+    "pon": "f.port.pon",
+    "gpon_olt": "f.port.gpon_olt",
+    "gpon_onu": "f.port.gpon_onu",
+    "vport": "f.port.vport",
+    "gpon_olt_c320": "f.port.gpon_olt_c320",
+    "gpon_onu_c320": "f.port.gpon_onu_c320"
+}
+
+# Service profile slots and how the renderer reads them from p
+PROFILE_SLOTS = {
+    "bandwidth": "p.bandwidth",
+    "line_profile": "p.line_profile",
+    "srv_profile": "p.srv_profile",
+    "tcont_profile": "p.tcont_profile"
+}
+
+# Slots a renderer reads from its f and p arguments
+DERIVED_SLOTS = {**FSP_SLOTS, **PROFILE_SLOTS}
+
+
+class CompiledTemplate:
+    """One brand/flag combination compiled into a single f-string function"""
+    __slots__ = ('key', 'slots', 'needs_profile', 'render')
+
+    def __init__(self, key: Tuple, slots: Tuple[str, ...], render: Callable[..., str]):
+        self.key = key
+        self.slots = slots
+        self.needs_profile = any(slot in PROFILE_SLOTS for slot in slots)
+        self.render = render
+
+
+def _condition_holds(condition: str, flags: Dict[str, bool]) -> bool:
+    """Check a "flag !flag" condition against the record flags"""
+    for flag in condition.split():
+        if flag.startswith('!'):
+            if flags[flag[1:]]:
+                return False
+        elif not flags[flag]:
+            return False
+    return True
+
+
+def select_lines(brand: str, flags: Dict[str, bool]) -> List[str]:
+    """Template lines of a brand that apply to the given flags"""
+    lines = []
+    for entry in TEMPLATES[brand]["lines"]:
+        if isinstance(entry, str):
+            lines.append(entry)
+            continue
+
+        condition, guarded = entry
+        if _condition_holds(condition, flags):
+            lines.extend([guarded] if isinstance(guarded, str) else guarded)
+    return lines
+
+
+def compile_template(brand: str, flags: Dict[str, bool]) -> CompiledTemplate:
+    """Compile the lines selected by flags into a function returning one f-string"""
+    text = '\n'.join(select_lines(brand, flags))
+
+    slots = []
+    for _, field, spec, conversion in Formatter().parse(text):
+        if field is None:
+            continue
+        if field in ("f", "p") or field not in RENDER_ARGS and field not in DERIVED_SLOTS or spec or conversion:
+            raise ValueError(f"Unsupported placeholder {{{field}}} in {brand} template")
+        if field not in slots:
+            slots.append(field)
+
+    # Format placeholders are valid f-string fields once the slots are locals
+    source = f"def render({', '.join(RENDER_ARGS)}):\n"
+    source += "".join(f"    {slot} = {DERIVED_SLOTS[slot]}\n" for slot in slots if slot in DERIVED_SLOTS)
+    source += f"    return f{text!r}\n"
+
+    namespace = {}
+    exec(compile(source, f"<template {brand}>", "exec"), namespace)
+    key = (brand,) + tuple(flags[flag] for flag in FLAGS)
+    return CompiledTemplate(key, tuple(slots), namespace["render"])
+
+
+_compiled: Dict[Tuple, CompiledTemplate] = {}
+
+
+def get_template(brand: str, flags: Dict[str, bool]) -> CompiledTemplate:
+    """Return the compiled template for a brand and flag set, compiling it on first use"""
+    key = (brand,) + tuple(flags[flag] for flag in FLAGS)
+    template = _compiled.get(key)
+    if template is None:
+        template = _compiled[key] = compile_template(brand, flags)
+    return template
+
+
+# brand -> (vendor_prefix, special_vlans, fsp_parts), resolved once from TEMPLATES
+_brand_rules: Dict[str, Tuple[str, frozenset, int]] = {}
+
+
+def _rules(brand: str) -> Tuple[str, frozenset, int]:
+    spec = TEMPLATES[brand]
+    rules = _brand_rules[brand] = (spec.get("vendor_prefix", ""), frozenset(spec.get("special_vlans", ())),
+                                   spec["fsp_parts"])
+    return rules
+
+
+def template_for(brand: str, sn: str, vlan: str, is_replacement: bool = False, is_pppoe: bool = True,
+                 use_nce: bool = False) -> CompiledTemplate:
+    """Compiled template a record renders with, compiled on first use"""
+    vendor_prefix, special_vlans, _ = _brand_rules.get(brand) or _rules(brand)
+    # bool() so 1 and True (RecordBatch flag bits, say) share one compiled template
+    key = (
+        brand,
+        bool(is_replacement),
+        bool(is_pppoe),
+        bool(is_pppoe and use_nce),
+        bool(vendor_prefix) and sn.lower().startswith(vendor_prefix),
+        vlan in special_vlans
+    )
+
+    template = _compiled.get(key)
+    if template is None:
+        template = _compiled[key] = compile_template(brand, dict(zip(FLAGS, key[1:])))
+    return template
+
+
+def render(brand: str, profiles: ProfileTable, sn: str, fsp: str, vlan: str, sid: str, name: str,
+           password: str = '', is_replacement: bool = False, is_pppoe: bool = True,
+           use_nce: bool = False, serviceport: str = '') -> str:
+    """Render the configuration of one record with the brand's template"""
+    fsp_parts = (_brand_rules.get(brand) or _rules(brand))[2]
+    parsed = parse_fsp(fsp)
+    if parsed.size != fsp_parts:
+        raise ValueError(f"FSP {fsp!r} has {parsed.size} parts, {brand} expects {fsp_parts}")
+
+    template = template_for(brand, sn, vlan, is_replacement, is_pppoe, use_nce)
+    # Only look the profile up when the template uses it
+    profile = profiles.profile(vlan, is_pppoe) if template.needs_profile else None
+
+    return template.render(sn, parsed, vlan, sid, name, password, serviceport, profile)
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import benchmark as render_benchmark
+import config_core
+import profile_catalog
+
+COMBINATIONS = render_benchmark.combinations()
+NAMES = [render_benchmark.combination_name(*combo) for combo in COMBINATIONS]
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
+
+
+@pytest.fixture(scope="module")
+def golden():
+    with open(render_benchmark.GOLDEN_FILE, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+@pytest.mark.parametrize("combo", COMBINATIONS, ids=NAMES)
+def test_golden_output(combo, golden):
+    rendered = render_benchmark.render_all(combo[0], render_benchmark.generate_records(*combo))
+    assert rendered == golden[render_benchmark.combination_name(*combo)]
+
+
+def test_records_cover_the_pppoe_only_vlans():
+    vlans = {name: {int(record["vlan"]) for record in render_benchmark.generate_records(*combo)}
+             for name, combo in zip(NAMES, COMBINATIONS)}
+    assert {2909, 2919} <= vlans["huawei-pppoe-new"]
+    assert {2909, 2919} <= vlans["bdcom-ipoe-new"]
+    # Huawei and ZTE have no IPoE profile for them
+    assert not any(2900 <= vlan <= 2999 for vlan in vlans["huawei-ipoe-new"] | vlans["zte_c610-ipoe-new"])
+
+
+def test_ipoe_on_a_pppoe_only_vlan_needs_a_profile_for_huawei():
+    record = render_benchmark.generate_records("huawei", False, False, False)[0]
+    with pytest.raises(profile_catalog.UnknownProfile):
+        config_core.generate_huawei_config(**dict(record, vlan="2901"))
+
+
+@pytest.mark.skipif(pytest_benchmark is None, reason="needs pytest-benchmark")
+@pytest.mark.parametrize("combo", COMBINATIONS, ids=NAMES)
+def test_render_speed(combo, benchmark):
+    # Compare with an earlier run through pytest --benchmark-autosave / --benchmark-compare
+    records = render_benchmark.generate_records(*combo)
+    generator = config_core.CONFIG_GENERATORS[combo[0]]
+    benchmark(lambda: [generator(**record) for record in records])
@@ -0,0 +1,60 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import brands
+import config_core
+import validator
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """A private copy of the registry, so plugin brands do not leak into other tests"""
+    monkeypatch.setattr(brands, "_loaded", dict(brands._loaded))
+    monkeypatch.setattr(brands, "_entry_points", {})
+    monkeypatch.setattr(config_core, "CONFIG_GENERATORS", dict(config_core.CONFIG_GENERATORS))
+
+
+def acme(name: str = "acme") -> brands.Brand:
+    return brands.Brand(name=name, label="ACME", fsp_format="Format: P/Onu id", fsp_pattern=r'^\d+/\d+$',
+                        template=dict(brands.get("bdcom").template),
+                        mode={"enter": "conf", "exit": "quit", "end": "end"}, onu_ids=(5, 7))
+
+
+def test_registered_brand_renders_and_validates():
+    brands.register(acme())
+    assert brands.is_known("acme") and brands.names()[-1] == "acme"
+    assert validator.validate("acme", "ZTEG12345678", "1/2", "2801", "1", "A") == []
+    assert "ZTEG12345678" in config_core.create_config_string("acme", "ZTEG12345678", "1/2", "2801", "1", "A")
+
+
+def test_unknown_brand():
+    assert not brands.is_known("nope")
+    with pytest.raises(brands.UnknownBrand, match="Unknown OLT brand: nope"):
+        brands.get("nope")
+
+
+def test_entry_point_is_loaded_on_first_use(monkeypatch):
+    loads = []
+
+    class EntryPoint:
+        name = "acme"
+
+        def load(self):
+            loads.append(self.name)
+            return SimpleNamespace(BRANDS=[acme(), acme("acme_2")])
+
+    monkeypatch.setattr(brands, "_entry_points", {"acme": EntryPoint()})
+    assert "acme" in brands.names() and loads == []
+    assert brands.get("acme").onu_ids == (5, 7)
+    # Every brand of the module is registered by the one load
+    assert brands.get("acme_2").name == "acme_2"
+    assert loads == ["acme"]
+
+
+def test_builtin_brand_does_not_scan_entry_points(monkeypatch):
+    monkeypatch.setattr(brands, "_entry_points", None)
+    monkeypatch.delitem(brands._loaded, "raisecom", raising=False)
+    brands.get("raisecom")
+    assert brands._entry_points is None and "brands.raisecom" in sys.modules
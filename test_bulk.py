@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import bulk
+
+HEADER = "brand,sn,fsp,vlan,sid,name,olt\n"
+
+
+def run(tmp_path, rows: str, *options: str) -> int:
+    work_order = tmp_path / "workorder.csv"
+    work_order.write_text(HEADER + rows)
+    return bulk.main([str(work_order), "-o", str(tmp_path / "scripts"), "-q", *options])
+
+
+def test_rejected_row_gives_its_onu_id_back(tmp_path):
+    inventory = tmp_path / "inventory.csv"
+    inventory.write_text("olt,brand,fsp,sn\n")
+    rows = ("huawei,HWTC00000001,0/1/5,99999,1,A,OLT-A\n"     # invalid VLAN
+            "huawei,HWTC00000002,0/1/5,2801,2,B,OLT-A\n"
+            "huawei,HWTC00000002,0/1/5,2801,3,C,OLT-A\n"      # SN used twice
+            "huawei,HWTC00000003,0/1/5,2801,4,D,OLT-A\n")
+    assert run(tmp_path, rows, "--inventory", str(inventory), "--update-inventory") == 1
+    script = (tmp_path / "scripts" / "OLT-A.txt").read_text()
+    assert "ont add 5 0 sn-auth HWTC00000002" in script
+    assert "ont add 5 1 sn-auth HWTC00000003" in script
+    assert inventory.read_text().splitlines()[1:] == ["OLT-A,huawei,0/1/5/0,HWTC00000002",
+                                                      "OLT-A,huawei,0/1/5/1,HWTC00000003"]
+
+
+def test_render_rejections_keep_their_onu_id_for_any_number_of_workers(tmp_path):
+    inventory = tmp_path / "inventory.csv"
+    inventory.write_text("olt,brand,fsp,sn\n")
+    records = [{"brand": "huawei", "sn": f"HWTC{n:08d}", "fsp": "0/1/5", "vlan": "2801", "sid": str(n),
+                "name": f"N{n}", "olt": "OLT-A"} for n in range(1, 21)]
+    del records[2]["name"]    # passes the checks, rejected by the render stage
+    work_order = tmp_path / "workorder.jsonl"
+    work_order.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    scripts = []
+    for workers in ("1", "4"):
+        output_dir = tmp_path / f"scripts-{workers}"
+        assert bulk.main([str(work_order), "-o", str(output_dir), "-q", "--inventory", str(inventory),
+                          "-w", workers, "--chunk-size", "2"]) == 1
+        scripts.append((output_dir / "OLT-A.txt").read_text())
+    assert scripts[0] == scripts[1]
+    assert "ont add 5 2 sn-auth" not in scripts[0]
+    assert "ont add 5 3 sn-auth HWTC00000004" in scripts[0]
+
+
+def test_resume_refuses_an_edited_script(tmp_path):
+    rows = "huawei,HWTC00000001,0/1/5/1,2801,1,A,OLT-A\n"
+    journal = str(tmp_path / "scripts.journal")
+    assert run(tmp_path, rows, "--journal", journal) == 0
+    script = tmp_path / "scripts" / "OLT-A.txt"
+    script.write_text(script.read_text().replace("2801", "2802"))
+    with pytest.raises(SystemExit):
+        run(tmp_path, rows, "--journal", journal)
@@ -0,0 +1,35 @@
+import pytest
+
+import coalesce
+import config_core
+
+PORTS = {"raisecom": "0/1/{}", "bdcom": "0/{}", "huawei": "0/1/5/{}", "zte_c320": "1/1/1/{}",
+         "zte_c610": "1/1/1/{}"}
+
+
+def render(brand: str, onu: int, is_replacement: bool = False) -> str:
+    return config_core.create_config_string(brand, f"ABCD{onu:08d}", PORTS[brand].format(onu), "2801", str(onu),
+                                            "A B", is_replacement=is_replacement, serviceport="7")
+
+
+@pytest.mark.parametrize("brand", sorted(PORTS))
+@pytest.mark.parametrize("is_replacement", [False, True])
+def test_split_config_round_trip(brand, is_replacement):
+    config = render(brand, 1, is_replacement)
+    block, = coalesce.coalesce(brand, [(PORTS[brand].format(1), config)])
+    assert coalesce.split_config(block, brand) == coalesce.split_config(config, brand)
+
+
+def test_one_block_per_port_keeps_every_command():
+    configs = [(PORTS["huawei"].format(onu), render("huawei", onu)) for onu in range(1, 4)]
+    block, = coalesce.coalesce("huawei", configs)
+    assert block.count("interface gpon 0/1") == 1
+    commands = sorted(line for _, config in configs for line in config.splitlines()
+                      if line.startswith(("ont ", "service-port")))
+    assert sorted(line for line in block.splitlines() if line.startswith(("ont ", "service-port"))) == commands
+
+
+def test_same_onu_twice_starts_a_new_group():
+    fsp = PORTS["zte_c610"].format(1)
+    blocks = coalesce.coalesce("zte_c610", [(fsp, render("zte_c610", 1, True)), (fsp, render("zte_c610", 1))])
+    assert len(blocks) == 2
@@ -0,0 +1,35 @@
+import config_core
+import config_delta
+
+ONU = {"brand": "zte_c610", "sn": "ZTEG00000001", "fsp": "1/1/1/5", "vlan": "2801", "sid": "100", "name": "A B",
+       "password": "secret"}
+
+
+def running_config(**changes) -> config_delta.RunningConfig:
+    config = config_core.create_config_string(**dict(ONU, **changes))
+    return config_delta.RunningConfig(config.splitlines(), ONU["brand"])
+
+
+def test_unchanged_onu_has_empty_delta():
+    assert config_delta.render_delta(running_config(), **ONU) == ""
+
+
+def test_changed_description_is_overwritten():
+    delta = config_delta.render_delta(running_config(), **dict(ONU, name="C D"))
+    assert "description 100-C.D" in delta.splitlines()
+    assert "onu 5 type ZTEG-F609 sn ZTEG00000001" not in delta
+
+
+def test_recreate_rule_falls_back_to_replace_config():
+    # Another SN on the same ONU id: "onu 5 ... sn" is a recreate key
+    current = running_config(sn="ZTEG00000009")
+    assert config_delta.render_delta(current, **ONU) == config_core.create_config_string(
+        **ONU, is_replacement=True)
+
+
+def test_huawei_delta_keeps_prompt_answers():
+    # A new ONU: every command of the full config, each "{ <cr>|... }" prompt still answered
+    onu = dict(ONU, brand="huawei", sn="HWTC00000001", fsp="0/1/5/5")
+    lines = config_delta.render_delta(config_delta.RunningConfig([], "huawei"), **onu).splitlines()
+    add = next(index for index, line in enumerate(lines) if line.startswith("ont add"))
+    assert lines[add + 1] == ""
@@ -0,0 +1,23 @@
+import pytest
+
+from fsp import parse_fsp, split_fsp
+
+
+@pytest.mark.parametrize("text", ["", "5", "17"])
+def test_too_few_parts(text):
+    with pytest.raises(ValueError, match="Invalid FSP"):
+        parse_fsp(text)
+
+
+def test_any_non_digit_separates():
+    assert split_fsp("0/1/5/17") == ("0", "1", "5", "17")
+    assert split_fsp("0-1:5 17") == ("0", "1", "5", "17")
+    assert split_fsp("0/1/") == ("0", "1", "")
+
+
+def test_ports_are_shared():
+    first, second = parse_fsp("0/1/5/1"), parse_fsp("0/1/5/2")
+    assert first.port is second.port
+    assert (first.port.path, first.port.board, first.port.pon, first.onu, first.size) == ("0/1/5", "0/1", "5", "1", 4)
+    assert first.port.gpon_onu == "gpon_onu-0/1/5" and first.port.gpon_olt_c320 == "gpon-olt_0/1/5"
+    assert parse_fsp("0-1-5-2") == second
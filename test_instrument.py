@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+import config_core
+import instrument
+import templates
+
+
+@pytest.fixture
+def metrics():
+    instrument.drain()
+    instrument.enable()
+    yield instrument.METRICS
+    instrument.disable()
+    instrument.drain()
+
+
+def labels(metrics, stage):
+    return sorted(labels[1:] for labels in metrics.histograms if labels[0] == stage)
+
+
+def test_mode_and_registration_labels(metrics):
+    config_core.create_config_string("huawei", "HWTC00000001", "0/1/5/1", "2801", "1", "A")
+    config_core.create_config_string(brand="zte_c610", sn="ZTEG00000001", fsp="1/1/1/1", vlan="2801",
+                                     sid="1", name="A", is_replacement=True, is_pppoe=False)
+    # Positional is_replacement and is_pppoe
+    config_core.create_config_string("bdcom", "GPON00000001", "1/1", "2801", "1", "A", "", False, False)
+    expected = [("bdcom", "ipoe", "new"), ("huawei", "pppoe", "new"), ("zte_c610", "ipoe", "replace")]
+    assert labels(metrics, "create_config") == expected
+    assert labels(metrics, "generate") == expected
+    # FSP parsing is labelled with the record being rendered
+    assert labels(metrics, "parse_fsp") == expected
+    assert 'mode="ipoe",registration="replace"' in metrics.prometheus()
+
+
+def test_record_labels_are_per_thread(metrics):
+    instrument._record.labels = ("huawei", "pppoe", "replace")
+    try:
+        thread = threading.Thread(target=templates.parse_fsp, args=("1/1/1/7",))
+        thread.start()
+        thread.join()
+    finally:
+        instrument._record.labels = ("", "", "")
+    assert labels(metrics, "parse_fsp") == [("", "", "")]
@@ -0,0 +1,45 @@
+import pytest
+
+from journal import Journal, JournalError
+
+HEADER = {"job": "bulk", "work_order": "0123456789abcdef"}
+
+
+def test_entries_of_earlier_runs(tmp_path):
+    path = str(tmp_path / "job.journal")
+    journal = Journal(path, HEADER, group_size=2)
+    journal.append({"lines": [1]})
+    journal.append({"lines": [2]})
+    journal.append({"lines": [3]})
+    journal.close()
+    assert Journal(path, HEADER).entries == [{"lines": [1]}, {"lines": [2]}, {"lines": [3]}]
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    path = tmp_path / "job.journal"
+    journal = Journal(str(path), HEADER)
+    journal.append({"lines": [1]})
+    journal.close()
+    complete = path.read_bytes()
+    with open(path, "ab") as handle:
+        handle.write(b'{"lines": [2')
+
+    journal = Journal(str(path), HEADER)
+    assert journal.entries == [{"lines": [1]}]
+    assert path.read_bytes() == complete
+    journal.append({"lines": [3]})
+    journal.close()
+    assert Journal(str(path), HEADER).entries == [{"lines": [1]}, {"lines": [3]}]
+
+
+def test_torn_header_starts_over(tmp_path):
+    path = tmp_path / "job.journal"
+    path.write_bytes(b'{"job": "bu')
+    assert Journal(str(path), HEADER).entries == []
+
+
+def test_header_mismatch(tmp_path):
+    path = str(tmp_path / "job.journal")
+    Journal(path, HEADER).close()
+    with pytest.raises(JournalError, match="work_order"):
+        Journal(path, dict(HEADER, work_order="fedcba9876543210"))
@@ -0,0 +1,29 @@
+from olt_inventory import InventoryStore, parse_dump
+
+
+def test_sn_spellings_are_the_same_onu():
+    store = InventoryStore()
+    store.add("OLT-A", "huawei", "0/1/5/1", "HWTC1234ABCD")
+    assert [onu.fsp for onu in store.by_sn("485754431234abcd")] == ["0/1/5/1"]
+    assert [onu.sn for onu in store.by_sn("HWTC1234ABCD")] == ["485754431234ABCD"]
+    store.close()
+
+
+def test_parse_dump_normalizes_sns():
+    lines = ["interface gpon 0/1", 'ont add 5 17 sn-auth "HWTC1234ABCD" omci']
+    assert [(entry.fsp, entry.sn) for entry in parse_dump(lines, "huawei")] == [("0/1/5/17", "485754431234ABCD")]
+
+
+def test_zte_onu_state_takes_the_phase_state():
+    lines = """\
+ZXAN#show gpon onu state gpon-olt_1/1/1
+OnuIndex   Admin State  OMCC State  O7 State  Phase State
+----------------------------------------------------------
+1/1/1:1    enable       enable      operation working
+1/1/1:2    enable       disable     unknown   LOS
+1/1/1:3    disable      disable     unknown   DyingGasp
+1/1/1:4    enable       disable     unknown   OffLine
+ONU Number: 4/4
+""".splitlines()
+    assert [(entry.fsp, entry.state) for entry in parse_dump(lines, "zte_c320")] == [
+        ("1/1/1/1", "working"), ("1/1/1/2", "los"), ("1/1/1/3", "dyinggasp"), ("1/1/1/4", "offline")]
@@ -0,0 +1,38 @@
+import pytest
+
+from onu_alloc import OnuIdAllocator, OnuIdCollision, PonFull
+
+
+def test_allocate_lowest_free_id():
+    allocator = OnuIdAllocator()
+    allocator.occupy("OLT-A", "0/1/5/0")
+    allocator.occupy("OLT-A", "0/1/5/2")
+    assert allocator.allocate("OLT-A", "0/1/5", "huawei") == "0/1/5/1"
+    assert allocator.allocate("OLT-A", "0/1/5", "huawei") == "0/1/5/3"
+    # Ports and OLTs are counted separately
+    assert allocator.allocate("OLT-B", "0/1/5", "huawei") == "0/1/5/0"
+    assert len(allocator) == 5
+
+
+def test_occupy_collision():
+    allocator = OnuIdAllocator()
+    allocator.occupy("OLT-A", "1/1/1/4")
+    with pytest.raises(OnuIdCollision):
+        allocator.occupy("OLT-A", "1/1/1/4")
+
+
+def test_release_makes_the_id_free_again():
+    allocator = OnuIdAllocator()
+    fsp = allocator.allocate("OLT-A", "0/1/5", "huawei")
+    allocator.allocate("OLT-A", "0/1/5", "huawei")
+    allocator.release("OLT-A", fsp)
+    assert not allocator.is_used("OLT-A", "0/1/5", 0)
+    assert allocator.allocate("OLT-A", "0/1/5", "huawei") == fsp
+
+
+def test_pon_full():
+    allocator = OnuIdAllocator()
+    for _ in range(128):
+        allocator.allocate("OLT-A", "1/1/1")
+    with pytest.raises(PonFull):
+        allocator.allocate("OLT-A", "1/1/1")
@@ -0,0 +1,65 @@
+import itertools
+import json
+import os
+
+import pytest
+
+import profile_catalog
+from profile_catalog import ProfileCatalogError
+
+
+@pytest.fixture(autouse=True)
+def builtin_catalog():
+    yield
+    profile_catalog.use(None)
+
+
+# A new modification time for every write, even on file systems with coarse timestamps
+_mtimes = itertools.count(1_000_000_000_000_000_000, 1_000_000_000)
+
+
+def write(path, text: str):
+    path.write_text(text)
+    mtime = next(_mtimes)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def write_catalog(path, bandwidth: str):
+    write(path, json.dumps({"vlans": {"2801": {"bandwidth": bandwidth}}}))
+
+
+def bandwidth() -> str:
+    return profile_catalog.current().table().bandwidths()["2801"]
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    path = tmp_path / "profiles.json"
+    write_catalog(path, "10")
+    profile_catalog.use(str(path))
+    assert bandwidth() == "10"
+    assert not profile_catalog.reload()
+
+    write_catalog(path, "20")
+    assert profile_catalog.reload()
+    assert bandwidth() == "20" and profile_catalog.last_error is None
+
+
+def test_broken_file_keeps_the_previous_catalog(tmp_path):
+    path = tmp_path / "profiles.json"
+    write_catalog(path, "10")
+    profile_catalog.use(str(path))
+    write(path, "{not json")
+
+    assert not profile_catalog.reload()
+    assert profile_catalog.last_error.startswith(str(path))
+    assert bandwidth() == "10"
+
+    write_catalog(path, "30")
+    assert profile_catalog.reload()
+    assert bandwidth() == "30" and profile_catalog.last_error is None
+
+
+@pytest.mark.parametrize("watch", [True, False])
+def test_missing_file(tmp_path, watch):
+    with pytest.raises(ProfileCatalogError, match="missing.json"):
+        profile_catalog.use(str(tmp_path / "missing.json"), watch)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from fake_olt import FakeOLT
+from journal import Journal
+from push import Device, push_all, split_blocks
+
+SCRIPT = """\
+config t
+interface gpon_olt-1/1/1
+onu 1 type ALL sn ZTEG00000001
+exit
+
+config t
+interface gpon_olt-1/1/1
+onu 2 type ALL sn ZTEG0000BAD2
+exit
+
+config t
+interface gpon_olt-1/1/1
+no onu 3
+onu 3 type ALL sn ZTEG00000003
+exit
+"""
+
+
+def push(olt: FakeOLT, max_sessions: int = 1, journal=None):
+    async def run():
+        port = await olt.start()
+        try:
+            device = Device(olt.hostname, "zte_c610", "127.0.0.1", port, "telnet", "admin", "admin",
+                            max_sessions=max_sessions)
+            return await push_all({olt.hostname: split_blocks(SCRIPT.splitlines())},
+                                  {olt.hostname: device}, timeout=5.0, journal=journal)
+        finally:
+            await olt.stop()
+    return asyncio.run(run())
+
+
+def test_push_to_fake_olt():
+    olt = FakeOLT("OLT-1")
+    results = push(olt, max_sessions=2)
+    assert [result.ok for result in results] == [True, True, True]
+    assert olt.sessions == 2
+    assert olt.received.count("config t") == 3
+    assert "onu 3 type ALL sn ZTEG00000003" in olt.received
+
+
+def test_failing_block_is_isolated():
+    olt = FakeOLT("OLT-1", fail="BAD")
+    results = push(olt)
+    assert [(result.block, result.ok) for result in results] == [(0, True), (1, False), (2, True)]
+    assert "ZTEG0000BAD2" in results[1].error
+    # The rest of the failed block is not sent, the next block starts over from "config t"
+    assert olt.received[olt.received.index("onu 2 type ALL sn ZTEG0000BAD2") + 1] == "config t"
+    assert olt.received[-4:] == ["interface gpon_olt-1/1/1", "no onu 3",
+                                 "onu 3 type ALL sn ZTEG00000003", "exit"]
+
+
+def test_confirm_prompt_is_answered_once():
+    olt = FakeOLT("OLT-1", confirm="^no onu", latency=0.01)
+    results = push(olt)
+    assert all(result.ok for result in results)
+    assert olt.answers == ["y"]
+    assert "y" not in olt.received
+
+
+def test_journal_is_on_disk_as_each_block_finishes(tmp_path):
+    path = str(tmp_path / "push.journal")
+    journal = Journal(path, {"job": "push"})
+    olt = FakeOLT("OLT-1", fail="BAD")
+    push(olt, journal=journal)
+    # Read before close(): a crash now must not resend the pushed blocks
+    with open(path) as handle:
+        entries = [json.loads(line) for line in handle][1:]
+    assert sorted((entry["block"], entry["ok"]) for entry in entries) == [(0, True), (1, False), (2, True)]
+    journal.close()
+
+    olt = FakeOLT("OLT-1")
+    journal = Journal(path, {"job": "push"})
+    assert [result.block for result in push(olt, journal=journal)] == [1]
+    journal.close()
+    assert olt.received.count("config t") == 1
@@ -0,0 +1,46 @@
+import pickle
+
+import config_core
+from record_store import RecordBatch
+
+RECORDS = [
+    {"brand": "Huawei", "sn": "HWTC00000001", "fsp": "0/1/5/1", "vlan": 2801, "sid": "1", "name": "A",
+     "olt": "OLT-A", "connection_type": "ipoe"},
+    {"brand": "zte_c610", "sn": "ZTEG00000002", "fsp": "1/1/1/70000", "vlan": "2801", "sid": "2", "name": "B",
+     "registration_type": "replace", "use_nce": "yes", "serviceport": 7},
+    {"brand": "bdcom", "sn": "ABCD00000003", "fsp": "0/01", "vlan": "2802", "sid": "3", "name": "C",
+     "password": "pw"},
+]
+
+
+def test_round_trip():
+    batch = pickle.loads(pickle.dumps(RecordBatch.from_rows(enumerate(RECORDS, 2))))
+    assert list(batch.line_nos) == [2, 3, 4]
+    for index, record in enumerate(RECORDS):
+        assert batch.kwargs(index) == config_core.record_to_kwargs(record)
+    assert batch.get_group(0) == "OLT-A" and batch.get_group(1) == ""
+    assert batch.columns([2])["fsp"] == ["0/01"]
+
+
+def test_unreadable_records_keep_their_place():
+    rows = [RECORDS[0], dict(RECORDS[0], sn=1234), 5, {"brand": "nope"}, {"brand": "huawei"}]
+    batch = RecordBatch.from_rows(enumerate(rows))
+    assert batch.errors == {1: "invalid value for 'sn'", 2: "expected an object, not int",
+                            3: "Unknown OLT brand: nope", 4: "missing column 'sn'"}
+    assert list(batch.valid()) == [0]
+    assert batch.kwargs(0) == config_core.record_to_kwargs(RECORDS[0])
+
+
+FSPS = ["0/1/5/65535", "0/1/5/65536", "0/1/5/70000", "0/1/5/x", "0/1/5/01", "0/1/5/", "5", "0/1/5/٣",
+        "0-1-5-3", "0/1/5/1.0"]
+
+
+def test_fsps_that_do_not_pack_come_back_as_typed():
+    records = [dict(RECORDS[0], fsp=fsp) for fsp in FSPS]
+    # Alone (the whole-column check) and all in one batch (row by row)
+    alone = [pickle.loads(pickle.dumps(RecordBatch.from_rows([(1, record)]))) for record in records]
+    together = pickle.loads(pickle.dumps(RecordBatch.from_rows(enumerate(records))))
+    assert [batch.get_fsp(0) for batch in alone] == FSPS
+    assert [together.get_fsp(index) for index in range(len(together))] == FSPS
+    assert [index for index, batch in enumerate(alone) if batch.fsp_text] == list(range(1, len(FSPS)))
+    assert [together.kwargs(index)["fsp"] for index in range(len(together))] == FSPS
@@ -0,0 +1,52 @@
+import brands
+from render_cache import RenderCache
+
+
+def key(brand: str, sn: str):
+    return (brand, sn, "0/1/5/1", "2801", "1", "A", "20261018", False, True, False, "", "profiles")
+
+
+def test_lru_eviction_and_counts():
+    cache = RenderCache(maxsize=2)
+    cache.put(key("huawei", "1"), "one")
+    cache.put(key("huawei", "2"), "two")
+    assert cache.get(key("huawei", "1")) == "one"
+    # "2" is now the least recently used
+    cache.put(key("huawei", "3"), "three")
+    assert cache.get(key("huawei", "2")) is None
+    assert cache.get(key("huawei", "3")) == "three"
+    assert (len(cache), cache.hits, cache.misses, cache.evictions) == (2, 2, 1, 1)
+    assert cache.stats() == "2 hits, 1 misses (67% hit rate), 1 evictions"
+
+
+def test_stored_renders_survive_a_restart(tmp_path):
+    path = str(tmp_path / "renders.db")
+    cache = RenderCache(path=path)
+    cache.put(key("huawei", "1"), "one")
+    cache.close()
+    cache = RenderCache(maxsize=1, path=path)
+    assert cache.get(key("huawei", "1")) == "one"
+    assert cache.get(key("huawei", "2")) is None
+    cache.close()
+
+
+def test_changed_template_drops_only_its_brand(tmp_path, monkeypatch):
+    path = str(tmp_path / "renders.db")
+    cache = RenderCache(path=path)
+    cache.put(key("huawei", "1"), "huawei")
+    cache.put(key("bdcom", "1"), "bdcom")
+    cache.close()
+
+    huawei = brands.get("huawei")
+    template = dict(huawei.template, lines=huawei.template["lines"] + ["quit"])
+    monkeypatch.setitem(brands._loaded, "huawei", huawei._replace(template=template))
+
+    def scan():
+        raise AssertionError("entry points scanned")
+    # Only the brands looked up are checked, without scanning the installed ones
+    monkeypatch.setattr(brands, "_installed", scan)
+
+    cache = RenderCache(path=path)
+    assert cache.get(key("huawei", "1")) is None
+    assert cache.get(key("bdcom", "1")) == "bdcom"
+    cache.close()
@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+import config_core
+import render_service
+
+RECORD = {"brand": "huawei", "sn": "HWTC12345678", "fsp": "0/1/1/1", "vlan": "2801", "sid": "100", "name": "A"}
+
+
+async def post(port: int, body: bytes):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"POST /render HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_render_request():
+    async def run():
+        server = render_service.Server(render_service.RenderService())
+        port = await server.start()
+        try:
+            return (await post(port, json.dumps(RECORD).encode()),
+                    await post(port, json.dumps([RECORD, dict(RECORD, sn=1234)]).encode()))
+        finally:
+            await server.stop()
+
+    single, batch = asyncio.run(run())
+    assert single == (200, {"config": config_core.render_record(RECORD)})
+    assert batch == (200, [{"config": config_core.render_record(RECORD)}, {"error": "invalid value for 'sn'"}])
+
+
+def test_records_queued_in_one_pass_share_a_batch():
+    async def run(service):
+        return await asyncio.gather(*(service.render([dict(RECORD, sid=str(n))]) for n in range(10)))
+
+    service = render_service.RenderService(max_batch=4)
+    results = asyncio.run(run(service))
+    assert [result[0]["config"] for result in results] == [
+        config_core.render_record(dict(RECORD, sid=str(n))) for n in range(10)]
+    assert (service.batches, service.records) == (3, 10)
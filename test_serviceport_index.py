@@ -0,0 +1,51 @@
+import pytest
+
+from serviceport_index import ServicePortIndex, ServicePortNotFound, parse_dump_argument
+
+DUMP = """\
+  -----------------------------------------------------------------------------
+   INDEX VLAN VLAN     PORT F/ S/ P VPI  VCI   FLOW  FLOW       RX   TX   STATE
+         ID   ATTR     TYPE                    TYPE  PARA
+  -----------------------------------------------------------------------------
+     102 2801 common   gpon 0/1 /5  17   1     vlan  2801       -    -    up
+     103 2801 common   gpon 0/1 /5  18   1     vlan  2801       -    -    down
+     104 2900 common   gpon 0/1 /5  18   2     vlan  2900       -    -    up
+     105 2801 common   xgpon 0/2 /0  3    1     vlan  2801       -    -    up
+  -----------------------------------------------------------------------------
+   Total : 4  (Up/Down :    3/1)
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    dump = tmp_path / "OLT-A.txt"
+    dump.write_text(DUMP)
+    index = ServicePortIndex()
+    assert index.load_dump(str(dump)) == 4
+    return index
+
+
+def test_rows_are_indexed_by_onu_and_vlan(index):
+    assert len(index) == 4
+    assert [port.index for port in index.service_ports("OLT-A", "0/1/5/18")] == ["103", "104"]
+    assert index.service_ports("OLT-A", "0/2/0/3")[0].gemport == "1"
+    assert index.indexes_for_vlan("OLT-A", "2801") == {"102", "103", "105"}
+    assert index.service_ports("OLT-B", "0/1/5/17") == []
+
+
+def test_resolve(index):
+    assert index.resolve("OLT-A", "0/1/5/17") == "102"
+    assert index.resolve("OLT-A", "0/1/5/18", "2900") == "104"
+    # No port on the record's VLAN: every port of the ONU is still a candidate
+    with pytest.raises(ServicePortNotFound, match="Several service-ports for OLT-A 0/1/5/18: 103, 104"):
+        index.resolve("OLT-A", "0/1/5/18", "3000")
+    with pytest.raises(ServicePortNotFound, match="No service-port found"):
+        index.resolve("OLT-A", "0/1/5/19")
+
+
+def test_parse_dump_argument(tmp_path):
+    assert parse_dump_argument("OLT-A=dump.txt") == ("OLT-A", "dump.txt")
+    assert parse_dump_argument("dump.txt") == (None, "dump.txt")
+    path = tmp_path / "a=b.txt"
+    path.write_text("")
+    assert parse_dump_argument(str(path)) == (None, str(path))
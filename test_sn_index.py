@@ -0,0 +1,20 @@
+import pytest
+
+from sn_index import DuplicateSerialNumber, SnIndex, normalize_sn
+
+
+def test_normalize_spellings():
+    assert normalize_sn("HWTC1234ABCD") == "485754431234ABCD"
+    assert normalize_sn(" hwtc1234abcd ") == "485754431234ABCD"
+    assert normalize_sn("485754431234abcd") == "485754431234ABCD"
+    # Anything else is only uppercased
+    assert normalize_sn("zteg1234") == "ZTEG1234"
+
+
+def test_index_finds_either_spelling():
+    index = SnIndex()
+    index.register("ZTEGC8A12345", "OLT-A", "1/1/1/1")
+    assert "5A544547C8A12345" in index
+    assert index.get("ztegc8a12345") == ("OLT-A", "1/1/1/1")
+    with pytest.raises(DuplicateSerialNumber):
+        index.register("5A544547C8A12345", "OLT-B", "1/1/1/2")
@@ -0,0 +1,27 @@
+import pytest
+
+import profile_catalog
+import templates
+
+
+def test_truthy_flags_share_the_compiled_template():
+    first = templates.template_for("zte_c610", "ZTEG00000001", "2801", True, 1, 1)
+    assert templates.template_for("zte_c610", "ZTEG00000001", "2801", 1, True, True) is first
+    assert first.key == ("zte_c610", True, True, True, True, False)
+
+
+def test_flag_values_render_the_same():
+    profiles = profile_catalog.current().table()
+    arguments = ("huawei", profiles, "HWTC00000001", "0/1/5/1", "2801", "1", "A", "pw")
+    assert templates.render(*arguments, 1, 0, 1, "7") == templates.render(*arguments, True, False, True, "7")
+
+
+def test_fsp_with_the_wrong_number_of_parts():
+    with pytest.raises(ValueError, match="huawei expects 4"):
+        templates.render("huawei", profile_catalog.current().table(), "HWTC00000001", "0/1/5", "2801", "1", "A")
+
+
+def test_unsupported_placeholder(monkeypatch):
+    monkeypatch.setitem(templates.TEMPLATES["bdcom"], "lines", ["description {unknown}"])
+    with pytest.raises(ValueError, match="Unsupported placeholder"):
+        templates.compile_template("bdcom", dict.fromkeys(templates.FLAGS, False))
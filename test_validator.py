@@ -0,0 +1,39 @@
+import validator
+
+RECORD = {"brand": "huawei", "sn": "HWTC12345678", "fsp": "0/1/5/1", "vlan": "2801", "sid": "100", "name": "A"}
+
+
+def columns(*records):
+    return {field: [record[field] for record in records] for field in records[0]}
+
+
+def test_valid_record():
+    assert validator.validate(**RECORD) == []
+
+
+def test_errors_in_field_order():
+    errors = validator.validate(**dict(RECORD, sn="123", fsp="0/1", vlan="1"))
+    assert [error.field for error in errors] == ["sn", "fsp", "vlan"]
+
+
+def test_unknown_brand():
+    assert validator.validate(**dict(RECORD, brand="nope"))[0].message == "Unknown OLT brand: nope"
+
+
+def test_missing_ipoe_profile_only_for_brands_that_read_it():
+    # VLANs 2900-2999 have no IPoE profile; only Huawei and ZTE templates need one
+    huawei = validator.validate(**dict(RECORD, vlan="2901"), is_pppoe=False)
+    assert [error.message for error in huawei] == ["VLAN 2901 has no IPoE profile"]
+    assert validator.validate("raisecom", "RCMG12345678", "0/1/1", "2901", "100", "A", is_pppoe=False) == []
+
+
+def test_columns_match_single_validation():
+    records = [RECORD, dict(RECORD, sid="x"), dict(RECORD, vlan="2901", is_pppoe=False),
+               dict(RECORD, brand="raisecom", fsp="0/1/1", vlan="2901", is_pppoe=False)]
+    for record in records:
+        record.setdefault("is_pppoe", True)
+    errors = validator.validate_columns(columns(*records))
+    assert sorted(errors) == [1, 2]
+    for row, record in enumerate(records):
+        expected = [error.message for error in validator.validate(**record)]
+        assert [error.message for error in errors.get(row, [])] == expected
@@ -0,0 +1,169 @@
+"""Input validation for single records and whole work-order batches
+
+Lookup sets are built once at import, the FSP pattern of a brand (see
+brands/) when the brand is first validated. Errors are returned as
+ValidationError tuples instead of being shown, so the GUI, bulk.py and any
+other caller decide how to report them.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from itertools import compress
+from operator import not_
+import re
+
+import brands
+import profile_catalog
+import templates
+
+# brand -> compiled Brand.fsp_pattern, filled as brands are first validated
+_fsp_patterns: Dict[str, re.Pattern] = {}
+
+
+def fsp_pattern(brand: str) -> Optional[re.Pattern]:
+    """Compiled FSP pattern of a brand, None when the brand is unknown"""
+    pattern = _fsp_patterns.get(brand)
+    if pattern is None and brands.is_known(brand):
+        pattern = _fsp_patterns[brand] = re.compile(brands.get(brand).fsp_pattern)
+    return pattern
+
+
+SN_LENGTHS = frozenset((12, 16))
+
+# Fields of a record, in the order errors are reported
+FIELDS = ("brand", "sn", "fsp", "vlan", "sid", "name", "password", "serviceport")
+
+
+class ValidationError(NamedTuple):
+    """One failed rule: the field it concerns and the message for the technician"""
+    field: str
+    message: str
+    row: Optional[int] = None
+
+
+def validate(brand: str, sn: str, fsp: str, vlan: str, sid: str, name: str,
+             password: str = "", is_replacement: bool = False, is_pppoe: bool = True,
+             use_nce: bool = False, serviceport: str = "", olt: str = "",
+             use_today_password: bool = True) -> List[ValidationError]:
+    """Validate one record, returns every failed rule (empty when valid)"""
+    errors = []
+
+    pattern = fsp_pattern(brand)
+    if pattern is None:
+        errors.append(ValidationError("brand", f"Unknown OLT brand: {brand}"))
+    elif not pattern.match(fsp):
+        errors.append(ValidationError("fsp", "Invalid FSP format"))
+
+    if len(sn) not in SN_LENGTHS:
+        errors.append(ValidationError("sn", "Invalid Serial Number"))
+
+    profiles = profile_catalog.current().table(olt)
+    if vlan not in profiles:
+        errors.append(ValidationError("vlan", "Invalid VLAN"))
+    elif (profiles.get(vlan, is_pppoe) is None and pattern is not None
+          and _needs_profile(brand, sn, vlan, is_replacement, is_pppoe, use_nce)):
+        errors.append(ValidationError("vlan", _no_profile(vlan, is_pppoe)))
+
+    if not sid.isdigit():
+        errors.append(ValidationError("sid", "Invalid SID"))
+
+    if not name:
+        errors.append(ValidationError("name", "Customer Name is required"))
+
+    if is_pppoe and not use_today_password and not password:
+        errors.append(ValidationError("password", "PPPoE password is required"))
+
+    if brand == "huawei" and is_replacement and not serviceport.isdigit():
+        errors.append(ValidationError("serviceport", "Invalid Serviceport"))
+
+    errors.sort(key=lambda error: FIELDS.index(error.field))
+    return errors
+
+
+def _needs_profile(brand: str, sn: str, vlan: str, is_replacement: bool, is_pppoe: bool, use_nce: bool) -> bool:
+    """Whether the template a known brand renders the record with reads the VLAN's profile
+
+    Templates that use neither the bandwidth nor profile names (Raisecom,
+    BDCOM) render a VLAN in a mode the catalog has no profile for.
+    """
+    return templates.template_for(brand, sn, vlan, is_replacement, is_pppoe, use_nce).needs_profile
+
+
+def _no_profile(vlan: str, is_pppoe: bool) -> str:
+    return f"VLAN {vlan} has no {'PPPoE' if is_pppoe else 'IPoE'} profile"
+
+
+def _failed_rows(results: Sequence) -> List[int]:
+    """Row indices whose rule result is falsy"""
+    return list(compress(range(len(results)), map(not_, results)))
+
+
+def validate_columns(columns: Dict[str, Sequence]) -> Dict[int, List[ValidationError]]:
+    """Validate a batch given as columns (field -> values), returns {row: errors}
+
+    Each rule runs once over a whole column through map() and C-level lookups,
+    rather than running every rule per row. Columns use the same names as
+    validate(); optional columns may be left out.
+    """
+    brands = columns["brand"]
+    rows = len(brands)
+    is_pppoe = columns.get("is_pppoe", [True] * rows)
+    is_replacement = columns.get("is_replacement", [False] * rows)
+    use_nce = columns.get("use_nce", [False] * rows)
+
+    failed = []
+
+    # FSP: one precompiled pattern per brand, applied to that brand's rows
+    by_brand: Dict[str, List[int]] = {}
+    for row, brand in enumerate(brands):
+        by_brand.setdefault(brand, []).append(row)
+    fsps = columns["fsp"]
+    for brand, brand_rows in by_brand.items():
+        pattern = fsp_pattern(brand)
+        if pattern is None:
+            failed.append(("brand", f"Unknown OLT brand: {brand}", brand_rows))
+            continue
+        matches = map(pattern.match, [fsps[row] for row in brand_rows])
+        failed.append(("fsp", "Invalid FSP format", list(compress(brand_rows, map(not_, matches)))))
+
+    failed.append(("sn", "Invalid Serial Number",
+                   _failed_rows(list(map(SN_LENGTHS.__contains__, map(len, columns["sn"]))))))
+
+    # VLAN: the profiles of each OLT's region (see profile_catalog.py), applied to that OLT's rows
+    catalog = profile_catalog.current()
+    vlans = columns["vlan"]
+    by_olt: Dict[str, Sequence[int]] = {"": range(rows)}
+    if "olt" in columns:
+        by_olt = {}
+        for row, olt in enumerate(columns["olt"]):
+            by_olt.setdefault(olt, []).append(row)
+    for olt, olt_rows in by_olt.items():
+        profiles = catalog.table(olt)
+        olt_vlans = [vlans[row] for row in olt_rows]
+        failed.append(("vlan", "Invalid VLAN",
+                       list(compress(olt_rows, map(not_, map(profiles.vlans.__contains__, olt_vlans))))))
+        keys = zip(olt_vlans, [is_pppoe[row] for row in olt_rows])
+        for row in compress(olt_rows, map(not_, map(profiles.keys.__contains__, keys))):
+            if (vlans[row] in profiles and fsp_pattern(brands[row]) is not None
+                    and _needs_profile(brands[row], columns["sn"][row], vlans[row], is_replacement[row],
+                                       is_pppoe[row], use_nce[row])):
+                failed.append(("vlan", _no_profile(vlans[row], is_pppoe[row]), [row]))
+
+    failed.append(("sid", "Invalid SID", _failed_rows(list(map(str.isdigit, columns["sid"])))))
+    failed.append(("name", "Customer Name is required", _failed_rows(list(map(bool, columns["name"])))))
+
+    if "use_today_password" in columns:
+        passwords = columns.get("password", [""] * rows)
+        present = [not pppoe or today or password
+                   for pppoe, today, password in zip(is_pppoe, columns["use_today_password"], passwords)]
+        failed.append(("password", "PPPoE password is required", _failed_rows(present)))
+
+    if "huawei" in by_brand:
+        serviceports = columns.get("serviceport", [""] * rows)
+        failed.append(("serviceport", "Invalid Serviceport",
+                       [row for row in by_brand["huawei"]
+                        if is_replacement[row] and not serviceports[row].isdigit()]))
+
+    errors: Dict[int, List[ValidationError]] = {}
+    for field, message, bad_rows in sorted(failed, key=lambda rule: FIELDS.index(rule[0])):
+        for row in bad_rows:
+            errors.setdefault(row, []).append(ValidationError(field, message, row))
+    return errors